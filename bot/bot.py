@@ -6,8 +6,10 @@ import discord
 from discord.ext import commands
 
 from bot.config import settings
+from cogs.utils.logsetup import setup_logging
 
-logging.basicConfig(level=logging.INFO)
+# egyetlen root handler: queue + háttérszál (JSON sorok, loguru is ide fut)
+setup_logging()
 log = logging.getLogger("bot")
 
 # ---- Intents
@@ -21,11 +23,15 @@ intents.reactions = True
 TOKEN = os.getenv("DISCORD_TOKEN")
 
 class Bot(commands.Bot):
-    def __init__(self) -> None:
-        super().__init__(command_prefix="!", intents=intents)
+    def __init__(self, **kwargs) -> None:
+        super().__init__(command_prefix="!", intents=intents, **kwargs)
 
     async def setup_hook(self) -> None:
         from utils import policy as _policy
+        # elsőként: a többi cog betöltése/listenerei már mérve vannak
+        await self.load_extension("cogs.utils.loopmon")
+        await self.load_extension("cogs.utils.outbound")
+        await self.load_extension("cogs.utils.guildstate")
         # region ISERO PATCH profanity_cog_switch
         legacy = "cogs.moderation.profanity_guard"
         watcher = "cogs.watchers.profanity_watch"
@@ -52,22 +58,30 @@ class Bot(commands.Bot):
         await self.load_extension("cogs.tickets.tickets")
         await self.load_extension("cogs.ranks.progress")
         await self.load_extension("cogs.ranks.rolesync")
+        await self.load_extension("cogs.ranks.leaderboard")
         await self.load_extension("cogs.utils.logsetup")
         await self.load_extension("cogs.utils.health")
+        await self.load_extension("cogs.utils.perf")
+        await self.load_extension("cogs.utils.metrics")
+        await self.load_extension("cogs.storage.signals")
 
         # App parancsok csak guild-scope-on
-        try:
-            guild_obj = discord.Object(id=settings.GUILD_ID)
-            # töröljük a globál parancsokat
-            self.tree.clear_commands(guild=None)
-            await self.tree.sync(guild=None)
-            # sync guildre
-            await self.tree.sync(guild=guild_obj)
-            names = [c.name for c in await self.tree.fetch_commands(guild=guild_obj)]
-            log.info("Registered app commands (guild %s): %s", guild_obj.id, names)
-            log.info("Registered app commands count: %d", len(names))
-        except Exception:
-            log.exception("Command sync failed")
+        # region ISERO PATCH cluster-sync-once
+        # klaszterben csak a 0. worker szinkronizál (N folyamat ne írja felül egymást)
+        if int(os.getenv("CLUSTER_WORKER_ID", "0") or "0") == 0:
+            try:
+                guild_obj = discord.Object(id=settings.GUILD_ID)
+                # töröljük a globál parancsokat
+                self.tree.clear_commands(guild=None)
+                await self.tree.sync(guild=None)
+                # sync guildre
+                await self.tree.sync(guild=guild_obj)
+                names = [c.name for c in await self.tree.fetch_commands(guild=guild_obj)]
+                log.info("Registered app commands (guild %s): %s", guild_obj.id, names)
+                log.info("Registered app commands count: %d", len(names))
+            except Exception:
+                log.exception("Command sync failed")
+        # endregion
 
         # region ISERO PATCH attach-profanity-handle
         try:
@@ -76,6 +90,31 @@ class Bot(commands.Bot):
             self.profanity_watcher = None
         # endregion ISERO PATCH attach-profanity-handle
 
+    # region ISERO PATCH shutdown-order
+    async def close(self) -> None:
+        from cogs.utils.modlog import MODLOG
+
+        # a sorban álló mod-log embedek még az OUTBOUND cog leállása előtt mennek ki
+        try:
+            await MODLOG.close()
+        except Exception:
+            log.exception("Mod-log flush on close failed")
+        # az AgentGate zárja a DB-t (kártyák, PlayerDB): a többi cog (XP, rolesync,
+        # leaderboard) előbb flush-oljon, amíg az még nyitva van
+        for name in [n for n in self.extensions if n != "cogs.agent.agent_gate"]:
+            try:
+                await self.unload_extension(name)
+            except Exception:
+                log.exception("Unloading %s failed", name)
+        await super().close()
+        from cogs.utils.shared_state import SHARED
+
+        try:
+            await SHARED.close()
+        except Exception:
+            log.exception("Shared state close failed")
+    # endregion
+
     async def on_ready(self):
         log.info(f"Logged in as {self.user} ({self.user.id})")
 
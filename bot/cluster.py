@@ -0,0 +1,280 @@
+# bot/cluster.py
+"""Cluster launcher: N worker processes, each running a contiguous shard range.
+
+    python -m bot.cluster --workers 4            # shard count from Discord's recommendation
+    python -m bot.cluster --workers 2 --shards 8
+
+Each worker is a spawned process running an ``AutoShardedBot`` with
+``shard_ids=<its range>``; guild state stays inside the owning process
+(see ``cogs.utils.guildstate``), cross-guild state — token budget, ticket
+cooldowns, open-ticket index — goes through ``SHARED_STATE_URL``
+(``sqlite:///…`` on one host, ``postgres://…`` in production; ``memory://``
+is refused here because workers would not see each other).
+
+The supervisor restarts dead workers with exponential backoff, kills workers
+whose heartbeat goes stale, and serves ``GET /health`` (JSON, 503 if any
+worker is down) on ``CLUSTER_HEALTH_HOST:CLUSTER_HEALTH_PORT``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger("ISERO.Cluster")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+CLUSTER_HEALTH_HOST = os.getenv("CLUSTER_HEALTH_HOST", "0.0.0.0")
+CLUSTER_HEALTH_PORT = _env_int("CLUSTER_HEALTH_PORT", 8080)
+CLUSTER_HEARTBEAT_S = _env_float("CLUSTER_HEARTBEAT_S", 10.0)
+CLUSTER_HEARTBEAT_TIMEOUT_S = _env_float("CLUSTER_HEARTBEAT_TIMEOUT_S", 90.0)
+CLUSTER_MAX_BACKOFF_S = 60.0
+
+
+def plan_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """Split ``range(shard_count)`` into ``workers`` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    out, start = [], 0
+    for w in range(workers):
+        n = base + (1 if w < extra else 0)
+        out.append(list(range(start, start + n)))
+        start += n
+    return out
+
+
+async def recommended_shards(token: str) -> int:
+    """Discord's recommended shard count (``GET /gateway/bot``)."""
+    import aiohttp
+
+    async with aiohttp.ClientSession() as s:
+        async with s.get("https://discord.com/api/v10/gateway/bot",
+                         headers={"Authorization": f"Bot {token}"}) as r:
+            r.raise_for_status()
+            return int((await r.json())["shards"])
+
+
+# ---- worker side ----
+def run_worker(worker_id: int, shard_ids: List[int], shard_count: int, heartbeats) -> None:
+    """Process entry point (spawned): one AutoShardedBot for ``shard_ids``."""
+    os.environ["CLUSTER_WORKER_ID"] = str(worker_id)
+    from discord.ext import commands
+
+    from bot.bot import TOKEN, Bot
+
+    class ShardedBot(Bot, commands.AutoShardedBot):
+        async def setup_hook(self) -> None:
+            await super().setup_hook()
+            self.loop.create_task(self._heartbeat(), name="isero: cluster-heartbeat")
+
+        async def _heartbeat(self) -> None:
+            while True:
+                try:
+                    heartbeats.put_nowait({
+                        "worker": worker_id, "ts": time.time(), "ready": self.is_ready(),
+                        "guilds": len(self.guilds),
+                        "latency_ms": round(self.latency * 1000, 1) if math.isfinite(self.latency) else None,
+                    })
+                except Exception:
+                    pass
+                await asyncio.sleep(CLUSTER_HEARTBEAT_S)
+
+    async def _main() -> None:
+        bot = ShardedBot(shard_ids=shard_ids, shard_count=shard_count)
+        async with bot:
+            await bot.start(TOKEN)
+
+    asyncio.run(_main())
+
+
+# ---- supervisor side ----
+@dataclass
+class WorkerSlot:
+    worker_id: int
+    shard_ids: List[int]
+    proc: Any = None
+    started_at: float = 0.0
+    restarts: int = 0
+    next_start: float = 0.0
+    last_beat: Dict[str, Any] = field(default_factory=dict)
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.is_alive()
+
+
+class Supervisor:
+    def __init__(self, plan: List[List[int]], shard_count: int, *,
+                 spawn: Optional[Callable[[WorkerSlot], Any]] = None, heartbeats=None,
+                 clock=time.monotonic, heartbeat_timeout_s: float = CLUSTER_HEARTBEAT_TIMEOUT_S):
+        ctx = mp.get_context("spawn")
+        self.shard_count = shard_count
+        self.slots = [WorkerSlot(i, shards) for i, shards in enumerate(plan)]
+        self.heartbeats = heartbeats if heartbeats is not None else ctx.Queue()
+        self.clock = clock
+        self.heartbeat_timeout_s = heartbeat_timeout_s
+        self._spawn = spawn or self._spawn_process
+        self._ctx = ctx
+        self._stopping = False
+
+    def _spawn_process(self, slot: WorkerSlot):
+        p = self._ctx.Process(target=run_worker, name=f"isero-worker-{slot.worker_id}",
+                              args=(slot.worker_id, slot.shard_ids, self.shard_count, self.heartbeats))
+        p.start()
+        return p
+
+    def _start(self, slot: WorkerSlot) -> None:
+        slot.proc = self._spawn(slot)
+        slot.started_at = self.clock()
+        slot.last_beat = {}
+        log.info("worker %d started pid=%s shards=%s", slot.worker_id, getattr(slot.proc, "pid", None),
+                 slot.shard_ids)
+
+    def start(self) -> None:
+        for slot in self.slots:
+            self._start(slot)
+
+    def _drain_heartbeats(self) -> None:
+        while True:
+            try:
+                beat = self.heartbeats.get_nowait()
+            except Exception:
+                return
+            wid = beat.get("worker")
+            if isinstance(wid, int) and 0 <= wid < len(self.slots):
+                beat["mono"] = self.clock()
+                self.slots[wid].last_beat = beat
+
+    def tick(self) -> None:
+        """One supervision step: collect heartbeats, reap/kill, restart with backoff."""
+        self._drain_heartbeats()
+        now = self.clock()
+        for slot in self.slots:
+            if slot.proc is None:
+                if not self._stopping and now >= slot.next_start:
+                    self._start(slot)
+                continue
+            seen = slot.last_beat.get("mono", slot.started_at)
+            if slot.alive() and now - seen > self.heartbeat_timeout_s:
+                log.warning("worker %d heartbeat stale (%.0fs), killing", slot.worker_id, now - seen)
+                slot.proc.terminate()
+            if not slot.alive():
+                code = getattr(slot.proc, "exitcode", None)
+                slot.proc = None
+                if self._stopping:
+                    continue
+                # rövid futás után újra hal → exponenciális várakozás
+                if now - slot.started_at < 300:
+                    slot.restarts += 1
+                else:
+                    slot.restarts = 1
+                delay = min(CLUSTER_MAX_BACKOFF_S, 2 ** (slot.restarts - 1))
+                slot.next_start = now + delay
+                log.error("worker %d exited (code=%s), restart in %.0fs", slot.worker_id, code, delay)
+
+    def status(self) -> Dict[str, Any]:
+        now = self.clock()
+        workers = []
+        for s in self.slots:
+            beat = s.last_beat
+            workers.append({
+                "worker": s.worker_id, "shards": s.shard_ids, "alive": s.alive(),
+                "pid": getattr(s.proc, "pid", None), "restarts": s.restarts,
+                "ready": bool(beat.get("ready")), "guilds": beat.get("guilds"),
+                "latency_ms": beat.get("latency_ms"),
+                "heartbeat_age_s": round(now - beat["mono"], 1) if "mono" in beat else None,
+            })
+        return {"ok": all(w["alive"] for w in workers), "shard_count": self.shard_count, "workers": workers}
+
+    def stop(self) -> None:
+        self._stopping = True
+        for slot in self.slots:
+            if slot.alive():
+                slot.proc.terminate()
+
+    async def serve_health(self, host: str = CLUSTER_HEALTH_HOST, port: int = CLUSTER_HEALTH_PORT):
+        from aiohttp import web
+
+        async def health(_request):
+            st = self.status()
+            return web.Response(text=json.dumps(st), content_type="application/json",
+                                status=200 if st["ok"] else 503)
+
+        app = web.Application()
+        app.router.add_get("/health", health)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        log.info("cluster health on http://%s:%d/health", host, port)
+        return runner
+
+    async def run(self, health_port: int = CLUSTER_HEALTH_PORT) -> None:
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        runner = await self.serve_health(port=health_port) if health_port else None
+        self.start()
+        try:
+            while not stop.is_set():
+                self.tick()
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.stop()
+            for slot in self.slots:
+                if slot.proc is not None:
+                    await asyncio.to_thread(slot.proc.join, 15)
+            if runner is not None:
+                await runner.cleanup()
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    from bot.bot import TOKEN
+    from cogs.utils.shared_state import SHARED_STATE_URL
+
+    ap = argparse.ArgumentParser(description="Run the bot as a multi-process shard cluster.")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("CLUSTER_WORKERS", "0") or "0") or os.cpu_count() or 1)
+    ap.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", "0") or "0"),
+                    help="total shard count (0 = Discord's recommendation)")
+    ap.add_argument("--health-port", type=int, default=CLUSTER_HEALTH_PORT)
+    args = ap.parse_args(argv)
+
+    if not TOKEN:
+        raise SystemExit("DISCORD_TOKEN missing in environment.")
+    if SHARED_STATE_URL.startswith("memory:") and args.workers > 1:
+        raise SystemExit("SHARED_STATE_URL must point to sqlite:/// or postgres:// in cluster mode.")
+    shards = args.shards or await recommended_shards(TOKEN)
+    plan = plan_shards(shards, args.workers)
+    log.info("cluster: %d shards over %d workers %s", shards, len(plan), plan)
+    await Supervisor(plan, shards).run(health_port=args.health_port)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
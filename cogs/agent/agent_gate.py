@@ -1,6 +1,8 @@
 # ISERO – Agent Gate (wake + ticket-érzékeny válasz + YAMI-lite persona)
 from __future__ import annotations
 
+import asyncio
+import json
 import os
 import re
 import time
@@ -13,7 +15,11 @@ import discord
 from discord.ext import commands
 from cogs.utils import context as ctx_flags
 from bot.config import settings
-from cogs.agent.playerdb import PlayerDB
+from cogs.storage.sqlite_store import make_player_db
+from cogs.storage.store import close_pool
+from cogs.agent.router import ModelRouter
+from cogs.agent.breaker import CircuitBreaker
+from cogs.agent.fallback import local_fallback_reply
 from ..utils.prompt import (
     compose_mebinu_prompt,
     compose_commission_prompt,
@@ -21,9 +27,19 @@ from ..utils.prompt import (
 )
 
 from cogs.utils.wake import WakeMatcher
-from cogs.utils.text import chunk_message, truncate_by_chars
+from cogs.utils.text import DISCORD_MSG_LIMIT, chunk_message, embed_chunks, truncate_by_chars
 from cogs.utils.throttling import should_redirect
 from cogs.utils.context import resolve
+from cogs.utils.logsetup import msg_extra
+from cogs.utils.outbound import OUTBOUND, Prio
+from cogs.utils.guildstate import GUILDS, guild_id_of
+from cogs.utils.shared_state import SHARED
+from cogs.utils.intent import SKIP_LABELS, canned_reply, get_classifier
+from cogs.utils.perf import PERF
+from cogs.utils.metrics import REGISTRY
+# region ISERO PATCH playercard-readthrough
+from cogs.storage.playercard import CARDS, get_player_card, prewarm as prewarm_player_card
+# endregion
 from utils.policy import ResponderPolicy
 
 log = logging.getLogger("bot.agent_gate")
@@ -46,6 +62,15 @@ def _env_int(name: str, default: int | None = None) -> int | None:
     except ValueError:
         return default
 
+def _env_float(name: str, default: float) -> float:
+    v = (os.getenv(name) or "").strip()
+    if not v:
+        return default
+    try:
+        return float(v)
+    except ValueError:
+        return default
+
 def _env_bool(name: str, default: bool = False) -> bool:
     v = (os.getenv(name) or "").strip().lower()
     if not v:
@@ -58,7 +83,11 @@ OPENAI_API_KEY = (
     or os.getenv("OPENAI_KEY")
 )
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = (os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+OPENAI_RECORD_PATH = os.getenv("OPENAI_RECORD_PATH", "")
 OPENAI_MODEL_HEAVY = os.getenv("OPENAI_MODEL_HEAVY", "gpt-4o")
+AGENT_LLM_TIMEOUT_S = _env_float("AGENT_LLM_TIMEOUT_S", 30.0)
+PLAYERCARD_READ_TIMEOUT_S = _env_float("PLAYERCARD_READ_TIMEOUT_S", 0.5)
 
 AGENT_ALLOWED_CHANNELS = _csv_list(os.getenv("AGENT_ALLOWED_CHANNELS", ""))
 
@@ -75,6 +104,7 @@ OWNER_ID = _env_int("OWNER_ID", 0) or 0
 MAX_REPLY_CHARS_STRICT = 300
 MAX_REPLY_CHARS_LOOSE  = 800
 MAX_REPLY_CHARS_DISCORD = 1900
+EMBED_REPLY_CHARS = 12000
 
 _deprecated_keys_detected = False
 if os.getenv("TICKET_HUB_CHANNEL_ID") or os.getenv("CATEGORY_TICKETS"):
@@ -98,6 +128,17 @@ GENERAL_CHAT_CHANNEL_ID = _env_int("CHANNEL_GENERAL_CHAT", 0) or 0
 PROFANITY_WORDS = [w.lower() for w in _csv_list(os.getenv("PROFANITY_WORDS", ""))]
 AGENT_MASK_PROFANITY_TO_MODEL = _env_bool("AGENT_MASK_PROFANITY_TO_MODEL", True)
 
+# region ISERO PATCH intent-fastpath:env
+AGENT_INTENT_FASTPATH = _env_bool("AGENT_INTENT_FASTPATH", True)
+AGENT_INTENT_MIN_CONF = _env_float("AGENT_INTENT_MIN_CONF", 0.85)
+# endregion
+
+M_LLM_CALLS = REGISTRY.counter("isero_agent_llm_calls_total", "LLM calls by route and outcome", ("route", "outcome"))
+M_TOKENS_BOOKED = REGISTRY.counter("isero_agent_tokens_booked_total", "Tokens booked against the daily budget")
+M_BUDGET_REFUSALS = REGISTRY.counter("isero_agent_budget_refusals_total", "Replies refused because the daily budget is spent")
+M_BUDGET_SPENT = REGISTRY.gauge("isero_agent_budget_spent_tokens", "Tokens spent today")
+M_FASTPATH = REGISTRY.counter("isero_agent_fastpath_total", "Messages answered without the LLM", ("label",))
+
 # ----------------------------
 # Utils
 # ----------------------------
@@ -149,10 +190,21 @@ def _ticket_owner_id(ch: discord.abc.GuildChannel | discord.Thread) -> Optional[
 _warned_missing_ticket_category = False
 
 
+# region ISERO PATCH guild-config
+def _guild_id_cfg(ch, key: str, default: int) -> int:
+    """Channel/category id from the guild's GUILD_CONFIG_PATH overrides (ENV default)."""
+    try:
+        return int(GUILDS.config(ch, key, default) or 0)
+    except (TypeError, ValueError):
+        return default
+# endregion
+
+
 def _is_ticket_context(ch: discord.abc.GuildChannel | discord.Thread) -> bool:
     global _warned_missing_ticket_category
     try:
-        if TICKET_HUB_CHANNEL_ID and getattr(ch, "id", 0) == TICKET_HUB_CHANNEL_ID:
+        hub_id = _guild_id_cfg(ch, "CHANNEL_TICKET_HUB", TICKET_HUB_CHANNEL_ID)
+        if hub_id and getattr(ch, "id", 0) == hub_id:
             return True
         cat_id = None
         cat = None
@@ -162,8 +214,9 @@ def _is_ticket_context(ch: discord.abc.GuildChannel | discord.Thread) -> bool:
         else:
             cat_id = getattr(ch, "category_id", 0) or 0
             cat = getattr(ch, "category", None)
-        if TICKETS_CATEGORY_ID:
-            if cat_id == TICKETS_CATEGORY_ID:
+        tickets_cat = _guild_id_cfg(ch, "TICKETS_CATEGORY_ID", TICKETS_CATEGORY_ID)
+        if tickets_cat:
+            if cat_id == tickets_cat:
                 return True
         else:
             if cat and getattr(cat, "name", "").lower() == "tickets":
@@ -179,9 +232,9 @@ def _is_ticket_context(ch: discord.abc.GuildChannel | discord.Thread) -> bool:
 def _is_implicit_channel(ch: discord.abc.GuildChannel | discord.Thread) -> bool:
     """Return True if messages in this channel can trigger implicitly."""
     try:
-        if BOT_COMMANDS_CHANNEL_ID and getattr(ch, "id", 0) == BOT_COMMANDS_CHANNEL_ID:
-            return True
-        if SUGGESTIONS_CHANNEL_ID and getattr(ch, "id", 0) == SUGGESTIONS_CHANNEL_ID:
+        ch_id = getattr(ch, "id", 0)
+        if ch_id and ch_id in (_guild_id_cfg(ch, "CHANNEL_BOT_COMMANDS", BOT_COMMANDS_CHANNEL_ID),
+                               _guild_id_cfg(ch, "CHANNEL_SUGGESTIONS", SUGGESTIONS_CHANNEL_ID)):
             return True
         if _is_ticket_context(ch):
             return True
@@ -229,12 +282,14 @@ def _default_player_card(user_id: int) -> Dict[str, object]:
         "owner": (user_id == OWNER_ID),
     }
 
-def _load_player_card(user_id: int) -> Dict[str, object]:
+async def _load_player_card(user_id: int) -> Dict[str, object]:
+    # region ISERO PATCH playercard-readthrough
+    # memóriából (TTL-es read-through cache); lassú DB esetén az alapértékek mennek
     try:
-        from cogs.storage.playercard import get_player_card  # opcionális
-        pc = get_player_card(user_id) or {}
+        pc = await asyncio.wait_for(get_player_card(user_id), PLAYERCARD_READ_TIMEOUT_S) or {}
     except Exception:
         pc = {}
+    # endregion
     base = _default_player_card(user_id)
     base.update(pc)
     return base
@@ -242,21 +297,48 @@ def _load_player_card(user_id: int) -> Dict[str, object]:
 # ----------------------------
 # OpenAI
 # ----------------------------
+# region ISERO PATCH openai-transport
+# Tesztekhez / replay-hez: httpx transport (pl. tools.mock_openai) injektálható,
+# így a teljes agent-út valódi token-költés nélkül futtatható.
+_OPENAI_TRANSPORT: Optional[httpx.AsyncBaseTransport] = None
+
+
+def set_openai_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    global _OPENAI_TRANSPORT
+    _OPENAI_TRANSPORT = transport
+
+
+def _record_completion(model: str, data: dict) -> None:
+    try:
+        row = {
+            "model": model,
+            "content": data["choices"][0]["message"]["content"],
+            "usage": data.get("usage") or {},
+        }
+        with open(OPENAI_RECORD_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except Exception as e:
+        log.debug("completion record failed: %s", e)
+# endregion ISERO PATCH openai-transport
+
+
 async def call_openai_chat(messages: list[dict], model: str, timeout_s: float = 30.0) -> str:
-    if not OPENAI_API_KEY:
+    if not OPENAI_API_KEY and _OPENAI_TRANSPORT is None:
         raise RuntimeError("OPENAI_API_KEY hiányzik az ENV-ből")
 
     headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Authorization": f"Bearer {OPENAI_API_KEY or 'local'}",
         "Content-Type": "application/json",
     }
     payload = {"model": model, "messages": messages, "temperature": 0.6, "max_tokens": 600}
 
-    async with httpx.AsyncClient(timeout=timeout_s) as client:
-        r = await client.post("https://api.openai.com/v1/chat/completions",
+    async with httpx.AsyncClient(timeout=timeout_s, transport=_OPENAI_TRANSPORT) as client:
+        r = await client.post(f"{OPENAI_BASE_URL}/chat/completions",
                               headers=headers, json=payload)
         r.raise_for_status()
         data = r.json()
+        if OPENAI_RECORD_PATH:
+            _record_completion(model, data)
         text = data["choices"][0]["message"]["content"]
         return (text or "").strip()
 
@@ -287,9 +369,14 @@ def sanitize_model_reply(text: str) -> str:
     t = re.sub(r"\s+", " ", t).strip()
     return clamp_len(t)
 
+_LONG_TRIGGERS = ("ár", "mebinu", "commission", "részlet", "opció", "ticket", "spec", "technika", "debug")
+
+def promo_keyword_hits(user_prompt: str) -> int:
+    low = user_prompt.lower()
+    return sum(1 for w in _LONG_TRIGGERS if w in low)
+
 def decide_length_bounds(user_prompt: str, promo_focus: bool) -> Tuple[int, int]:
-    long_triggers = ["ár", "mebinu", "commission", "részlet", "opció", "ticket", "spec", "technika", "debug"]
-    if promo_focus or any(w in user_prompt.lower() for w in long_triggers) or len(user_prompt) > 200:
+    if promo_focus or promo_keyword_hits(user_prompt) or len(user_prompt) > 200:
         return MAX_REPLY_CHARS_LOOSE, MAX_REPLY_CHARS_DISCORD
     return MAX_REPLY_CHARS_STRICT, MAX_REPLY_CHARS_DISCORD
 
@@ -308,15 +395,17 @@ class AgentGate(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._user_cooldowns: Dict[int, float] = {}
+        # a token-keret globális (egy OpenAI fiók); a user-szintű állapot guildenként él:
+        # GUILDS.for_obj(x).ns("agent.cooldowns" | "agent.dedup" | "agent.ai_calls" | "agent.last_msg")
         self._budget = Budget(day_key=time.strftime("%Y-%m-%d"))
-        self._dedup: Dict[int, tuple[str, float]] = {}   # user_id -> (last_text, ts)
-        self._ai_calls: Dict[Tuple[int, int], int] = {}
-        self._last_msg: Dict[Tuple[int, int], float] = {}
         # Some legacy cogs (e.g. keyword watcher) still look for `ag.db`.
         # Initialise to `None` so they can `getattr(ag, "db", None)` safely.
         self.db = None
         self.session_context: Dict[int, dict] = {}
+        self.intent_skips: Dict[str, int] = {}
+        self.router = ModelRouter(OPENAI_MODEL, OPENAI_MODEL_HEAVY)
+        self.llm_breaker = CircuitBreaker("llm")
+        M_BUDGET_SPENT.set_function(lambda: self._budget.spent)
         # region ISERO PATCH session-caps
         self.sessions: Dict[int, dict] = {}
         self._logger = logging.getLogger("ISERO.Agent")
@@ -329,6 +418,23 @@ class AgentGate(commands.Cog):
             "deprecated_keys_detected": _deprecated_keys_detected,
         }
 
+    # region ISERO PATCH shutdown-flush
+    async def cog_unload(self):
+        # a write-behind pufferek leállításkor ne vesszenek el
+        try:
+            await CARDS.close()
+        except Exception as e:
+            log.warning("playercard flush on unload failed: %s", e)
+        if self.db is not None:
+            # a kártyák után: SQLite-nál ugyanazt a store-t használják
+            try:
+                await self.db.close()
+            except Exception as e:
+                log.warning("PlayerDB close failed: %s", e)
+        # a közös asyncpg pool utolsóként, minden write-behind flush után
+        await close_pool()
+    # endregion
+
     def _reset_budget_if_new_day(self):
         today = time.strftime("%Y-%m-%d")
         if self._budget.day_key != today:
@@ -337,10 +443,35 @@ class AgentGate(commands.Cog):
     def _check_and_book_tokens(self, tokens: int) -> bool:
         self._reset_budget_if_new_day()
         if self._budget.spent + tokens > AGENT_DAILY_TOKEN_LIMIT:
+            M_BUDGET_REFUSALS.inc()
             return False
         self._budget.spent += tokens
+        M_TOKENS_BOOKED.inc(tokens)
         return True
 
+    # region ISERO PATCH shared-budget
+    async def _book_tokens(self, tokens: int) -> bool:
+        """Book against the cluster-wide daily budget (local fast path in single-process mode)."""
+        if SHARED.local:
+            return self._check_and_book_tokens(tokens)
+        self._reset_budget_if_new_day()
+        key = f"agent:budget:{self._budget.day_key}"
+        total = await SHARED.incr(key, tokens, ttl_s=2 * 86400)
+        if total > AGENT_DAILY_TOKEN_LIMIT:
+            await SHARED.incr(key, -tokens)
+            M_BUDGET_REFUSALS.inc()
+            return False
+        self._budget.spent = total  # a gauge a klaszter-szintű költést mutatja
+        M_TOKENS_BOOKED.inc(tokens)
+        return True
+
+    async def _refund_tokens(self, tokens: int) -> None:
+        if SHARED.local:
+            self._budget.spent = max(0, self._budget.spent - tokens)
+            return
+        self._budget.spent = max(0, await SHARED.incr(f"agent:budget:{self._budget.day_key}", -tokens))
+    # endregion
+
     def _is_allowed_channel(self, channel: discord.abc.GuildChannel | discord.Thread) -> bool:
         if not AGENT_ALLOWED_CHANNELS:
             return True
@@ -352,10 +483,11 @@ class AgentGate(commands.Cog):
         except Exception:
             return False
 
-    def _cooldown_ok(self, user_id: int) -> bool:
-        last = self._user_cooldowns.get(user_id, 0)
+    def _cooldown_ok(self, user_id: int, guild_id: int = 0) -> bool:
+        cooldowns = GUILDS.get(guild_id).ns("agent.cooldowns")
+        last = cooldowns.get(user_id, 0)
         if (time.time() - last) >= AGENT_REPLY_COOLDOWN_SECONDS:
-            self._user_cooldowns[user_id] = time.time()
+            cooldowns[user_id] = time.time()
             return True
         return False
 
@@ -570,15 +702,21 @@ class AgentGate(commands.Cog):
             return False
         now = time.time()
         hour = int(now // 3600)
-        key = (message.author.id, hour)
-        if self._ai_calls.get(key, 0) >= settings.AI_MAX_CALLS_PER_USER_HOUR:
+        gs = GUILDS.for_obj(message)
+        ai_calls = gs.ns("agent.ai_calls")
+        if ai_calls.get("hour") != hour:
+            ai_calls.clear()  # óránkénti kulcsok: a régi órák ne halmozódjanak
+            ai_calls["hour"] = hour
+        key = message.author.id
+        if ai_calls.get(key, 0) >= settings.AI_MAX_CALLS_PER_USER_HOUR:
             return False
-        self._ai_calls[key] = self._ai_calls.get(key, 0) + 1
+        ai_calls[key] = ai_calls.get(key, 0) + 1
+        last_msg = gs.ns("agent.last_msg")
         dkey = (message.author.id, message.channel.id)
-        last = self._last_msg.get(dkey, 0)
+        last = last_msg.get(dkey, 0)
         if now - last < (settings.AI_DEBOUNCE_MS / 1000):
             return False
-        self._last_msg[dkey] = now
+        last_msg[dkey] = now
         return True
 
     def channel_trigger_reason(self, channel: discord.abc.GuildChannel | discord.Thread) -> str:
@@ -586,32 +724,48 @@ class AgentGate(commands.Cog):
         return "implicit" if _is_implicit_channel(channel) else "mention"
 
 
-    def _dedup_ok(self, user_id: int, text: str) -> bool:
+    def _dedup_ok(self, user_id: int, text: str, guild_id: int = 0) -> bool:
         now = time.time()
-        last = self._dedup.get(user_id)
+        dedup = GUILDS.get(guild_id).ns("agent.dedup")  # user_id -> (last_text, ts)
+        last = dedup.get(user_id)
         if not last:
-            self._dedup[user_id] = (text, now)
+            dedup[user_id] = (text, now)
             return True
         last_text, ts = last
         if text == last_text and (now - ts) < (AGENT_DEDUP_TTL_SECONDS or 5):
             return False
-        self._dedup[user_id] = (text, now)
+        dedup[user_id] = (text, now)
         return True
 
-    async def _safe_send_reply(self, message: discord.Message, text: str):
+    def _fallback_reply(self, text: str, ctx) -> str:
+        tickets = self.bot.get_cog("TicketsCog") or self.bot.get_cog("Tickets")
+        kb = getattr(tickets, "kb", None) or {}
+        return local_fallback_reply(text, ticket_type=ctx.ticket_type if ctx.is_ticket else None, kb=kb)
+
+    async def _safe_send_reply(self, message: discord.Message, text: str, *, embed: bool = False):
         ref = message.to_reference(fail_if_not_exists=False)
-        for chunk in chunk_message(clamp_len(text)):
+        ch = message.channel
+        if embed:
+            # hosszú tartalom: 4096-os embed leírások, üzenetenként több embed
+            for embeds in embed_chunks(clamp_len(text, EMBED_REPLY_CHARS)):
+                await OUTBOUND.run(ch.id, Prio.REPLY, lambda e=embeds, r=ref: ch.send(
+                    embeds=e, reference=r, allowed_mentions=discord.AllowedMentions.none()))
+                ref = None
+            return
+        for chunk in chunk_message(clamp_len(text), DISCORD_MSG_LIMIT):
+            # region ISERO PATCH outbound-prio
             try:
-                await message.channel.send(
-                    content=chunk,
-                    reference=ref,
+                await OUTBOUND.run(ch.id, Prio.REPLY, lambda c=chunk, r=ref: ch.send(
+                    content=c,
+                    reference=r,
                     allowed_mentions=discord.AllowedMentions.none(),
-                )
+                ))
             except discord.HTTPException:
-                await message.channel.send(
-                    content=chunk,
+                await OUTBOUND.run(ch.id, Prio.REPLY, lambda c=chunk: ch.send(
+                    content=c,
                     allowed_mentions=discord.AllowedMentions.none(),
-                )
+                ))
+            # endregion
             ref = None
 
     async def _handle_owner_cmd(self, message: discord.Message, cmd: str) -> None:
@@ -639,7 +793,7 @@ class AgentGate(commands.Cog):
             lines = []
             async for msg in message.channel.history(limit=n):
                 lines.append(f"{msg.author.display_name}: {msg.content}")
-            await self._safe_send_reply(message, "\n".join(lines))
+            await self._safe_send_reply(message, "\n".join(lines), embed=True)
             return
         await self._safe_send_reply(message, "unknown admin command")
 
@@ -647,13 +801,20 @@ class AgentGate(commands.Cog):
     async def on_message(self, message: discord.Message):
         if message.author.bot:
             return
+        t_msg = time.monotonic()
         if self.bot.user and message.author.id == self.bot.user.id:
             return
         if TICKET_HUB_CHANNEL_ID and message.channel.id == TICKET_HUB_CHANNEL_ID:
-            log.info("hub-silence: skipped free-text in #ticket-hub")
+            log.info("hub-silence: skipped free-text in #ticket-hub", extra=msg_extra(message))
             return
         if not self._is_allowed_channel(message.channel):
             return
+        # region ISERO PATCH playercard-readthrough
+        # a csatornában aktív user kártyája betöltődik, mire az agent válaszol
+        prewarm_player_card(message.author.id)
+        if self.db is not None:
+            self.db.prewarm_snapshot(message.author.id)
+        # endregion
         # region ISERO PATCH session-caps:gate
         sess = self._get_sess(message.channel.id)
         if sess and not message.author.bot:
@@ -677,7 +838,8 @@ class AgentGate(commands.Cog):
             return
 
         # Moderáció által eltüntetett üzeneteket hagyjuk figyelmen kívül
-        if ctx_flags.is_flagged(message):
+        # (hosszú üzenetnél a profanity scan még futhat: megvárjuk az ítéletet)
+        if await ctx_flags.wait_moderation(message):
             return
 
         if settings.OWNER_NL_ENABLED and raw.startswith(settings.OWNER_ACTIVATION_PREFIX):
@@ -686,7 +848,8 @@ class AgentGate(commands.Cog):
                 await self._handle_owner_cmd(message, cmd)
             return
 
-        ctx = await resolve(message)
+        with PERF.stage("resolve"):
+            ctx = await resolve(message)
 
         ticket_owner = _ticket_owner_id(message.channel)
 
@@ -695,17 +858,19 @@ class AgentGate(commands.Cog):
             and not (ticket_owner and message.author.id == ticket_owner)
         ):
             return
-        if not self._dedup_ok(message.author.id, raw):
+        if not self._dedup_ok(message.author.id, raw, guild_id_of(message)):
             return
 
-        decision = ResponderPolicy.decide(ctx)
+        with PERF.stage("policy"):
+            decision = ResponderPolicy.decide(ctx)
         if not decision.should_reply or decision.mode == "silent":
             return
         if decision.mode == "redirect":
             key = f"redir:{message.channel.id}:{message.author.id}:{decision.reason}"
-            if should_redirect(key):
-                if BOT_COMMANDS_CHANNEL_ID:
-                    dest = _channel_mention(message.guild, BOT_COMMANDS_CHANNEL_ID, "bot-commands")
+            if should_redirect(key, guild_id=guild_id_of(message)):
+                bot_commands = _guild_id_cfg(message, "CHANNEL_BOT_COMMANDS", BOT_COMMANDS_CHANNEL_ID)
+                if bot_commands:
+                    dest = _channel_mention(message.guild, bot_commands, "bot-commands")
                     await self._safe_send_reply(message, f"Itt nem válaszolok, gyere ide: {dest}")
             return
 
@@ -746,12 +911,28 @@ class AgentGate(commands.Cog):
         user_prompt = WAKE.strip(raw, bot_mention=bot_mention) or raw
         prompt_for_model = _mask_profane(user_prompt) if AGENT_MASK_PROFANITY_TO_MODEL else user_prompt
 
+        # region ISERO PATCH intent-fastpath
+        # köszi / ok / emoji: nincs LLM hívás; aktív ticket sessionben az LLM vezeti a beszélgetést
+        if AGENT_INTENT_FASTPATH and not ctx.is_owner and not self.is_active(message.channel.id):
+            with PERF.stage("intent"):
+                label, conf = get_classifier().classify(user_prompt)
+            if label in SKIP_LABELS and conf >= AGENT_INTENT_MIN_CONF:
+                self.intent_skips[label] = self.intent_skips.get(label, 0) + 1
+                M_FASTPATH.labels(label).inc()
+                if mention or ctx.was_mentioned or ctx.has_wake_word:
+                    canned = canned_reply(label, ctx.locale)
+                    if canned:
+                        await self._safe_send_reply(message, canned)
+                return
+        # endregion ISERO PATCH intent-fastpath
+
         est = approx_token_count(prompt_for_model) + 180
-        if not self._check_and_book_tokens(est):
+        if not await self._book_tokens(est):
             await self._safe_send_reply(message, "A napi AI-keret most elfogyott. Próbáld később.")
             return
 
-        pc = _load_player_card(message.author.id)
+        with PERF.stage("player_card"):
+            pc = await _load_player_card(message.author.id)
         promo_focus = any(
             k in user_prompt.lower() for k in ["mebinu", "ár", "árak", "commission", "nsfw", "vásárl", "ticket"]
         )
@@ -781,26 +962,65 @@ class AgentGate(commands.Cog):
             {"role": "user", "content": prompt_for_model},
         ]
 
-        model = OPENAI_MODEL_HEAVY if (message.author.id == OWNER_ID and self.bot.user and self.bot.user.mentioned_in(message)) else OPENAI_MODEL
+        # region ISERO PATCH model-router
+        owner_mention = bool(message.author.id == OWNER_ID and mention)
+        sess_ctx = self.session_context.get(message.channel.id) or {}
+        route, model, route_score = self.router.choose(
+            force_heavy=owner_mention,
+            prompt_len=len(prompt_for_model),
+            ticket_type=ctx.ticket_type if ctx.is_ticket else None,
+            promo_hits=promo_keyword_hits(user_prompt),
+            turns=int((sess or {}).get("turns", 0)),
+            prefer_heavy=bool(sess_ctx.get("prefer_heavy", False)),
+        )
+        log.debug("route=%s model=%s score=%.2f", route, model, route_score, extra=msg_extra(message))
+
+        # region ISERO PATCH llm-breaker
+        if not self.llm_breaker.allow():
+            # nyitott kör: nincs 30 mp-es várakozás, azonnali helyi válasz
+            await self._refund_tokens(est)
+            M_LLM_CALLS.labels(route, "short_circuit").inc()
+            await self._safe_send_reply(message, self._fallback_reply(user_prompt, ctx))
+            return
+        t0 = time.monotonic()
 
         try:
-            reply = await call_openai_chat(messages, model=model)
+            reply = await call_openai_chat(messages, model=model, timeout_s=AGENT_LLM_TIMEOUT_S)
         except httpx.HTTPError as e:
+            self.router.record(route, time.monotonic() - t0, 0, ok=False)
+            self.llm_breaker.record_failure()
+            M_LLM_CALLS.labels(route, "http_error").inc()
             log.exception("OpenAI hiba: %s", e)
-            await self._safe_send_reply(message, "Most akadozom. Próbáljuk kicsit később.")
+            await self._safe_send_reply(message, self._fallback_reply(user_prompt, ctx))
             return
         except Exception as e:
+            self.router.record(route, time.monotonic() - t0, 0, ok=False)
+            self.llm_breaker.record_failure()
+            M_LLM_CALLS.labels(route, "error").inc()
             log.exception("Váratlan AI hiba: %s", e)
             await self._safe_send_reply(message, "Váratlan hiba. Jelentem a staffnak.")
             return
+        llm_s = time.monotonic() - t0
+        PERF.observe("llm", llm_s)
+        M_LLM_CALLS.labels(route, "ok").inc()
+        self.llm_breaker.record_success(llm_s)
+        # endregion ISERO PATCH llm-breaker
+        self.router.record(
+            route,
+            llm_s,
+            approx_token_count(sys_msg + assistant_rules + prompt_for_model) + approx_token_count(reply or ""),
+        )
+        # endregion ISERO PATCH model-router
 
         reply = sanitize_model_reply(reply)
         reply = truncate_by_chars(reply, soft_cap)
 
         try:
-            await self._safe_send_reply(message, reply)
+            with PERF.stage("send"):
+                await self._safe_send_reply(message, reply)
         except Exception as e:
             log.exception("Küldési hiba: %s", e)
+        PERF.observe("total", time.monotonic() - t_msg)
         # region ISERO PATCH session-caps:count
         self._inc_turn(message.channel.id, len(prompt_for_model or ""), len(reply or ""))
         # endregion
@@ -808,9 +1028,14 @@ class AgentGate(commands.Cog):
 # ---- setup ----
 async def setup(bot: commands.Bot):
     ag = AgentGate(bot)
+    if AGENT_INTENT_FASTPATH:
+        get_classifier()  # betöltés/tanítás most, ne az első üzenetnél
     db_url = os.getenv("DATABASE_URL")
     if db_url:
-        ag.db = PlayerDB(db_url, owner_id=settings.OWNER_ID)
+        # region ISERO PATCH sqlite-backend
+        # sqlite:///… → beágyazott SQLite (PlayerDB + PlayerCard backend)
+        ag.db = make_player_db(db_url, owner_id=settings.OWNER_ID)
+        # endregion
         try:
             await ag.db.start()
         except Exception as e:
@@ -0,0 +1,113 @@
+# cogs/agent/breaker.py
+"""Circuit breaker around the LLM client (closed → open → half-open)."""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+log = logging.getLogger("ISERO.Breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """Opens after ``fail_threshold`` consecutive failures or when the rolling
+    p95 latency exceeds ``latency_budget_s``.  While open every call is
+    refused (callers serve a local fallback); after ``open_seconds`` one probe
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str = "llm",
+        *,
+        fail_threshold: Optional[int] = None,
+        latency_budget_s: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        window: int = 20,
+        min_samples: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.fail_threshold = fail_threshold or int(_env_float("LLM_BREAKER_FAILS", 3))
+        self.latency_budget_s = latency_budget_s or _env_float("LLM_BREAKER_P95_BUDGET_S", 12.0)
+        self.open_seconds = open_seconds or _env_float("LLM_BREAKER_OPEN_SECONDS", 30.0)
+        self.min_samples = min_samples
+        self._clock = clock
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._fails = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None
+        self.trips = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_at = None
+        return self._state
+
+    def allow(self) -> bool:
+        st = self.state
+        if st == CLOSED:
+            return True
+        if st == HALF_OPEN:
+            now = self._clock()
+            # egyszerre egy próba; ha a próba "elveszett", open_seconds után újra engedünk
+            if self._probe_at is None or now - self._probe_at >= self.open_seconds:
+                self._probe_at = now
+                return True
+        self.short_circuited += 1
+        return False
+
+    def p95(self) -> float:
+        if not self._latencies:
+            return 0.0
+        vals = sorted(self._latencies)
+        return vals[min(len(vals) - 1, int(round(0.95 * (len(vals) - 1))))]
+
+    def record_success(self, latency_s: float) -> None:
+        self._fails = 0
+        if self._state == HALF_OPEN:
+            log.info("breaker %s: probe ok (%.2fs) → closed", self.name, latency_s)
+            self._state = CLOSED
+            self._latencies.clear()
+            self._probe_at = None
+        self._latencies.append(latency_s)
+        if len(self._latencies) >= self.min_samples and self.p95() > self.latency_budget_s:
+            self._trip(f"p95 {self.p95():.2f}s > {self.latency_budget_s:.2f}s")
+
+    def record_failure(self) -> None:
+        self._fails += 1
+        if self._state == HALF_OPEN:
+            self._trip("probe failed")
+        elif self._state == CLOSED and self._fails >= self.fail_threshold:
+            self._trip(f"{self._fails} consecutive failures")
+
+    def _trip(self, why: str) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probe_at = None
+        self._latencies.clear()
+        self.trips += 1
+        log.warning("breaker %s OPEN: %s (retry in %.0fs)", self.name, why, self.open_seconds)
+
+    def summary(self) -> str:
+        return (
+            f"breaker {self.name}={self.state} trips={self.trips} "
+            f"short_circuited={self.short_circuited} p95={self.p95():.2f}s"
+        )
@@ -0,0 +1,107 @@
+# cogs/agent/fallback.py
+"""Instant local answers while the LLM circuit is open (KB facts + price quotes)."""
+from __future__ import annotations
+
+import os
+import re
+from typing import Optional
+
+from cogs.utils.sales import calc_images, calc_total
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+# egyszer, importkor: a breaker hibaágán egy rossz ENV érték se dobjon
+MEBINU_PRICES = (_env_float("MEBINU_BASE_PRICE_USD", 30.0), _env_int("MEBINU_BULK_MIN_QTY", 4),
+                 _env_float("MEBINU_BULK_OFF_USD", 5.0))
+IMG_PRICES = (_env_float("IMG_BASE_PRICE_USD", 6.0), _env_int("IMG_BULK_MIN_QTY", 4),
+              _env_float("IMG_BULK_OFF_USD", 1.0))
+VID_PRICES = (_env_float("VID_PRICE_PER_5S_USD", 20.0), _env_int("VID_BULK_MIN_QTY", 4),
+              _env_float("VID_BULK_OFF_USD", 5.0))
+
+_RE_QTY = re.compile(r"\b(\d{1,2})\s*(?:db|darab|pcs?|x|×)?\b", re.IGNORECASE)
+_RE_MEBINU = re.compile(r"mebinu|figur", re.IGNORECASE)
+_RE_IMAGE = re.compile(r"commission|kép|image|rajz|draw", re.IGNORECASE)
+_RE_VIDEO = re.compile(r"vide[oó]", re.IGNORECASE)
+_RE_PRICE = re.compile(r"\bár|price|mennyi|how much|cost|kerül", re.IGNORECASE)
+
+_KB_KEYS = {"mebinu": "mebinu", "commission": "commission", "help": "general", "general": "general", "nsfw": "nsfw"}
+
+
+def _qty(text: str) -> int:
+    m = _RE_QTY.search(text)
+    if m:
+        n = int(m.group(1))
+        if 1 <= n <= 99:
+            return n
+    return 1
+
+
+def _mebinu_quote(text: str) -> str:
+    qty = _qty(text)
+    unit, bulk_min, off_each = MEBINU_PRICES
+    _, disc, total = calc_total(unit, qty, bulk_min, off_each)
+    out = f"Mebinu: {qty}× ${unit:.0f}"
+    if disc > 0:
+        out += f" − ${disc:.0f} kedvezmény"
+    return out + f" = **${total:.2f}** ({bulk_min}+ darabnál −${off_each:.0f}/db)."
+
+
+def _image_quote(text: str) -> str:
+    qty = _qty(text)
+    unit, bulk_min, off = IMG_PRICES
+    _, _, total = calc_images(unit, qty, bulk_min, off)
+    return f"Kép: ${unit:.0f}/db, {bulk_min}+ képnél −${off:.0f}/kép → {qty} db = **${total:.2f}**."
+
+
+def _video_quote() -> str:
+    per5, bulk_min, off = VID_PRICES
+    return f"Videó: ${per5:.0f} / 5 mp blokk, {bulk_min}+ videónál −${off:.0f}/videó."
+
+
+def _kb_section(text: str, ticket_type: Optional[str]) -> str:
+    if ticket_type:
+        return _KB_KEYS.get(ticket_type.lower(), "")
+    if _RE_MEBINU.search(text):
+        return "mebinu"
+    if _RE_IMAGE.search(text) or _RE_VIDEO.search(text):
+        return "commission"
+    return ""
+
+
+def _kb_fact(kb: Optional[dict], section_key: str) -> Optional[str]:
+    section = (kb or {}).get(section_key, {}) or {}
+    facts = section.get("facts")
+    if isinstance(facts, list) and facts:
+        return " ".join(str(f) for f in facts[:2])
+    return None
+
+
+def local_fallback_reply(text: str, *, ticket_type: Optional[str] = None, kb: Optional[dict] = None) -> str:
+    """Build an instant answer without the LLM; never empty."""
+    t = text or ""
+    parts = []
+    if _RE_PRICE.search(t) or ticket_type in {"mebinu", "commission"}:
+        if _RE_MEBINU.search(t) or ticket_type == "mebinu":
+            parts.append(_mebinu_quote(t))
+        if _RE_VIDEO.search(t):
+            parts.append(_video_quote())
+        elif _RE_IMAGE.search(t) or ticket_type == "commission":
+            parts.append(_image_quote(t))
+    fact = _kb_fact(kb, _kb_section(t, ticket_type))
+    if fact and len(parts) < 2:
+        parts.append(fact)
+    parts.append("A részletes válasz kicsit később jön — most gyors módban vagyok.")
+    return " ".join(parts)
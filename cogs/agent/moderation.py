@@ -7,6 +7,7 @@ from typing import Set
 import discord
 
 from .filters import count_profanity
+from cogs.utils.modlog import MODLOG
 
 @dataclass
 class UserState:
@@ -53,12 +54,9 @@ class AutoMod:
     async def _modlog(self, guild: discord.Guild, embed: discord.Embed):
         if not self.modlog_channel_id:
             return
-        ch = guild.get_channel(self.modlog_channel_id)
-        if ch:
-            try:
-                await ch.send(embed=embed)
-            except Exception:
-                pass
+        # region ISERO PATCH modlog-batch
+        MODLOG.post(guild.get_channel(self.modlog_channel_id), embed)
+        # endregion
 
     def _reset_if_needed(self, st: UserState):
         now = datetime.now(timezone.utc)
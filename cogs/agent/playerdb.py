@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from typing import Optional, Tuple, Dict, Any
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Sequence, Tuple, Dict, Any, AsyncIterator
 
 # region ISERO PATCH ticket_session imports
 from dataclasses import dataclass, field
@@ -10,58 +15,112 @@ import datetime
 
 import asyncpg
 
+# region ISERO PATCH signals-partitioning
+from cogs.storage.signals import SCORES_SQL
+# endregion
+# region ISERO PATCH shared-pool
+# egy pool / folyamat: migráció, méretezés, prepared statementek, metrikák (cogs/storage/store.py)
+from cogs.storage.store import connection, execute_hot, get_pool
+# endregion
+from cogs.utils.metrics import REGISTRY
+
 log = logging.getLogger("isero.playerdb")
 
-SCHEMA_SQL = """
-CREATE TABLE IF NOT EXISTS players (
-  user_id     BIGINT PRIMARY KEY,
-  display     TEXT,
-  role        TEXT CHECK (role IN ('owner','staff','user')) DEFAULT 'user',
-  trust       SMALLINT DEFAULT 0,
-  locale      TEXT DEFAULT 'en',
-  style       TEXT DEFAULT 'pro_sarcastic_concise',
-  allow_admin BOOLEAN DEFAULT FALSE,
-  created_at  TIMESTAMPTZ DEFAULT now(),
-  updated_at  TIMESTAMPTZ DEFAULT now()
-);
-
-CREATE TABLE IF NOT EXISTS signals (
-  id         BIGSERIAL PRIMARY KEY,
-  user_id    BIGINT REFERENCES players(user_id),
-  channel_id BIGINT,
-  sentiment  REAL,
-  intent     TEXT,
-  score      SMALLINT,
-  ts         TIMESTAMPTZ DEFAULT now()
-);
-
-CREATE TABLE IF NOT EXISTS briefs (
-  id               BIGSERIAL PRIMARY KEY,
-  user_id          BIGINT REFERENCES players(user_id),
-  ticket_channel_id BIGINT,
-  type             TEXT,
-  goal             TEXT,
-  deadline         TEXT,
-  refs_count       SMALLINT DEFAULT 0,
-  status           TEXT DEFAULT 'open',
-  created_at       TIMESTAMPTZ DEFAULT now(),
-  updated_at       TIMESTAMPTZ DEFAULT now()
-);
+# region ISERO PATCH player-snapshot-cache
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+PLAYER_SNAPSHOT_MAX = _env_int("PLAYER_SNAPSHOT_MAX", 5000)
+PLAYER_SNAPSHOT_FLUSH_S = _env_float("PLAYER_SNAPSHOT_FLUSH_S", 5.0)
+
+M_SNAPSHOT_READS = REGISTRY.counter("isero_player_snapshot_reads_total", "get_snapshot reads by cache result",
+                                    ("result",))
+
+# players.snapshot (JSONB) kötegelt merge-upsert: last_qty / last_style / last_budget …
+SNAPSHOT_UPSERT_SQL = """
+INSERT INTO players(user_id, snapshot)
+SELECT u, s::jsonb FROM unnest($1::bigint[], $2::text[]) AS t(u, s)
+ON CONFLICT (user_id) DO UPDATE SET
+  snapshot = players.snapshot || EXCLUDED.snapshot,
+  updated_at = now()
 """
 
+
+def player_db(bot) -> Optional["PlayerDB"]:
+    """The running PlayerDB (it is not a cog: it lives on ``AgentGate.db``)."""
+    get_cog = getattr(bot, "get_cog", None)
+    ag = get_cog("AgentGate") if get_cog else None
+    return getattr(ag, "db", None)
+# endregion
+
+# region ISERO PATCH xp-engine
+# xp = xp + delta: a klaszter workerei nem írják felül egymást
+XP_UPSERT_SQL = """
+INSERT INTO players(user_id, xp, level)
+SELECT u, x, l FROM unnest($1::bigint[], $2::bigint[], $3::int[]) AS t(u, x, l)
+ON CONFLICT (user_id) DO UPDATE SET
+  xp = players.xp + EXCLUDED.xp,
+  level = GREATEST(players.level, EXCLUDED.level),
+  updated_at = now()
+"""
+# endregion
+
+# region ISERO PATCH leaderboard
+# activity: LangWatch jelzései (intent='other', üzenetenként egy) az utolsó $1 napban
+LEADERBOARD_SQL = """
+WITH a AS (
+  SELECT user_id, count(*) AS n FROM signals
+  WHERE intent = 'other' AND ts > now() - make_interval(days => $1)
+  GROUP BY user_id
+), ids AS (
+  SELECT user_id FROM players UNION SELECT user_id FROM a
+)
+SELECT ids.user_id,
+       COALESCE(p.xp, 0) AS xp,
+       COALESCE(c.marketing_score, 0) AS marketing,
+       COALESCE(a.n, 0) AS activity
+FROM ids
+LEFT JOIN players p ON p.user_id = ids.user_id
+LEFT JOIN player_cards c ON c.user_id = ids.user_id
+LEFT JOIN a ON a.user_id = ids.user_id
+"""
+# endregion
+
+
 class PlayerDB:
     def __init__(self, dsn: str, owner_id: int | None = None):
         self._dsn = dsn
         self._pool: Optional[asyncpg.Pool] = None
         self._owner_id = owner_id
         # region ISERO PATCH in-memory-fallback
-        self._mem: Dict[int, Dict[str, Any]] = {}
+        # LRU hot-set: user_id -> snapshot mezők (players.snapshot JSONB-ből töltve)
+        self._mem: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # endregion
+        # region ISERO PATCH player-snapshot-cache
+        self._snap_dirty: Dict[int, Dict[str, Any]] = {}
+        self._snap_loading: Dict[int, asyncio.Future] = {}
+        # épp íródó mezők: a flush alatt induló betöltés se veszítse el őket
+        self._snap_flushing: Dict[int, Dict[str, Any]] = {}
+        self._snap_flushes = 0  # lezárult flush-ok száma (a betöltés ebből látja, ha lekéste)
+        self._snap_task: Optional[asyncio.Task] = None
         # endregion
 
     async def start(self) -> None:
-        self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=5)
+        # region ISERO PATCH shared-pool
+        self._pool = await get_pool(self._dsn)
+        # endregion
         async with self._pool.acquire() as con:
-            await con.execute(SCHEMA_SQL)
             if self._owner_id:
                 await con.execute(
                     """
@@ -73,19 +132,32 @@ class PlayerDB:
                 )
         log.info("PlayerDB ready")
 
+    @asynccontextmanager
+    async def _conn(self, op: str):
+        """Pooled connection with wait/query timing for /metrics."""
+        assert self._pool
+        async with connection(op) as con:
+            yield con
+
     async def close(self) -> None:
-        if self._pool:
-            await self._pool.close()
-            self._pool = None
+        # region ISERO PATCH player-snapshot-cache
+        if self._snap_task is not None:
+            self._snap_task.cancel()
+            self._snap_task = None
+        if self._snap_dirty and self._pool:
+            await self.flush_snapshots()
+        # endregion
+        # a közös poolt store.close_pool() zárja
+        self._pool = None
 
     async def get_player(self, user_id: int) -> Optional[asyncpg.Record]:
         assert self._pool
-        async with self._pool.acquire() as con:
+        async with self._conn("get_player") as con:
             return await con.fetchrow("SELECT * FROM players WHERE user_id=$1", user_id)
 
     async def set_pref(self, user_id: int, locale: Optional[str], style: Optional[str]) -> None:
         assert self._pool
-        async with self._pool.acquire() as con:
+        async with self._conn("set_pref") as con:
             await con.execute(
                 """
                 INSERT INTO players(user_id, locale, style)
@@ -100,56 +172,183 @@ class PlayerDB:
 
     async def log_signal(self, user_id: int, channel_id: int, sentiment: float, intent: str, score: int) -> None:
         assert self._pool
-        async with self._pool.acquire() as con:
-            await con.execute(
-                "INSERT INTO signals(user_id, channel_id, sentiment, intent, score) VALUES($1,$2,$3,$4,$5)",
-                user_id, channel_id, sentiment, intent, score
-            )
+        await execute_hot("log_signal", user_id, channel_id, sentiment, intent, score)
 
     async def get_scores(self, user_id: int) -> Tuple[float, float]:
         """Return (mood_score, marketing_score)."""
         assert self._pool
-        async with self._pool.acquire() as con:
-            mood = await con.fetchval(
-                "SELECT COALESCE(AVG(sentiment),0) FROM signals WHERE user_id=$1", user_id
-            )
-            marketing = await con.fetchval(
-                "SELECT COALESCE(AVG(score),0) FROM signals WHERE user_id=$1 AND intent='buy'",
-                user_id,
-            )
+        async with self._conn("get_scores") as con:
+            # region ISERO PATCH signals-partitioning
+            # nyers sorok + signal_daily összesítés (a lejárt hónapok is számítanak)
+            row = await con.fetchrow(SCORES_SQL, user_id)
+            mood, marketing = (row["mood"], row["marketing"]) if row else (0.0, 0.0)
+            # endregion
         return float(mood or 0.0), float(marketing or 0.0)
 
     async def allow_admin(self, user_id: int) -> bool:
         assert self._pool
-        async with self._pool.acquire() as con:
+        async with self._conn("allow_admin") as con:
             v = await con.fetchval(
                 "SELECT allow_admin FROM players WHERE user_id=$1", user_id
             )
         return bool(v)
 
+    # region ISERO PATCH bulk-rolesync
+    async def get_levels(self, user_ids: Optional[Sequence[int]] = None) -> Dict[int, int]:
+        """``user_id → players.level`` in one query (all players when ``user_ids`` is None)."""
+        assert self._pool
+        async with self._conn("get_levels") as con:
+            if user_ids is None:
+                rows = await con.fetch("SELECT user_id, level FROM players")
+            else:
+                rows = await con.fetch(
+                    "SELECT user_id, level FROM players WHERE user_id = ANY($1::bigint[])", list(user_ids))
+        return {r["user_id"]: int(r["level"] or 0) for r in rows}
+    # endregion
+
+    # region ISERO PATCH xp-engine
+    async def get_xp(self) -> Dict[int, int]:
+        """``user_id → players.xp`` for every player with XP (startup load)."""
+        assert self._pool
+        async with self._conn("get_xp") as con:
+            rows = await con.fetch("SELECT user_id, xp FROM players WHERE xp > 0")
+        return {r["user_id"]: int(r["xp"]) for r in rows}
+
+    async def add_xp(self, batch: Dict[int, Tuple[int, int]]) -> None:
+        """``{user_id: (xp_delta, level)}`` in one upsert (deltas add up across workers)."""
+        assert self._pool
+        uids = sorted(batch)
+        async with self._conn("add_xp") as con:
+            await con.execute(XP_UPSERT_SQL, uids, [batch[u][0] for u in uids], [batch[u][1] for u in uids])
+    # endregion
+
+    # region ISERO PATCH leaderboard
+    async def iter_leaderboard(self, activity_days: int, prefetch: int = 1000
+                               ) -> AsyncIterator[Tuple[int, int, int, int]]:
+        """``(user_id, xp, marketing_score, activity)`` rows through one server-side cursor."""
+        assert self._pool
+        async with self._conn("iter_leaderboard") as con:
+            async with con.transaction():
+                async for r in con.cursor(LEADERBOARD_SQL, activity_days, prefetch=prefetch):
+                    yield r["user_id"], int(r["xp"]), int(r["marketing"]), int(r["activity"])
+    # endregion
+
     # region ISERO PATCH player-snapshot-api
     def get_snapshot(self, user_id: int) -> Dict[str, Any]:
-        """Gyors olvasás a sales/agent komponenseknek (blocking)."""
+        """Gyors olvasás a sales/agent komponenseknek (blocking, O(1)).
+
+        Miss esetén a háttérben betölti a ``players.snapshot`` oszlopot; a
+        hívó addig az eddig ismert (esetleg üres) mezőket kapja.
+        """
         try:
-            return dict(self._mem.get(user_id) or {})
+            snap = self._mem.get(user_id)
+            if snap is None:
+                M_SNAPSHOT_READS.labels("miss").inc()
+                self.prewarm_snapshot(user_id)
+                return dict(self._snap_dirty.get(user_id) or {})
+            M_SNAPSHOT_READS.labels("hit").inc()
+            self._mem.move_to_end(user_id)
+            return dict(snap)
         except Exception:
             return {}
 
+    async def fetch_snapshot(self, user_id: int) -> Dict[str, Any]:
+        """Mint ``get_snapshot``, de miss esetén megvárja a betöltést."""
+        if user_id not in self._mem and self._pool:
+            try:
+                await asyncio.shield(self._start_snapshot_load(user_id))
+            except Exception as e:
+                log.debug("snapshot load failed: %s", e)
+        return self.get_snapshot(user_id)
+
+    def prewarm_snapshot(self, user_id: int) -> None:
+        if not self._pool or user_id in self._mem or user_id in self._snap_loading:
+            return
+        try:
+            fut = self._start_snapshot_load(user_id)
+        except RuntimeError:
+            return  # nincs futó loop
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def _start_snapshot_load(self, user_id: int) -> asyncio.Future:
+        fut = self._snap_loading.get(user_id)
+        if fut is None or fut.done():  # a kész future-t a done-callback csak később veszi ki
+            fut = self._snap_loading[user_id] = asyncio.ensure_future(self._load_snapshot(user_id))
+            fut.add_done_callback(lambda f, uid=user_id: self._snap_loading.get(uid) is f
+                                  and self._snap_loading.pop(uid))
+        return fut
+
+    async def _read_snapshot(self, user_id: int) -> Dict[str, Any]:
+        async with self._conn("get_snapshot") as con:
+            raw = await con.fetchval("SELECT snapshot FROM players WHERE user_id=$1", user_id)
+        return json.loads(raw) if isinstance(raw, str) else dict(raw or {})
+
+    async def _load_snapshot(self, user_id: int) -> None:
+        while True:
+            flushes = self._snap_flushes
+            snap = await self._read_snapshot(user_id)
+            # olvasás közben lezárult flush: a mezői már nincsenek a _snap_flushing-ben,
+            # és az olvasás megelőzhette az írást -> újraolvassuk
+            if flushes == self._snap_flushes:
+                break
+        # a betöltés alatt jött (még nem írt / épp íródó) mezők az újabbak
+        snap.update(self._snap_flushing.get(user_id) or {})
+        snap.update(self._mem.get(user_id) or {})
+        snap.update(self._snap_dirty.get(user_id) or {})
+        self._remember_snapshot(user_id, snap)
+
+    def _remember_snapshot(self, user_id: int, snap: Dict[str, Any]) -> None:
+        self._mem[user_id] = snap
+        self._mem.move_to_end(user_id)
+        while len(self._mem) > PLAYER_SNAPSHOT_MAX:
+            self._mem.popitem(last=False)  # a függő írás a _snap_dirty-ben marad
+
     async def set_fields(self, user_id: int, **fields: Any) -> None:
-        """Memóriába ír, opcionálisan DB-be is."""
-        base = self._mem.get(user_id) or {}
-        base.update(fields)
-        self._mem[user_id] = base
+        """Memóriába ír; a DB-be kötegelve kerül (PLAYER_SNAPSHOT_FLUSH_S)."""
+        snap = self._mem.get(user_id)
+        if snap is not None:
+            snap.update(fields)
+            self._mem.move_to_end(user_id)
+        elif not self._pool:
+            self._remember_snapshot(user_id, dict(fields))
         if not self._pool:
             return
+        self._snap_dirty.setdefault(user_id, {}).update(fields)
+        if snap is None:
+            self.prewarm_snapshot(user_id)
+        if self._snap_task is None or self._snap_task.done():
+            self._snap_task = asyncio.get_running_loop().create_task(
+                self._snapshot_flusher(), name="isero: snapshot-flush")
+
+    async def _snapshot_flusher(self) -> None:
+        while self._snap_dirty:
+            await asyncio.sleep(PLAYER_SNAPSHOT_FLUSH_S)
+            try:
+                await self.flush_snapshots()
+            except Exception as e:
+                log.warning("snapshot flush failed: %s", e)
+
+    async def flush_snapshots(self) -> int:
+        """One merge-upsert for every dirty snapshot; returns rows written."""
+        dirty, self._snap_dirty = self._snap_dirty, {}
+        if not dirty:
+            return 0
+        self._snap_flushing = dirty
         try:
-            async with self._pool.acquire() as con:
-                await con.execute(
-                    "INSERT INTO players(user_id) VALUES($1) ON CONFLICT (user_id) DO NOTHING",
-                    user_id,
-                )
-        except Exception:
-            pass
+            await self._write_snapshots(dirty)
+        except BaseException:
+            for uid, fields in dirty.items():  # újabb írások felülírják a régieket
+                self._snap_dirty[uid] = {**fields, **self._snap_dirty.get(uid, {})}
+            raise
+        finally:
+            self._snap_flushing = {}
+            self._snap_flushes += 1
+        return len(dirty)
+
+    async def _write_snapshots(self, dirty: Dict[int, Dict[str, Any]]) -> None:
+        uids = sorted(dirty)
+        async with self._conn("flush_snapshots") as con:
+            await con.execute(SNAPSHOT_UPSERT_SQL, uids, [json.dumps(dirty[u]) for u in uids])
     # endregion
 
 # region ISERO PATCH ticket_session
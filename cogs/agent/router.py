@@ -0,0 +1,121 @@
+# cogs/agent/router.py
+"""Mini vs heavy model routing by predicted request difficulty."""
+from __future__ import annotations
+
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+ROUTE_MINI = "mini"
+ROUTE_HEAVY = "heavy"
+
+# sales/értékesítési ticketekben drágább egy rossz válasz
+_TICKET_WEIGHT = {"commission": 0.2, "mebinu": 0.2, "nsfw": 0.1, "help": 0.05, "general": 0.05}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    errors: int = 0
+    tokens: int = 0
+    cost_usd: float = 0.0
+    latency_total_s: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        vals = sorted(self.recent)
+        idx = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+        return vals[idx]
+
+
+class ModelRouter:
+    """Scores each request and sends it to ``OPENAI_MODEL`` unless it looks hard.
+
+    Features: prompt length, ticket type, promo keyword hits (the same list
+    ``decide_length_bounds`` uses), session turn count and the session's
+    ``prefer_heavy`` hint.  Score >= ``threshold`` escalates to the heavy model.
+    """
+
+    def __init__(
+        self,
+        mini_model: str,
+        heavy_model: str,
+        *,
+        threshold: Optional[float] = None,
+        cost_mini_per_1k: Optional[float] = None,
+        cost_heavy_per_1k: Optional[float] = None,
+    ):
+        self.models = {ROUTE_MINI: mini_model, ROUTE_HEAVY: heavy_model}
+        self.threshold = threshold if threshold is not None else _env_float("ROUTER_HEAVY_THRESHOLD", 0.6)
+        self.cost_per_1k = {
+            ROUTE_MINI: cost_mini_per_1k if cost_mini_per_1k is not None else _env_float("ROUTER_COST_MINI_PER_1K", 0.0006),
+            ROUTE_HEAVY: cost_heavy_per_1k if cost_heavy_per_1k is not None else _env_float("ROUTER_COST_HEAVY_PER_1K", 0.01),
+        }
+        self.stats: Dict[str, RouteStats] = {ROUTE_MINI: RouteStats(), ROUTE_HEAVY: RouteStats()}
+
+    @staticmethod
+    def score(
+        *,
+        prompt_len: int,
+        ticket_type: Optional[str] = None,
+        promo_hits: int = 0,
+        turns: int = 0,
+        prefer_heavy: bool = False,
+    ) -> float:
+        s = 0.35 * min(1.0, max(0, prompt_len) / 600)
+        s += _TICKET_WEIGHT.get((ticket_type or "").lower(), 0.0)
+        s += 0.1 * min(3, max(0, promo_hits))
+        if turns >= 4:
+            s += 0.1
+        if prefer_heavy:
+            s += 0.15
+        return round(min(1.0, s), 4)
+
+    def choose(self, *, force_heavy: bool = False, **features) -> Tuple[str, str, float]:
+        """Return ``(route, model, score)``."""
+        sc = 1.0 if force_heavy else self.score(**features)
+        route = ROUTE_HEAVY if sc >= self.threshold else ROUTE_MINI
+        return route, self.models[route], sc
+
+    def record(self, route: str, latency_s: float, tokens: int, ok: bool = True) -> None:
+        st = self.stats[route]
+        st.calls += 1
+        if not ok:
+            st.errors += 1
+            return
+        st.latency_total_s += latency_s
+        st.recent.append(latency_s)
+        st.tokens += tokens
+        st.cost_usd += tokens / 1000 * self.cost_per_1k[route]
+
+    def snapshot(self) -> Dict[str, dict]:
+        out = {}
+        for route, st in self.stats.items():
+            out[route] = {
+                "model": self.models[route],
+                "calls": st.calls,
+                "errors": st.errors,
+                "tokens": st.tokens,
+                "cost_usd": round(st.cost_usd, 4),
+                "p50_s": round(st.percentile(0.5), 3),
+                "p95_s": round(st.percentile(0.95), 3),
+            }
+        return out
+
+    def summary(self) -> str:
+        parts = []
+        for route, d in self.snapshot().items():
+            parts.append(
+                f"{route}={d['calls']}/{d['errors']}err p50={d['p50_s']}s p95={d['p95_s']}s ${d['cost_usd']}"
+            )
+        return "router " + " ".join(parts)
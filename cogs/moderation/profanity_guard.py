@@ -8,6 +8,9 @@ from typing import List
 import discord
 from discord.ext import commands
 
+from cogs.utils.modlog import MODLOG
+from cogs.utils.outbound import OUTBOUND, Prio
+
 def _env_int(key: str, default: int) -> int:
     try:
         return int(os.getenv(key, str(default)))
@@ -70,7 +73,7 @@ class ProfanityGuard(commands.Cog):
 
         # törlés + repost csillagozva (ha engedve)
         try:
-            await message.delete()
+            await OUTBOUND.run(message.channel.id, Prio.MODERATION, message.delete, route="delete")
         except discord.Forbidden:
             pass
         masked = _star_text(message.content)
@@ -158,10 +161,9 @@ class ProfanityGuard(commands.Cog):
             em.add_field(name="Action", value=action, inline=True)
         em.add_field(name="Original (masked)", value=masked[:1024], inline=False)
         em.timestamp = dt.datetime.utcnow()
-        try:
-            await ch.send(embed=em)
-        except Exception:
-            pass
+        # region ISERO PATCH modlog-batch
+        MODLOG.post(ch, em)
+        # endregion
 
     async def _get_or_create_webhook(self, channel: discord.TextChannel) -> discord.Webhook:
         hooks = await channel.webhooks()
@@ -0,0 +1,240 @@
+# cogs/ranks/leaderboard.py
+"""``/leaderboard`` (XP, marketing, activity) from in-memory top-K lists.
+
+* :class:`TopK` keeps the full ``user_id → score`` map plus the best
+  ``2 * LEADERBOARD_K`` entries in a sorted list; an update outside the list
+  is one dict write and one tuple compare, a query is a slice (O(K));
+* incremental updates: ``XP.award`` (absolute XP), ``CARDS.bump_marketing``
+  (clamped 0..100 delta) and LangWatch (activity +1 per logged message);
+* startup and every ``LEADERBOARD_RECONCILE_S``: one streaming cursor over
+  players / player_cards / signals (``PlayerDB.iter_leaderboard``) rebuilds
+  all three lists; this also expires old activity and syncs cluster workers
+  (the XP engine's totals included, see ``XpEngine.refresh``).
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import logging
+import os
+from typing import Dict, List, Literal, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.config import GUILD_ID
+from cogs.agent.playerdb import player_db
+from cogs.ranks.xp import XP
+from cogs.storage.playercard import CARDS
+from cogs.utils.metrics import REGISTRY
+
+log = logging.getLogger("ISERO.Leaderboard")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+LEADERBOARD_K = _env_int("LEADERBOARD_K", 100)
+LEADERBOARD_PAGE = _env_int("LEADERBOARD_PAGE", 10)
+LEADERBOARD_RECONCILE_S = _env_float("LEADERBOARD_RECONCILE_S", 900.0)
+LEADERBOARD_ACTIVITY_DAYS = _env_int("LEADERBOARD_ACTIVITY_DAYS", 30)
+
+M_REBUILD = REGISTRY.histogram("isero_leaderboard_rebuild_seconds", "Leaderboard rebuild (streaming cursor) time")
+M_REFILL = REGISTRY.counter("isero_leaderboard_refill_total", "Top lists refilled from the full score map")
+
+if GUILD_ID:
+    _guilds = app_commands.guilds(discord.Object(id=GUILD_ID))
+else:
+    def _guilds(func):
+        return func
+
+
+class TopK:
+    """Best ``k`` of a score map; every user outside ``_top`` scores ≤ its last entry."""
+
+    def __init__(self, k: int = LEADERBOARD_K):
+        self.k = k
+        self.cap = 2 * k  # tartalék: a leeső tagok helyére ne kelljen rögtön újraépíteni
+        self.ready = False
+        self.scores: Dict[int, float] = {}
+        self._top: List[Tuple[float, int]] = []  # (-score, user_id), legjobb elöl
+        self._in: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return min(self.k, len(self._top))
+
+    def set(self, user_id: int, score: float) -> None:
+        self.scores[user_id] = score
+        old = self._in.pop(user_id, None)
+        if old is not None:
+            del self._top[bisect.bisect_left(self._top, (-old, user_id))]
+        entry = (-score, user_id)
+        if len(self._top) >= len(self.scores) - 1 or (self._top and entry <= self._top[-1]):
+            bisect.insort(self._top, entry)
+            self._in[user_id] = score
+            if len(self._top) > self.cap:
+                _, dropped = self._top.pop()
+                del self._in[dropped]
+        if len(self._top) < self.k and len(self._top) < len(self.scores):
+            self._refill()
+
+    def add(self, user_id: int, delta: float, lo: Optional[float] = None, hi: Optional[float] = None) -> None:
+        """Delta on the known score; ignored until the first :meth:`rebuild`."""
+        if not self.ready:
+            return
+        score = self.scores.get(user_id, 0) + delta
+        if lo is not None:
+            score = max(lo, score)
+        if hi is not None:
+            score = min(hi, score)
+        self.set(user_id, score)
+
+    def rebuild(self, scores: Dict[int, float]) -> None:
+        self.scores = scores
+        self._refill()
+        self.ready = True
+
+    def _refill(self) -> None:
+        M_REFILL.inc()
+        self._top = heapq.nsmallest(self.cap, ((-s, u) for u, s in self.scores.items()))
+        self._in = {u: -s for s, u in self._top}
+
+    def page(self, offset: int, n: int) -> List[Tuple[int, int, float]]:
+        """``(rank, user_id, score)`` rows; ranks start at 1."""
+        end = min(offset + n, self.k)
+        return [(offset + i + 1, u, -s) for i, (s, u) in enumerate(self._top[offset:end])]
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        score = self._in.get(user_id)
+        if score is None:
+            return None
+        rank = bisect.bisect_left(self._top, (-score, user_id)) + 1
+        return rank if rank <= self.k else None
+
+
+BOARDS: Dict[str, TopK] = {"xp": TopK(), "marketing": TopK(), "activity": TopK()}
+TITLES = {"xp": "XP", "marketing": "Marketing score", "activity": f"Aktivitás ({LEADERBOARD_ACTIVITY_DAYS} nap)"}
+
+
+async def rebuild(db, boards: Dict[str, TopK] = BOARDS) -> int:
+    """One streaming pass → all boards; returns rows read."""
+    xp: Dict[int, float] = {}
+    marketing: Dict[int, float] = {}
+    activity: Dict[int, float] = {}
+    n = 0
+    with M_REBUILD.time():
+        async for user_id, x, m, a in db.iter_leaderboard(LEADERBOARD_ACTIVITY_DAYS):
+            n += 1
+            if x:
+                xp[user_id] = x
+            if m:
+                marketing[user_id] = m
+            if a:
+                activity[user_id] = a
+        if XP.ready:
+            # a DB az összes worker flush-olt XP-je; csak a saját, még nem írt delta kerül rá,
+            # és a !rank / szintlépés is ebből frissül
+            xp = XP.refresh(xp)
+        boards["xp"].rebuild(xp)
+        boards["marketing"].rebuild(marketing)
+        boards["activity"].rebuild(activity)
+    return n
+
+
+def page_count(board: TopK) -> int:
+    return max(1, -(-len(board) // LEADERBOARD_PAGE))
+
+
+def page_embed(name: str, page: int, viewer_id: int) -> discord.Embed:
+    board = BOARDS[name]
+    rows = board.page(page * LEADERBOARD_PAGE, LEADERBOARD_PAGE)
+    lines = [f"`#{rank:>3}` <@{uid}> — **{score:g}**" for rank, uid, score in rows]
+    embed = discord.Embed(title=f"Ranglista · {TITLES[name]}",
+                          description="\n".join(lines) or "(még nincs adat)")
+    own = board.rank_of(viewer_id)
+    footer = f"Oldal {page + 1}/{page_count(board)}"
+    if own is not None:
+        footer += f" · a helyezésed: #{own}"
+    embed.set_footer(text=footer)
+    return embed
+
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, name: str, owner_id: int):
+        super().__init__(timeout=300)
+        self.name = name
+        self.owner_id = owner_id
+        self.page = 0
+
+    async def _show(self, interaction: discord.Interaction, step: int) -> None:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.defer()
+            return
+        self.page = (self.page + step) % page_count(BOARDS[self.name])
+        await interaction.response.edit_message(embed=page_embed(self.name, self.page, self.owner_id), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._show(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._show(interaction, 1)
+
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        XP.board = BOARDS["xp"]
+        CARDS.marketing_board = BOARDS["marketing"]
+        if player_db(self.bot) is None:
+            for board in BOARDS.values():
+                board.rebuild({})  # DB nélkül csak a memóriában gyűlik
+            return
+        self._task = asyncio.create_task(self._loop(), name="isero: leaderboard")
+
+    async def cog_unload(self):
+        XP.board = None
+        CARDS.marketing_board = None
+        if self._task:
+            self._task.cancel()
+
+    async def _loop(self):
+        while True:
+            db = player_db(self.bot)
+            try:
+                if db is not None:
+                    n = await rebuild(db)
+                    log.debug("leaderboard rebuilt from %d rows", n)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("leaderboard rebuild failed: %s", e)
+            await asyncio.sleep(LEADERBOARD_RECONCILE_S)
+
+    @app_commands.command(name="leaderboard", description="Ranglista: XP, marketing vagy aktivitás")
+    @_guilds
+    async def leaderboard(self, interaction: discord.Interaction,
+                          board: Literal["xp", "marketing", "activity"] = "xp") -> None:
+        view = LeaderboardView(board, interaction.user.id)
+        await interaction.response.send_message(embed=page_embed(board, 0, interaction.user.id), view=view)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Leaderboard(bot))
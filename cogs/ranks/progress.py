@@ -1,14 +1,78 @@
 FEATURE_NAME = "ranks"
+import asyncio
+import logging
+
+import discord
 from discord.ext import commands
 
+from cogs.agent.playerdb import player_db
+from cogs.ranks.xp import XP
+
+log = logging.getLogger("ISERO.Ranks")
+
+BAR_WIDTH = 20
+LOAD_RETRY_S = 5.0
+LOAD_RETRY_MAX_S = 300.0
+
+
+def progress_bar(xp: int, lo: int, hi: int, width: int = BAR_WIDTH) -> str:
+    filled = width if hi <= lo else int(width * (xp - lo) / (hi - lo))
+    filled = max(0, min(width, filled))
+    return "[" + "#" * filled + "-" * (width - filled) + "]"
+
+
 async def setup(bot):
     await bot.add_cog(RankProgress(bot))
 
+
 class RankProgress(commands.Cog):
+    """Per-message XP (cooldown) → ``XP`` engine; ``!rank`` reads memory only."""
+
     def __init__(self, bot):
         self.bot = bot
+        self._load_task = None
+
+    async def cog_load(self):
+        # az AgentGate (PlayerDB) előbb töltődik be
+        XP.db = player_db(self.bot)
+        if XP.db is None:
+            XP.ready = True  # DB nélkül csak memóriában számolunk
+            return
+        self._load_task = asyncio.create_task(self._load(), name="isero: xp-load")
+
+    async def _load(self):
+        # üres összegekkel nem indulunk: a !rank és a szintlépés is hamis lenne
+        delay = LOAD_RETRY_S
+        while True:
+            try:
+                totals = await XP.db.get_xp()
+                break
+            except Exception as e:
+                log.warning("xp load failed, retrying in %.0fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, LOAD_RETRY_MAX_S)
+        XP.load(totals)
+        log.info("xp engine ready: %d players", len(XP.xp))
+
+    async def cog_unload(self):
+        if self._load_task:
+            self._load_task.cancel()
+        try:
+            await XP.close()
+        except Exception as e:
+            log.warning("xp flush on unload failed: %s", e)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or not message.guild:
+            return
+        level = XP.award(message.author.id)
+        if level is not None:
+            self.bot.dispatch("isero_level_up", message.author, level)
 
     @commands.command(name="rank")
-    async def rank(self, ctx: commands.Context):
-        bar = "[##########----------]"  # demo only
-        await ctx.send(f"Your rank progress: {bar}")
+    async def rank(self, ctx: commands.Context, member: discord.Member = None):
+        member = member or ctx.author
+        level, xp, lo, hi = XP.progress(member.id)
+        bar = progress_bar(xp, lo, hi)
+        await ctx.send(f"{member.display_name} — level {level}: {bar} {xp - lo}/{hi - lo} XP")
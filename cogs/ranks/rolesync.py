@@ -1,66 +1,252 @@
-FEATURE_NAME = "ranks"
-from discord.ext import commands
+# cogs/ranks/rolesync.py
+"""Level → role reconciliation for whole guilds.
+
+* ``LEVEL_ROLE_IDS="threshold:role_id,…"``: a member holds exactly the role of
+  the highest threshold ≤ their ``players.level`` (none below the lowest);
+* one pass per guild: every level in one query (``PlayerDB.get_levels``), the
+  diff runs against the gateway's cached member roles, and only members whose
+  level roles differ get **one** ``member.edit(roles=…)`` call, whose role
+  list is built when the edit is sent (roles given or taken meanwhile stay);
+* the edits go through ``OUTBOUND`` (route ``member``, ``Prio.CLEANUP``), so
+  they wait for the guild's rate-limit bucket and never crowd out replies;
+* full pass every ``ROLESYNC_INTERVAL_S`` (DB levels overlaid with the XP
+  engine's unflushed ones); between passes ``XP`` level-ups arrive as
+  ``bot.dispatch("isero_level_up", member, level)`` and queue one member.
+
+Members without a ``players`` row are left alone (manually given roles stay).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
 import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 import discord
+from discord.ext import commands
+
+from cogs.agent.playerdb import player_db
+from cogs.ranks.xp import XP, parse_level_roles
+from cogs.utils.guildstate import GUILDS
+from cogs.utils.metrics import REGISTRY
+from cogs.utils.outbound import OUTBOUND, OutboundDropped, Prio
+
+FEATURE_NAME = "ranks"
+
+log = logging.getLogger("ISERO.RoleSync")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+ROLESYNC_INTERVAL_S = _env_float("ROLESYNC_INTERVAL_S", 3600.0)
+# level-up események összevárása egy körbe
+ROLESYNC_DEBOUNCE_S = _env_float("ROLESYNC_DEBOUNCE_S", 2.0)
+
+M_EDITS = REGISTRY.counter("isero_rolesync_edits_total", "Member role edits by result", ("result",))
+M_UNCHANGED = REGISTRY.counter("isero_rolesync_unchanged_total", "Members already holding the right level role")
+
+# (user_id, hozzáadandó, elveendő szerepkör ID-k)
+Edit = Tuple[int, Set[int], Set[int]]
+
+
+def target_role(level: int, level_roles: Dict[int, int]) -> Optional[int]:
+    target = None
+    for threshold, role_id in sorted(level_roles.items()):
+        if level >= threshold:
+            target = role_id
+    return target
+
+
+def plan_edit(role_ids: Set[int], level: int, level_roles: Dict[int, int]) -> Optional[Tuple[Set[int], Set[int]]]:
+    """``(add, remove)`` for one member, or None when nothing changes."""
+    have = role_ids & set(level_roles.values())
+    target = target_role(level, level_roles)
+    want = {target} if target is not None else set()
+    if have == want:
+        return None
+    return want - have, have - want
+
+
+def plan_guild(members: Iterable[Tuple[int, Set[int]]], levels: Dict[int, int],
+               level_roles: Dict[int, int]) -> Tuple[List[Edit], int]:
+    """Edits for every member with a known level; returns ``(edits, unchanged)``."""
+    edits: List[Edit] = []
+    unchanged = 0
+    for user_id, role_ids in members:
+        level = levels.get(user_id)
+        if level is None:
+            continue
+        diff = plan_edit(role_ids, level, level_roles)
+        if diff is None:
+            unchanged += 1
+        else:
+            edits.append((user_id, *diff))
+    return edits, unchanged
+
 
 async def setup(bot):
     await bot.add_cog(RoleSync(bot))
 
+
 class RoleSync(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # parse role mapping from environment variable LEVEL_ROLE_IDS
-        # expected format: "threshold:role_id,threshold2:role_id2"
-        mapping_str = os.getenv("LEVEL_ROLE_IDS", "")
-        self.level_roles = {}
-        for part in mapping_str.split(","):
-            if ":" in part:
-                threshold, role_id = part.split(":", 1)
+        self.level_roles = parse_level_roles(os.getenv("LEVEL_ROLE_IDS", ""))
+        # (guild_id, user_id) → level: level-up események a következő körre
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._pending_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        if self.level_roles:
+            self._task = asyncio.create_task(self._loop(), name="isero: rolesync")
+
+    async def cog_unload(self):
+        for task in (self._task, self._pending_task):
+            if task:
+                task.cancel()
+
+    # ---- edits ----
+    async def _apply(self, member: discord.Member, add: Set[int], remove: Set[int]) -> bool:
+        guild = member.guild
+
+        def edit():
+            # a lista a küldéskor épül a cache-elt tagból: a sorban állás közben
+            # kapott/elvett (nem szint-) szerepeket nem írjuk vissza
+            current = guild.get_member(member.id) or member
+            roles = [r for r in current.roles if not r.is_default() and r.id not in remove]
+            have = {r.id for r in roles}
+            roles += [r for r in (guild.get_role(rid) for rid in add if rid not in have) if r is not None]
+            return current.edit(roles=roles, reason="Sync roles based on level")
+
+        try:
+            await OUTBOUND.run(guild.id, Prio.CLEANUP, edit, route="member")
+        except OutboundDropped:
+            M_EDITS.labels("dropped").inc()
+            raise
+        except discord.HTTPException as e:
+            M_EDITS.labels("failed").inc()
+            log.warning("role sync failed for %s: %s", member.id, e)
+            return False
+        M_EDITS.labels("ok").inc()
+        return True
+
+    async def _run_edits(self, guild: discord.Guild, edits: List[Edit]) -> int:
+        done = 0
+        for i, (user_id, add, remove) in enumerate(edits):
+            member = guild.get_member(user_id)
+            if member is None:
+                continue
+            try:
+                done += await self._apply(member, add, remove)
+            except OutboundDropped:
+                # telített kimenő sor: a maradékot a következő kör pótolja
+                log.info("role sync in %s paused: outbound saturated (%d left)", guild.id, len(edits) - i)
+                break
+        return done
+
+    async def sync_guild(self, guild: discord.Guild) -> Tuple[int, int]:
+        """One reconciliation pass; returns ``(edited, unchanged)``."""
+        db = player_db(self.bot)
+        if db is None or not self.level_roles:
+            return 0, 0
+        levels = await db.get_levels()
+        # a DB szint GREATEST-tel nő, a worker memóriája lehet régebbi: a nagyobb nyer
+        for user_id, lvl in XP.levels.items():
+            levels[user_id] = max(levels.get(user_id, 0), lvl)
+        members = ((m.id, {r.id for r in m.roles}) for m in guild.members if not m.bot)
+        edits, unchanged = plan_guild(members, levels, self.level_roles)
+        M_UNCHANGED.inc(unchanged)
+        edited = await self._run_edits(guild, edits)
+        if edits:
+            log.info("role sync %s: %d edited, %d unchanged", guild.id, edited, unchanged)
+        return edited, unchanged
+
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            for guild in list(self.bot.guilds):
+                if not GUILDS.owns(guild.id):
+                    continue  # a guild shardját futtató folyamat szinkronizálja
                 try:
-                    self.level_roles[int(threshold.strip())] = int(role_id.strip())
-                except ValueError:
+                    await self.sync_guild(guild)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("role sync failed for guild %s: %s", guild.id, e)
+            await asyncio.sleep(ROLESYNC_INTERVAL_S)
+
+    # ---- level-up események ----
+    def request_sync(self, member: discord.Member, level: int) -> None:
+        """Queue one member (level already known, no DB read)."""
+        if not self.level_roles or member.bot or not GUILDS.owns(member.guild.id):
+            return
+        self._pending[(member.guild.id, member.id)] = level
+        if self._pending_task is None or self._pending_task.done():
+            self._pending_task = asyncio.get_running_loop().create_task(
+                self._drain_pending(), name="isero: rolesync-levelup")
+
+    async def _drain_pending(self) -> None:
+        while self._pending:
+            await asyncio.sleep(ROLESYNC_DEBOUNCE_S)
+            pending, self._pending = self._pending, {}
+            by_guild: Dict[int, Dict[int, int]] = {}
+            for (guild_id, user_id), level in pending.items():
+                by_guild.setdefault(guild_id, {})[user_id] = level
+            for guild_id, levels in by_guild.items():
+                guild = self.bot.get_guild(guild_id)
+                if guild is None:
                     continue
+                members = ((m.id, {r.id for r in m.roles})
+                           for m in map(guild.get_member, levels) if m is not None)
+                edits, _ = plan_guild(members, levels, self.level_roles)
+                try:
+                    await self._run_edits(guild, edits)
+                except Exception as e:
+                    log.warning("level-up role sync failed for guild %s: %s", guild_id, e)
 
+    @commands.Cog.listener()
+    async def on_isero_level_up(self, member: discord.Member, level: int):
+        self.request_sync(member, level)
+
+    # ---- parancsok ----
     @commands.command(name="syncroles")
     async def sync_roles(self, ctx, member: discord.Member = None):
         """Synchronize roles for a member based on their level."""
         member = member or ctx.author
-        # get AgentGate cog to access the database
-        ag = self.bot.get_cog("AgentGate")
-        db = getattr(ag, "db", None) if ag else None
+        db = player_db(self.bot)
         if db is None:
             await ctx.send("AgentGate DB is not available.")
             return
-        try:
-            card = await db.get_card(member.id)
-        except Exception:
-            await db.ensure_player(member.id)
-            card = await db.get_card(member.id)
-        tokens = getattr(card, "tokens_total", 0)
-        tokens_per_rank = 20
-        ranks_per_level = 20
-        level = tokens // (tokens_per_rank * ranks_per_level)
-        # Determine the appropriate role for this level
-        target_role_id = None
-        for threshold, role_id in sorted(self.level_roles.items()):
-            if level >= threshold:
-                target_role_id = role_id
-        if not target_role_id:
+        if not self.level_roles:
             await ctx.send("No role mapping configured for this level.")
             return
-        guild = ctx.guild
-        target_role = guild.get_role(target_role_id)
-        if target_role is None:
-            await ctx.send("Configured role ID not found in guild.")
-            return
-        # Assign target role and remove other level roles
-        roles_to_remove = []
-        for rid in self.level_roles.values():
-            if rid != target_role_id and member.get_role(rid):
-                role = guild.get_role(rid)
-                if role:
-                    roles_to_remove.append(role)
-        await member.add_roles(target_role, reason="Sync roles based on level")
-        if roles_to_remove:
-            await member.remove_roles(*roles_to_remove, reason="Sync roles based on level")
+        levels = await db.get_levels([member.id])
+        # a még nem flush-olt szintlépés a memóriában, más workeré a DB-ben: a nagyobb nyer
+        level = max(levels.get(member.id, 0), XP.levels.get(member.id, 0))
+        diff = plan_edit({r.id for r in member.roles}, level, self.level_roles)
+        if diff is not None:
+            missing = [rid for rid in diff[0] if ctx.guild.get_role(rid) is None]
+            if missing:
+                await ctx.send("Configured role ID not found in guild.")
+                return
+            try:
+                await self._apply(member, *diff)
+            except OutboundDropped:
+                await ctx.send("A kimenő sor most telített, próbáld újra később.")
+                return
         await ctx.send(f"Synchronized roles for {member.display_name} to level {level}.")
+
+    @commands.command(name="syncallroles")
+    async def sync_all_roles(self, ctx):
+        """Reconcile level roles for the whole guild (Manage Roles)."""
+        if not ctx.author.guild_permissions.manage_roles:
+            await ctx.send("Ehhez Manage Roles jogosultság kell.")
+            return
+        edited, unchanged = await self.sync_guild(ctx.guild)
+        await ctx.send(f"Role sync kész: {edited} módosítva, {unchanged} változatlan.")
@@ -0,0 +1,226 @@
+# cogs/ranks/xp.py
+"""In-memory XP accumulator behind ``!rank`` and level-role sync.
+
+* ``award(user_id)`` is the whole per-message cost: a cooldown lookup, two
+  counter updates and one compare against the precomputed next-level XP;
+* level ``L`` needs ``XP_LEVEL_BASE * L * (L + 1) / 2`` total XP; the table
+  is built once (:data:`LEVEL_XP`), a level-up only bisects it;
+* ``LEVEL_ROLE_IDS`` thresholds are precomputed too: ``award`` reports a
+  level-up only when it crosses one (that is when the role changes);
+* deltas are written every ``XP_FLUSH_S`` in one ``PlayerDB.add_xp`` batch
+  (``xp = xp + delta``, so cluster workers never overwrite each other).
+
+Totals are loaded at startup (``load``); until then awards are counted but no
+level-up is reported and nothing is flushed.  Other cluster workers' flushes
+are picked up by ``refresh`` on every leaderboard reconcile.  Without a DB (``db`` is
+None after ``load``) XP lives in memory only: no deltas, no flush task.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cogs.utils.metrics import REGISTRY
+
+log = logging.getLogger("ISERO.XP")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+XP_PER_MESSAGE = _env_int("XP_PER_MESSAGE", 15)
+XP_COOLDOWN_S = _env_float("XP_COOLDOWN_S", 60.0)
+XP_FLUSH_S = _env_float("XP_FLUSH_S", 30.0)
+XP_LEVEL_BASE = _env_int("XP_LEVEL_BASE", 100)
+XP_MAX_LEVEL = _env_int("XP_MAX_LEVEL", 500)
+
+M_AWARDS = REGISTRY.counter("isero_xp_awards_total", "Messages that earned XP")
+M_LEVEL_UPS = REGISTRY.counter("isero_xp_level_ups_total", "Level-ups seen by the XP engine")
+M_FLUSH_FAILED = REGISTRY.counter("isero_xp_flush_failed_total", "XP flushes that failed")
+
+
+def level_table(base: int = XP_LEVEL_BASE, max_level: int = XP_MAX_LEVEL) -> List[float]:
+    """``table[L]`` = total XP needed for level ``L``; the last entry is ``inf``."""
+    table: List[float] = list(accumulate(base * lvl for lvl in range(max_level + 1)))
+    table.append(float("inf"))
+    return table
+
+
+LEVEL_XP = level_table()
+
+
+def parse_level_roles(raw: str) -> Dict[int, int]:
+    """``"threshold:role_id,threshold2:role_id2"`` → ``{threshold: role_id}``."""
+    level_roles: Dict[int, int] = {}
+    for part in (raw or "").split(","):
+        if ":" in part:
+            threshold, role_id = part.split(":", 1)
+            try:
+                level_roles[int(threshold.strip())] = int(role_id.strip())
+            except ValueError:
+                continue
+    return level_roles
+
+
+class XpEngine:
+    def __init__(self, per_message: int = XP_PER_MESSAGE, cooldown_s: float = XP_COOLDOWN_S,
+                 flush_s: float = XP_FLUSH_S, table: Optional[List[float]] = None,
+                 role_levels: Iterable[int] = (), clock=time.monotonic):
+        self.per_message = per_message
+        self.cooldown_s = cooldown_s
+        self.flush_s = flush_s
+        self.table = table or LEVEL_XP
+        self.role_levels = sorted(set(role_levels))
+        self.clock = clock
+        self.db: Any = None  # PlayerDB (add_xp / get_xp); a RankProgress cog állítja be
+        self.board: Any = None  # leaderboard TopK; a Leaderboard cog állítja be
+        self.ready = False
+        self.xp: Dict[int, int] = {}
+        self.levels: Dict[int, int] = {}
+        self._last: Dict[int, float] = {}
+        self._dirty: Dict[int, int] = {}
+        self._prune_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- hot path ----
+    def award(self, user_id: int) -> Optional[int]:
+        """Count one message; returns the new level when it crosses a role threshold."""
+        now = self.clock()
+        if now - self._last.get(user_id, -self.cooldown_s) < self.cooldown_s:
+            return None
+        self._last[user_id] = now
+        xp = self.xp.get(user_id, 0) + self.per_message
+        self.xp[user_id] = xp
+        if self.db is not None or not self.ready:
+            self._dirty[user_id] = self._dirty.get(user_id, 0) + self.per_message
+            self._ensure_task()
+        elif now >= self._prune_at:
+            self._prune_last(now)  # DB nélkül nincs flush, ami takarítana
+        M_AWARDS.inc()
+        if self.board is not None and self.ready:
+            self.board.set(user_id, xp)
+        level = self.levels.get(user_id, 0)
+        if xp < self.table[level + 1] or not self.ready:
+            return None
+        return self._level_up(user_id, level, xp)
+
+    def _level_up(self, user_id: int, old: int, xp: int) -> Optional[int]:
+        new = self.level_for(xp)
+        self.levels[user_id] = new
+        M_LEVEL_UPS.inc()
+        # csak akkor jelzünk, ha szerepkör-küszöböt lépett át
+        if bisect.bisect_right(self.role_levels, new) > bisect.bisect_right(self.role_levels, old):
+            return new
+        return None
+
+    # ---- reads ----
+    def level_for(self, xp: int) -> int:
+        return max(0, min(bisect.bisect_right(self.table, xp) - 1, len(self.table) - 2))
+
+    def progress(self, user_id: int) -> Tuple[int, int, int, int]:
+        """``(level, xp, xp_at_level, xp_at_next_level)`` from memory."""
+        xp = self.xp.get(user_id, 0)
+        level = self.levels.get(user_id, 0)
+        return level, xp, int(self.table[level]), int(min(self.table[level + 1], self.table[-2]))
+
+    def pending(self) -> Dict[int, int]:
+        """XP awarded here but not flushed yet (``user_id → delta``)."""
+        return dict(self._dirty)
+
+    # ---- DB ----
+    def load(self, totals: Dict[int, int]) -> None:
+        """Merge DB totals with the awards counted before startup finished."""
+        for user_id, xp in totals.items():
+            self.xp[user_id] = xp + self.xp.get(user_id, 0)
+        self.levels = {uid: self.level_for(xp) for uid, xp in self.xp.items()}
+        self.ready = True
+
+    def refresh(self, totals: Dict[int, int]) -> Dict[int, int]:
+        """DB totals (every worker's flushes) plus our unflushed deltas; returns the new totals.
+
+        XP only grows: a total that a running flush has not committed yet keeps
+        its in-memory value.  Levels are raised silently, the role sync loop
+        catches up on thresholds crossed on other workers.
+        """
+        xp = dict(totals)
+        for user_id, delta in self._dirty.items():
+            xp[user_id] = xp.get(user_id, 0) + delta
+        for user_id, old in self.xp.items():
+            if xp.get(user_id, 0) < old:
+                xp[user_id] = old
+        self.xp = xp
+        self.levels = {uid: max(self.levels.get(uid, 0), self.level_for(x)) for uid, x in xp.items()}
+        return xp
+
+    def _prune_last(self, now: float) -> None:
+        # lejárt cooldownok: a _last ne nőjön a végtelenségig
+        cutoff = now - self.cooldown_s
+        self._last = {uid: t for uid, t in self._last.items() if t > cutoff}
+        self._prune_at = now + self.flush_s
+
+    def _ensure_task(self) -> None:
+        if self.db is None or (self._task is not None and not self._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # nincs futó loop (teszt/szkript): flush() kézzel
+        self._task = loop.create_task(self._run(), name="isero: xp-flush")
+
+    async def _run(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.flush_s)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("xp flush failed: %s", e)
+
+    async def flush(self) -> int:
+        """One batched ``add_xp``; returns rows written (0 before ``load`` or without a DB)."""
+        if not self.ready:
+            return 0
+        if self.db is None:
+            self._dirty.clear()
+            self._prune_last(self.clock())
+            return 0
+        async with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return 0
+            batch = {uid: (delta, self.levels.get(uid, 0)) for uid, delta in dirty.items()}
+            try:
+                await self.db.add_xp(batch)
+            except BaseException:
+                M_FLUSH_FAILED.inc()
+                for uid, delta in dirty.items():
+                    self._dirty[uid] = self._dirty.get(uid, 0) + delta
+                raise
+        self._prune_last(self.clock())
+        return len(batch)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._dirty:
+            await self.flush()
+
+
+XP = XpEngine(role_levels=parse_level_roles(os.getenv("LEVEL_ROLE_IDS", "")))
@@ -0,0 +1,135 @@
+# cogs/storage/migrations.py
+"""Versioned schema migrations for the shared Postgres database.
+
+``store.get_pool`` (the one pool PlayerDB and PlayerCardStore share) calls
+:func:`migrate` when it opens.  When ``schema_version`` already holds the
+latest version that is a single SELECT and no DDL runs.  Otherwise the
+caller takes a session advisory lock (other workers block on it, then see
+the new version and skip), and every pending migration runs in its own
+transaction together with its ``schema_version`` row.
+
+Migrations are append-only: never edit a released one, add the next number.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Awaitable, Callable, List, Tuple, Union
+
+from cogs.storage.signals import migrate_signals
+
+log = logging.getLogger("isero.playerdb")
+
+# külön kulcs a signals migráció xact-zárjától
+_LOCK_KEY = 0x15E70_0001
+
+VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+  version    INT PRIMARY KEY,
+  name       TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# 1: a két régi séma (agent/playerdb + storage/store) uniója; meglévő
+#    adatbázisoknál az ADD COLUMN IF NOT EXISTS pótolja a hiányzó oszlopokat
+BASELINE_SQL = """
+CREATE TABLE IF NOT EXISTS players (
+  user_id     BIGINT PRIMARY KEY,
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE players
+  ADD COLUMN IF NOT EXISTS display     TEXT,
+  ADD COLUMN IF NOT EXISTS role        TEXT CHECK (role IN ('owner','staff','user')) DEFAULT 'user',
+  ADD COLUMN IF NOT EXISTS trust       SMALLINT DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS locale      TEXT DEFAULT 'en',
+  ADD COLUMN IF NOT EXISTS style       TEXT DEFAULT 'pro_sarcastic_concise',
+  ADD COLUMN IF NOT EXISTS allow_admin BOOLEAN DEFAULT FALSE,
+  ADD COLUMN IF NOT EXISTS updated_at  TIMESTAMPTZ DEFAULT now(),
+  ADD COLUMN IF NOT EXISTS first10     BOOLEAN NOT NULL DEFAULT FALSE,
+  ADD COLUMN IF NOT EXISTS rank        INT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS level       INT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS lang_pref   TEXT,
+  ADD COLUMN IF NOT EXISTS flags       JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+CREATE TABLE IF NOT EXISTS player_cards (
+  user_id BIGINT PRIMARY KEY REFERENCES players(user_id) ON DELETE CASCADE,
+  prompt_snippet TEXT,
+  persona_tags TEXT[] DEFAULT '{}',
+  scores JSONB NOT NULL DEFAULT '{"activity":0,"helpfulness":0,"marketing":0,"toxicity":0,"trust":0}'::jsonb,
+  mood DOUBLE PRECISION DEFAULT 0,
+  marketing_score INT NOT NULL DEFAULT 0,
+  profanity JSONB NOT NULL DEFAULT '{"points":0,"stage":0}'::jsonb,
+  tokens_today INT NOT NULL DEFAULT 0,
+  last_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS briefs (
+  id               BIGSERIAL PRIMARY KEY,
+  user_id          BIGINT REFERENCES players(user_id),
+  ticket_channel_id BIGINT,
+  type             TEXT,
+  goal             TEXT,
+  deadline         TEXT,
+  refs_count       SMALLINT DEFAULT 0,
+  status           TEXT DEFAULT 'open',
+  created_at       TIMESTAMPTZ DEFAULT now(),
+  updated_at       TIMESTAMPTZ DEFAULT now()
+);
+"""
+
+# 5: a PostgresState eddig maga hozta létre az első hívásnál
+SHARED_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS shared_state (
+  key        TEXT PRIMARY KEY,
+  value      JSONB NOT NULL,
+  expires_at TIMESTAMPTZ
+);
+"""
+
+Step = Union[str, Callable[..., Awaitable[None]]]
+
+MIGRATIONS: List[Tuple[int, str, Step]] = [
+    (1, "baseline players/player_cards/briefs", BASELINE_SQL),
+    (2, "partitioned signals + signal_daily", migrate_signals),
+    (3, "players.snapshot", "ALTER TABLE players ADD COLUMN IF NOT EXISTS snapshot JSONB NOT NULL DEFAULT '{}'::jsonb"),
+    (4, "players.xp", "ALTER TABLE players ADD COLUMN IF NOT EXISTS xp BIGINT NOT NULL DEFAULT 0"),
+    (5, "shared_state (cluster mode)", SHARED_STATE_SQL),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def pending(current: int, migrations: List[Tuple[int, str, Step]] = MIGRATIONS) -> List[Tuple[int, str, Step]]:
+    return [m for m in migrations if m[0] > current]
+
+
+async def current_version(con) -> int:
+    """0 when ``schema_version`` does not exist yet (fresh or pre-runner database)."""
+    if await con.fetchval("SELECT to_regclass('schema_version')") is None:
+        return 0
+    return int(await con.fetchval("SELECT COALESCE(max(version), 0) FROM schema_version"))
+
+
+async def migrate(con, migrations: List[Tuple[int, str, Step]] = MIGRATIONS) -> int:
+    """Bring the schema to the latest version; returns the number of migrations applied."""
+    latest = migrations[-1][0]
+    if await current_version(con) >= latest:
+        return 0
+    await con.execute("SELECT pg_advisory_lock($1)", _LOCK_KEY)
+    try:
+        await con.execute(VERSION_SQL)
+        # a zárra várva egy másik worker már lefuttathatta
+        todo = pending(await current_version(con), migrations)
+        for version, name, step in todo:
+            async with con.transaction():
+                if isinstance(step, str):
+                    await con.execute(step)
+                else:
+                    await step(con)
+                await con.execute(
+                    "INSERT INTO schema_version(version, name) VALUES($1, $2)", version, name
+                )
+            log.info("schema migration %d applied: %s", version, name)
+        return len(todo)
+    finally:
+        await con.execute("SELECT pg_advisory_unlock($1)", _LOCK_KEY)
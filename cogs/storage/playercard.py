@@ -1,10 +1,49 @@
 # storage/playercard.py
 from __future__ import annotations
+import asyncio
+import copy
 import json
+import logging
+import os
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import asyncpg
-from .store import get_pool
+from cogs.utils.metrics import REGISTRY
+from .store import connection, execute_hot, pool_ready
+
+log = logging.getLogger("isero.playerdb")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+PLAYERCARD_FLUSH_S = _env_float("PLAYERCARD_FLUSH_S", 5.0)
+PLAYERCARD_CACHE_MAX = _env_int("PLAYERCARD_CACHE_MAX", 10000)
+PLAYERCARD_MAX_SIGNALS = _env_int("PLAYERCARD_MAX_SIGNALS", 20000)
+# ennyi mp után a cache-elt kártyát újraolvassuk (más worker is írhatta)
+PLAYERCARD_TTL_S = _env_float("PLAYERCARD_TTL_S", 300.0)
+
+# gördülő átlag: új = régi*0.8 + obs*0.2 (ugyanaz, mint az update_mood SQL)
+MOOD_KEEP = 0.8
+
+M_FLUSH_ROWS = REGISTRY.counter("isero_playercard_flush_rows_total", "Coalesced player_cards rows written")
+M_FLUSH_SIGNALS = REGISTRY.counter("isero_playercard_flush_signals_total", "Buffered signals written")
+M_FLUSH_FAILED = REGISTRY.counter("isero_playercard_flush_failed_total", "PlayerCard flushes that failed")
+M_DIRTY = REGISTRY.gauge("isero_playercard_dirty", "Players with unflushed card deltas")
+M_READS = REGISTRY.counter("isero_playercard_reads_total", "PlayerCard reads by cache result", ("result",))
 
 @dataclass
 class PlayerCard:
@@ -22,20 +61,12 @@ class PlayerCard:
 class PlayerCardStore:
     @staticmethod
     async def ensure_player(user_id: int) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
-            await con.execute(
-                "INSERT INTO players(user_id) VALUES($1) ON CONFLICT (user_id) DO NOTHING", user_id
-            )
-            await con.execute(
-                "INSERT INTO player_cards(user_id) VALUES($1) ON CONFLICT (user_id) DO NOTHING", user_id
-            )
+        await execute_hot("ensure_player", user_id)
 
     @staticmethod
     async def get_card(user_id: int) -> PlayerCard:
-        pool = await get_pool()
         await PlayerCardStore.ensure_player(user_id)
-        async with pool.acquire() as con:
+        async with connection("get_card") as con:
             row = await con.fetchrow("SELECT * FROM player_cards WHERE user_id=$1", user_id)
         return PlayerCard(
             user_id=row["user_id"],
@@ -50,8 +81,7 @@ class PlayerCardStore:
 
     @staticmethod
     async def set_prompt(user_id: int, snippet: str | None) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
+        async with connection("set_prompt") as con:
             await con.execute(
                 "UPDATE player_cards SET prompt_snippet=$2 WHERE user_id=$1",
                 user_id, snippet
@@ -59,47 +89,19 @@ class PlayerCardStore:
 
     @staticmethod
     async def add_signal(user_id: int, kind: str, value: float | None, meta: Dict[str, Any] | None = None) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
-            await con.execute(
-                "INSERT INTO signals(user_id, kind, value, meta) VALUES($1,$2,$3,$4)",
-                user_id, kind, value, json.dumps(meta or {})
-            )
+        await execute_hot("add_signal", user_id, kind, value, json.dumps(meta or {}))
 
     @staticmethod
     async def bump_marketing(user_id: int, points: int) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
-            await con.execute(
-                """
-                UPDATE player_cards
-                SET marketing_score = LEAST(100, GREATEST(0, marketing_score + $2)),
-                    scores = jsonb_set(scores, '{marketing}', to_jsonb(((scores->>'marketing')::float + $3)), true),
-                    last_seen_at = NOW()
-                WHERE user_id=$1
-                """,
-                user_id, points, float(points)
-            )
+        await execute_hot("bump_marketing", user_id, points, float(points))
 
     @staticmethod
     async def update_mood(user_id: int, obs: float) -> None:
-        # gördülő átlag: új = (régi*0.8 + obs*0.2)
-        pool = await get_pool()
-        async with pool.acquire() as con:
-            await con.execute(
-                """
-                UPDATE player_cards
-                SET mood = (COALESCE(mood,0)*0.8 + $2*0.2),
-                    last_seen_at = NOW()
-                WHERE user_id=$1
-                """,
-                user_id, obs
-            )
+        await execute_hot("update_mood", user_id, obs)
 
     @staticmethod
     async def add_profanity_points(user_id: int, points: int, stage_delta: int = 0) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
+        async with connection("add_profanity_points") as con:
             await con.execute(
                 """
                 UPDATE player_cards
@@ -116,8 +118,355 @@ class PlayerCardStore:
 
     @staticmethod
     async def add_tokens(user_id: int, tokens: int) -> None:
-        pool = await get_pool()
-        async with pool.acquire() as con:
+        async with connection("add_tokens") as con:
             await con.execute(
                 "UPDATE player_cards SET tokens_today=tokens_today+$2 WHERE user_id=$1", user_id, tokens
             )
+
+    @staticmethod
+    async def write_batch(dirty: Dict[int, "CardDelta"], signals: List[Tuple[int, str, Optional[float], str]]) -> None:
+        """One transaction: ensure rows, one coalesced UPDATE, buffered signals."""
+        async with connection("playercard_flush") as con:
+            async with con.transaction():
+                await con.execute(ENSURE_MANY_SQL, sorted(dirty))
+                await con.execute(FLUSH_SQL, *flush_args(dirty))
+                if signals:
+                    await con.executemany(
+                        "INSERT INTO signals(user_id, kind, value, meta) VALUES($1,$2,$3,$4)", signals
+                    )
+
+
+def _clamp(v: int, lo: int = 0, hi: int = 100) -> int:
+    return max(lo, min(hi, v))
+
+
+@dataclass
+class CardDelta:
+    """Unflushed changes of one card, composed so one UPDATE reproduces every step.
+
+    mood:      ``m -> m*mood_a + mood_b``   (EMA steps compose linearly)
+    marketing: ``x -> clamp(x + mkt_sum, mkt_lo, mkt_hi)`` (clamped adds compose
+               into one clamped add with narrowed bounds)
+    """
+    mood_a: float = 1.0
+    mood_b: float = 0.0
+    mkt_sum: int = 0
+    mkt_lo: int = 0
+    mkt_hi: int = 100
+    mkt_raw: float = 0.0
+    prof_points: int = 0
+    prof_stage: int = 0
+    tokens: int = 0
+    seen: bool = False
+
+    def mood(self, obs: float) -> None:
+        self.mood_a *= MOOD_KEEP
+        self.mood_b = self.mood_b * MOOD_KEEP + obs * (1 - MOOD_KEEP)
+        self.seen = True
+
+    def marketing(self, points: int) -> None:
+        self.mkt_sum += points
+        self.mkt_lo = _clamp(self.mkt_lo + points)
+        self.mkt_hi = _clamp(self.mkt_hi + points)
+        self.mkt_raw += float(points)
+        self.seen = True
+
+    def profanity(self, points: int, stage_delta: int) -> None:
+        self.prof_points += points
+        self.prof_stage += stage_delta
+        self.seen = True
+
+    def then(self, later: "CardDelta") -> "CardDelta":
+        """This delta followed by ``later`` (re-queueing a failed flush before newer writes)."""
+        return CardDelta(
+            mood_a=self.mood_a * later.mood_a,
+            mood_b=self.mood_b * later.mood_a + later.mood_b,
+            mkt_sum=self.mkt_sum + later.mkt_sum,
+            mkt_lo=_clamp(self.mkt_lo + later.mkt_sum, later.mkt_lo, later.mkt_hi),
+            mkt_hi=_clamp(self.mkt_hi + later.mkt_sum, later.mkt_lo, later.mkt_hi),
+            mkt_raw=self.mkt_raw + later.mkt_raw,
+            prof_points=self.prof_points + later.prof_points,
+            prof_stage=self.prof_stage + later.prof_stage,
+            tokens=self.tokens + later.tokens,
+            seen=self.seen or later.seen,
+        )
+
+    def apply(self, card: PlayerCard) -> PlayerCard:
+        """Python twin of :data:`FLUSH_SQL` for one row."""
+        out = copy.deepcopy(card)
+        out.mood = (card.mood or 0.0) * self.mood_a + self.mood_b
+        out.marketing_score = _clamp(card.marketing_score + self.mkt_sum, self.mkt_lo, self.mkt_hi)
+        out.scores["marketing"] = float(card.scores.get("marketing", 0)) + self.mkt_raw
+        out.scores["toxicity"] = float(card.scores.get("toxicity", 0)) + self.prof_points
+        out.profanity["points"] = int(card.profanity.get("points", 0)) + self.prof_points
+        out.profanity["stage"] = int(card.profanity.get("stage", 0)) + self.prof_stage
+        out.tokens_today = card.tokens_today + self.tokens
+        return out
+
+
+ENSURE_MANY_SQL = """
+WITH p AS (
+  INSERT INTO players(user_id) SELECT unnest($1::bigint[]) ON CONFLICT (user_id) DO NOTHING
+)
+INSERT INTO player_cards(user_id) SELECT unnest($1::bigint[]) ON CONFLICT (user_id) DO NOTHING
+"""
+
+FLUSH_SQL = """
+UPDATE player_cards AS c SET
+  mood = COALESCE(c.mood, 0) * d.ma + d.mb,
+  marketing_score = LEAST(d.mhi, GREATEST(d.mlo, c.marketing_score + d.ms)),
+  scores = jsonb_set(
+    jsonb_set(c.scores, '{marketing}', to_jsonb(COALESCE((c.scores->>'marketing')::float, 0) + d.mraw), true),
+    '{toxicity}', to_jsonb(COALESCE((c.scores->>'toxicity')::float, 0) + d.pp), true),
+  profanity = jsonb_set(
+    jsonb_set(c.profanity, '{points}', to_jsonb(COALESCE((c.profanity->>'points')::int, 0) + d.pp), true),
+    '{stage}', to_jsonb(COALESCE((c.profanity->>'stage')::int, 0) + d.ps), true),
+  tokens_today = c.tokens_today + d.tok,
+  last_seen_at = CASE WHEN d.seen THEN NOW() ELSE c.last_seen_at END
+FROM unnest($1::bigint[], $2::float8[], $3::float8[], $4::int[], $5::int[], $6::int[],
+            $7::float8[], $8::int[], $9::int[], $10::int[], $11::bool[])
+  AS d(user_id, ma, mb, ms, mlo, mhi, mraw, pp, ps, tok, seen)
+WHERE c.user_id = d.user_id
+"""
+
+
+def flush_args(dirty: Dict[int, CardDelta]) -> List[list]:
+    """Column arrays for :data:`FLUSH_SQL` (one unnest row per player)."""
+    uids = sorted(dirty)  # fix sorrend: két worker ne zárja egymást holtpontra
+    d = [dirty[u] for u in uids]
+    return [
+        uids,
+        [x.mood_a for x in d], [x.mood_b for x in d],
+        [x.mkt_sum for x in d], [x.mkt_lo for x in d], [x.mkt_hi for x in d], [x.mkt_raw for x in d],
+        [x.prof_points for x in d], [x.prof_stage for x in d], [x.tokens for x in d], [x.seen for x in d],
+    ]
+
+
+class PlayerCardCache:
+    """Write-behind PlayerCard cache.
+
+    Watcher writes are applied to the cached card (if loaded) and folded into
+    one :class:`CardDelta` per player; signals are buffered.  Every
+    ``flush_s`` one transaction writes all dirty rows (single UPDATE …
+    FROM unnest) and the signals (executemany).  ``get_card`` is a
+    read-through: served from memory, (re)loaded once per ``ttl_s`` with a
+    single in-flight load per player; ``prewarm`` starts that load early.
+
+    ``backend`` is anything with PlayerCardStore's ``get_card`` and
+    ``write_batch`` (Postgres by default, ``SQLiteCardStore`` locally).
+    """
+
+    def __init__(self, flush_s: float = PLAYERCARD_FLUSH_S, max_cards: int = PLAYERCARD_CACHE_MAX,
+                 max_signals: int = PLAYERCARD_MAX_SIGNALS, ttl_s: float = PLAYERCARD_TTL_S,
+                 clock=time.monotonic):
+        self.flush_s = flush_s
+        self.max_cards = max_cards
+        self.max_signals = max_signals
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.backend: Any = PlayerCardStore
+        self.marketing_board: Any = None  # leaderboard TopK (cogs.ranks.leaderboard)
+        self._cards: "OrderedDict[int, PlayerCard]" = OrderedDict()
+        self._loaded_at: Dict[int, float] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._dirty: Dict[int, CardDelta] = {}
+        self._signals: List[Tuple[int, str, Optional[float], str]] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        M_DIRTY.set_function(lambda: len(self._dirty))
+
+    @property
+    def enabled(self) -> bool:
+        """A local backend is installed, or the shared Postgres pool is actually open."""
+        return self.backend is not PlayerCardStore or pool_ready()
+
+    # ---- writes (sync, no I/O) ----
+    def _delta(self, user_id: int) -> CardDelta:
+        if not self.enabled:
+            return CardDelta()  # DB nélkül nincs hova írni: eldobott delta, nem indul flusher
+        d = self._dirty.get(user_id)
+        if d is None:
+            d = self._dirty[user_id] = CardDelta()
+        self._ensure_task()
+        return d
+
+    def update_mood(self, user_id: int, obs: float) -> None:
+        self._delta(user_id).mood(obs)
+        card = self._cards.get(user_id)
+        if card is not None:
+            card.mood = (card.mood or 0.0) * MOOD_KEEP + obs * (1 - MOOD_KEEP)
+
+    def bump_marketing(self, user_id: int, points: int) -> None:
+        self._delta(user_id).marketing(points)
+        card = self._cards.get(user_id)
+        if card is not None:
+            card.marketing_score = _clamp(card.marketing_score + points)
+            card.scores["marketing"] = float(card.scores.get("marketing", 0)) + points
+        if self.marketing_board is not None:
+            self.marketing_board.add(user_id, points, lo=0, hi=100)
+
+    def add_profanity_points(self, user_id: int, points: int, stage_delta: int = 0) -> None:
+        self._delta(user_id).profanity(int(points), int(stage_delta))
+        card = self._cards.get(user_id)
+        if card is not None:
+            card.profanity["points"] = int(card.profanity.get("points", 0)) + int(points)
+            card.profanity["stage"] = int(card.profanity.get("stage", 0)) + int(stage_delta)
+            card.scores["toxicity"] = float(card.scores.get("toxicity", 0)) + int(points)
+
+    def add_tokens(self, user_id: int, tokens: int) -> None:
+        self._delta(user_id).tokens += tokens
+        card = self._cards.get(user_id)
+        if card is not None:
+            card.tokens_today += tokens
+
+    def add_signal(self, user_id: int, kind: str, value: float | None, meta: Dict[str, Any] | None = None) -> None:
+        if not self.enabled:
+            return
+        if len(self._signals) >= self.max_signals:
+            self._signals.pop(0)  # DB kiesés alatt a legrégebbi jel megy el
+        self._signals.append((user_id, kind, value, json.dumps(meta or {})))
+        self._delta(user_id)
+
+    # ---- reads ----
+    def _remember(self, card: PlayerCard) -> None:
+        self._cards[card.user_id] = card
+        self._cards.move_to_end(card.user_id)
+        self._loaded_at[card.user_id] = self.clock()
+        while len(self._cards) > self.max_cards:
+            uid, _ = self._cards.popitem(last=False)
+            self._loaded_at.pop(uid, None)
+
+    def _fresh(self, user_id: int) -> Optional[PlayerCard]:
+        card = self._cards.get(user_id)
+        if card is None:
+            return None
+        if self.ttl_s and self.clock() - self._loaded_at.get(user_id, 0.0) > self.ttl_s:
+            return None
+        self._cards.move_to_end(user_id)
+        return card
+
+    async def _load(self, user_id: int) -> PlayerCard:
+        # flush közben ne olvassunk: a DB + függő delta így pontos
+        async with self._lock:
+            card = self._fresh(user_id)
+            if card is None:
+                card = await self.backend.get_card(user_id)
+                pending = self._dirty.get(user_id)
+                if pending is not None:
+                    card = pending.apply(card)
+                self._remember(card)
+            return card
+
+    def _start_load(self, user_id: int) -> asyncio.Future:
+        fut = self._loading.get(user_id)
+        if fut is None:
+            fut = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            fut.add_done_callback(lambda _f, uid=user_id: self._loading.pop(uid, None))
+        return fut
+
+    async def get_card(self, user_id: int) -> PlayerCard:
+        card = self._fresh(user_id)
+        if card is None:
+            M_READS.labels("miss").inc()
+            # a hívó timeoutja ne szakítsa meg a betöltést: a következő olvasás már meleg
+            card = await asyncio.shield(self._start_load(user_id))
+        else:
+            M_READS.labels("hit").inc()
+        return copy.deepcopy(card)
+
+    def prewarm(self, user_id: int) -> None:
+        """Start loading ``user_id``'s card in the background (no-op if cached or loading)."""
+        if self._fresh(user_id) is not None or user_id in self._loading:
+            return
+        try:
+            fut = self._start_load(user_id)
+        except RuntimeError:
+            return  # nincs futó loop
+        fut.add_done_callback(self._log_prewarm_error)
+
+    @staticmethod
+    def _log_prewarm_error(fut: asyncio.Future) -> None:
+        if not fut.cancelled() and fut.exception() is not None:
+            log.debug("playercard prewarm failed: %s", fut.exception())
+
+    # ---- flush ----
+    def _ensure_task(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # nincs futó loop (teszt/szkript): flush() kézzel
+        self._task = loop.create_task(self._run(), name="isero: playercard-flush")
+
+    async def _run(self) -> None:
+        while self._dirty or self._signals:
+            await asyncio.sleep(self.flush_s)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("playercard flush failed: %s", e)
+
+    async def flush(self) -> int:
+        """Write all pending deltas + signals in one transaction; returns rows updated."""
+        async with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            signals, self._signals = self._signals, []
+            if not dirty and not signals:
+                return 0
+            try:
+                await self.backend.write_batch(dirty, signals)
+            except BaseException:
+                M_FLUSH_FAILED.inc()
+                # vissza a sor elejére, az azóta jött írások elé
+                for uid, d in dirty.items():
+                    later = self._dirty.get(uid)
+                    self._dirty[uid] = d.then(later) if later is not None else d
+                self._signals[:0] = signals[-self.max_signals:]
+                raise
+        M_FLUSH_ROWS.inc(len(dirty))
+        M_FLUSH_SIGNALS.inc(len(signals))
+        return len(dirty)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._dirty or self._signals:
+            await self.flush()
+
+
+CARDS = PlayerCardCache()
+
+
+def persona_dials(card: PlayerCard) -> Dict[str, Any]:
+    """Stored card → agent persona overrides (``tone`` / ``promo`` of the default card)."""
+    mood = max(-1.0, min(1.0, float(card.mood or 0.0)))
+    stage = int(card.profanity.get("stage", 0) or 0)
+    return {
+        # jó hangulat: melegebb, kevésbé szarkasztikus; káromkodó user: nincs emoji, visszafogott
+        "tone": {
+            "sarcasm": round(max(0.2, 0.65 - 0.25 * mood - 0.15 * min(stage, 2)), 2),
+            "warmth": round(max(0.0, min(1.0, 0.2 + 0.3 * mood)), 2),
+            "emoji": stage == 0,
+        },
+        "promo": {"affinity": round(_clamp(card.marketing_score) / 100, 2)},
+        "persona_tags": list(card.persona_tags or []),
+        "prompt_snippet": card.prompt_snippet,
+    }
+
+
+def storage_enabled() -> bool:
+    return CARDS.enabled
+
+
+async def get_player_card(user_id: int) -> Dict[str, Any]:
+    """Persona overrides for ``user_id`` from the read-through cache ({} without a database)."""
+    if not storage_enabled():
+        return {}
+    return persona_dials(await CARDS.get_card(user_id))
+
+
+def prewarm(user_id: int) -> None:
+    if storage_enabled():
+        CARDS.prewarm(user_id)
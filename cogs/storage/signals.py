@@ -0,0 +1,306 @@
+# cogs/storage/signals.py
+"""Unified, month-partitioned ``signals`` table + daily rollup retention.
+
+Both writers append here: ``PlayerDB.log_signal`` (sentiment/intent/score)
+and ``PlayerCardStore.add_signal`` (kind/value/meta).  The parent table is
+``PARTITION BY RANGE (ts)`` with one partition per calendar month
+(``signals_y2026m10``) plus a DEFAULT partition, so an insert never fails
+on a missing month.  Indexes are declared on the parent and cascade:
+
+* ``(user_id, intent) INCLUDE (score)`` — marketing average, index-only;
+* ``(user_id, ts) INCLUDE (sentiment)`` — mood average / recent activity;
+* ``(user_id, kind, ts)`` — PlayerCard signal kinds.
+
+``run_retention()`` rolls every partition older than
+``SIGNALS_RAW_RETENTION_MONTHS`` into ``signal_daily`` (per user/day/kind/
+intent sums and counts) and drops it; ``get_scores`` reads raw + rollup so
+the averages do not change when raw rows age out.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+
+from discord.ext import commands
+
+from cogs.utils.guildstate import GUILDS
+
+log = logging.getLogger("isero.playerdb")
+
+SIGNALS_RAW_RETENTION_MONTHS = int(os.getenv("SIGNALS_RAW_RETENTION_MONTHS", "3") or "3")
+SIGNALS_PARTITIONS_AHEAD = 2
+SIGNALS_RETENTION_INTERVAL_S = 24 * 3600
+
+# 64 bites kulcs a migrációs zárhoz (több worker ne konvertáljon egyszerre)
+_LOCK_KEY = 0x15E70_5167
+
+_PART_RE = re.compile(r"^signals_y(\d{4})m(\d{2})$")
+
+SIGNALS_SQL = """
+CREATE TABLE IF NOT EXISTS signals (
+  id         BIGSERIAL,
+  user_id    BIGINT NOT NULL,
+  channel_id BIGINT,
+  kind       TEXT,
+  intent     TEXT,
+  sentiment  REAL,
+  score      SMALLINT,
+  value      DOUBLE PRECISION,
+  meta       JSONB,
+  ts         TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+CREATE TABLE IF NOT EXISTS signals_default PARTITION OF signals DEFAULT;
+
+CREATE INDEX IF NOT EXISTS signals_user_intent_idx ON signals (user_id, intent) INCLUDE (score);
+CREATE INDEX IF NOT EXISTS signals_user_ts_idx ON signals (user_id, ts) INCLUDE (sentiment);
+CREATE INDEX IF NOT EXISTS signals_user_kind_ts_idx ON signals (user_id, kind, ts);
+
+CREATE TABLE IF NOT EXISTS signal_daily (
+  user_id       BIGINT NOT NULL,
+  day           DATE NOT NULL,
+  kind          TEXT NOT NULL DEFAULT '',
+  intent        TEXT NOT NULL DEFAULT '',
+  n             INT NOT NULL DEFAULT 0,
+  sentiment_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  sentiment_n   INT NOT NULL DEFAULT 0,
+  score_sum     BIGINT NOT NULL DEFAULT 0,
+  score_n       INT NOT NULL DEFAULT 0,
+  value_sum     DOUBLE PRECISION NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, day, kind, intent)
+);
+"""
+
+ROLLUP_SQL = """
+INSERT INTO signal_daily AS d (user_id, day, kind, intent, n, sentiment_sum, sentiment_n, score_sum, score_n, value_sum)
+SELECT user_id, (ts AT TIME ZONE 'UTC')::date, COALESCE(kind, ''), COALESCE(intent, ''),
+       count(*), COALESCE(sum(sentiment), 0), count(sentiment), COALESCE(sum(score), 0), count(score),
+       COALESCE(sum(value), 0)
+FROM {table}
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (user_id, day, kind, intent) DO UPDATE SET
+  n = d.n + EXCLUDED.n,
+  sentiment_sum = d.sentiment_sum + EXCLUDED.sentiment_sum,
+  sentiment_n = d.sentiment_n + EXCLUDED.sentiment_n,
+  score_sum = d.score_sum + EXCLUDED.score_sum,
+  score_n = d.score_n + EXCLUDED.score_n,
+  value_sum = d.value_sum + EXCLUDED.value_sum
+"""
+
+# nyers + összesített átlagok (a lejárt hónapok ne torzítsák az értéket)
+SCORES_SQL = """
+WITH raw_mood AS (
+  SELECT sum(sentiment) AS s, count(sentiment) AS n FROM signals WHERE user_id = $1
+), raw_buy AS (
+  SELECT sum(score) AS s, count(score) AS n FROM signals WHERE user_id = $1 AND intent = 'buy'
+), agg AS (
+  SELECT sum(sentiment_sum) AS ms, sum(sentiment_n) AS mn,
+         sum(score_sum) FILTER (WHERE intent = 'buy') AS bs,
+         sum(score_n) FILTER (WHERE intent = 'buy') AS bn
+  FROM signal_daily WHERE user_id = $1
+)
+SELECT
+  COALESCE((COALESCE(raw_mood.s, 0) + COALESCE(agg.ms, 0))
+           / NULLIF(COALESCE(raw_mood.n, 0) + COALESCE(agg.mn, 0), 0), 0) AS mood,
+  COALESCE((COALESCE(raw_buy.s, 0) + COALESCE(agg.bs, 0))::float8
+           / NULLIF(COALESCE(raw_buy.n, 0) + COALESCE(agg.bn, 0), 0), 0) AS marketing
+FROM raw_mood, raw_buy, agg
+"""
+
+
+def month_start(d: dt.date) -> dt.date:
+    return d.replace(day=1)
+
+
+def add_months(d: dt.date, n: int) -> dt.date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return dt.date(y, m + 1, 1)
+
+
+def partition_name(d: dt.date) -> str:
+    return f"signals_y{d.year:04d}m{d.month:02d}"
+
+
+def partition_bounds(name: str) -> Optional[Tuple[dt.date, dt.date]]:
+    m = _PART_RE.match(name)
+    if not m:
+        return None
+    start = dt.date(int(m.group(1)), int(m.group(2)), 1)
+    return start, add_months(start, 1)
+
+
+def partitions_to_create(today: dt.date, since: Optional[dt.date] = None,
+                         ahead: int = SIGNALS_PARTITIONS_AHEAD) -> List[str]:
+    """Month partitions from ``since`` (or this month) through ``ahead`` months."""
+    cur = month_start(since or today)
+    last = add_months(month_start(today), ahead)
+    out = []
+    while cur <= last:
+        out.append(partition_name(cur))
+        cur = add_months(cur, 1)
+    return out
+
+
+def expired_partitions(names: List[str], today: dt.date,
+                       keep_months: int = SIGNALS_RAW_RETENTION_MONTHS) -> List[str]:
+    """Partitions whose whole range is older than the last ``keep_months`` months."""
+    cutoff = add_months(month_start(today), -keep_months)
+    out = []
+    for name in names:
+        b = partition_bounds(name)
+        if b and b[1] <= cutoff:
+            out.append(name)
+    return sorted(out)
+
+
+def create_partition_sql(name: str) -> str:
+    start, end = partition_bounds(name)  # type: ignore[misc]
+    return (f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF signals "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+
+
+async def _existing_partitions(con) -> List[str]:
+    rows = await con.fetch(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'signals'
+        """
+    )
+    return [r["relname"] for r in rows]
+
+
+async def _move_default_rows(con, name: str) -> None:
+    """Rows that landed in DEFAULT before their month existed block the new partition."""
+    start, end = partition_bounds(name)  # type: ignore[misc]
+    moved = await con.fetchval(
+        "SELECT count(*) FROM signals_default WHERE ts >= $1 AND ts < $2", start, end
+    )
+    if not moved:
+        await con.execute(create_partition_sql(name))
+        return
+    await con.execute("CREATE TEMP TABLE _sig_move (LIKE signals) ON COMMIT DROP")
+    await con.execute(
+        "WITH moved AS (DELETE FROM signals_default WHERE ts >= $1 AND ts < $2 RETURNING *) "
+        "INSERT INTO _sig_move SELECT * FROM moved", start, end
+    )
+    await con.execute(create_partition_sql(name))
+    await con.execute("INSERT INTO signals SELECT * FROM _sig_move")
+    # migrációs tranzakción belül több hónap is mozoghat egymás után
+    await con.execute("DROP TABLE _sig_move")
+
+
+async def ensure_partitions(con, today: Optional[dt.date] = None, since: Optional[dt.date] = None) -> List[str]:
+    today = today or dt.datetime.utcnow().date()
+    have = set(await _existing_partitions(con))
+    created = []
+    for name in partitions_to_create(today, since):
+        if name not in have:
+            async with con.transaction():
+                await _move_default_rows(con, name)
+            created.append(name)
+    return created
+
+
+async def _legacy_columns(con) -> Optional[List[str]]:
+    """Columns of a plain (non-partitioned) ``signals`` table, None if already migrated/absent."""
+    kind = await con.fetchval("SELECT relkind FROM pg_class WHERE relname = 'signals' AND relnamespace = "
+                              "'public'::regnamespace")
+    if kind != "r":
+        return None
+    rows = await con.fetch("SELECT column_name FROM information_schema.columns "
+                           "WHERE table_schema = 'public' AND table_name = 'signals'")
+    return [r["column_name"] for r in rows]
+
+
+async def migrate_signals(con, today: Optional[dt.date] = None) -> None:
+    """Idempotent: convert a legacy plain table, create partitions/indexes/rollup table."""
+    today = today or dt.datetime.utcnow().date()
+    async with con.transaction():
+        await con.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+        legacy = await _legacy_columns(con)
+        if legacy is not None:
+            await con.execute("ALTER TABLE signals RENAME TO signals_legacy")
+            for idx in ("signals_pkey",):
+                await con.execute(f"ALTER INDEX IF EXISTS {idx} RENAME TO {idx}_legacy")
+        await con.execute(SIGNALS_SQL)
+    since = None
+    if legacy is not None:
+        ts_col = "ts" if "ts" in legacy else "created_at"
+        since = await con.fetchval(f"SELECT min({ts_col})::date FROM signals_legacy")
+    await ensure_partitions(con, today, since)
+    if legacy is not None:
+        ts_col = "ts" if "ts" in legacy else "created_at"
+        cols = [c for c in ("user_id", "channel_id", "kind", "intent", "sentiment", "score", "value", "meta")
+                if c in legacy]
+        async with con.transaction():
+            await con.execute(
+                f"INSERT INTO signals ({', '.join(cols)}, ts) "
+                f"SELECT {', '.join(cols)}, COALESCE({ts_col}, now()) FROM signals_legacy WHERE user_id IS NOT NULL"
+            )
+            await con.execute("DROP TABLE signals_legacy")
+        log.info("signals: legacy table migrated into monthly partitions")
+
+
+async def run_retention(con, today: Optional[dt.date] = None,
+                        keep_months: int = SIGNALS_RAW_RETENTION_MONTHS) -> List[str]:
+    """Roll expired month partitions into ``signal_daily`` and drop them."""
+    today = today or dt.datetime.utcnow().date()
+    dropped = []
+    for name in expired_partitions(await _existing_partitions(con), today, keep_months):
+        async with con.transaction():
+            await con.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+            await con.execute(f"ALTER TABLE signals DETACH PARTITION {name}")
+            await con.execute(ROLLUP_SQL.format(table=name))
+            await con.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+    if dropped:
+        log.info("signals retention: rolled up + dropped %s", ", ".join(dropped))
+    return dropped
+
+
+class SignalRetention(commands.Cog):
+    """Daily: create upcoming month partitions, roll up + drop expired ones (shard 0's process only)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        # SQLite backendnél nincs partíció / retention
+        if not os.getenv("DATABASE_URL", "").startswith("postgres") or not GUILDS.leads():
+            return
+        self._task = asyncio.create_task(self._loop(), name="isero: signals-retention")
+
+    async def cog_unload(self):
+        if self._task:
+            self._task.cancel()
+
+    async def run_once(self) -> List[str]:
+        from cogs.storage.store import get_pool
+
+        pool = await get_pool()
+        async with pool.acquire() as con:
+            await ensure_partitions(con)
+            return await run_retention(con)
+
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("signals retention failed: %s", e)
+            await asyncio.sleep(SIGNALS_RETENTION_INTERVAL_S)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(SignalRetention(bot))
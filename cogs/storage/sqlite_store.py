@@ -0,0 +1,428 @@
+# cogs/storage/sqlite_store.py
+"""Embedded SQLite backend for PlayerDB + PlayerCardStore (``DATABASE_URL=sqlite:///path.db``).
+
+Single-node deployments and CI get the full data path (LangWatch /
+KeywordWatch signals, ``/whoami``, snapshots, PlayerCard cache) without a
+Postgres server:
+
+* WAL journal, ``synchronous=NORMAL``;
+* **one writer thread** owns the write connection: ``await store.write(fn)``
+  queues ``fn(con)``, the thread drains up to ``SQLITE_BATCH_MAX`` queued
+  writes into one ``BEGIN IMMEDIATE … COMMIT`` (each under a SAVEPOINT, so a
+  failing write does not abort its neighbours);
+* reads run in ``asyncio.to_thread`` on a separate connection (WAL readers
+  never block the writer).
+
+:class:`SQLitePlayerDB` is a :class:`PlayerDB` (snapshot cache included)
+with the SQL swapped; :class:`SQLiteCardStore` has PlayerCardStore's API and
+is installed as ``CARDS.backend`` by :func:`make_player_db`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cogs.agent.playerdb import PlayerDB
+from cogs.storage.playercard import CARDS, CardDelta, PlayerCard
+
+log = logging.getLogger("isero.playerdb")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+SQLITE_BATCH_MAX = _env_int("SQLITE_BATCH_MAX", 256)
+
+# epoch másodperc (unixepoch('subsec') csak SQLite 3.42+)
+NOW_S = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def _now(sql: str) -> str:
+    return sql.replace("NOW_S", NOW_S)
+
+
+SCHEMA = _now("""
+CREATE TABLE IF NOT EXISTS players (
+  user_id     INTEGER PRIMARY KEY,
+  display     TEXT,
+  role        TEXT DEFAULT 'user' CHECK (role IN ('owner','staff','user')),
+  trust       INTEGER DEFAULT 0,
+  locale      TEXT DEFAULT 'en',
+  style       TEXT DEFAULT 'pro_sarcastic_concise',
+  allow_admin INTEGER DEFAULT 0,
+  first10     INTEGER NOT NULL DEFAULT 0,
+  rank        INTEGER NOT NULL DEFAULT 0,
+  level       INTEGER NOT NULL DEFAULT 0,
+  xp          INTEGER NOT NULL DEFAULT 0,
+  lang_pref   TEXT,
+  flags       TEXT NOT NULL DEFAULT '{}',
+  snapshot    TEXT NOT NULL DEFAULT '{}',
+  created_at  REAL NOT NULL DEFAULT (NOW_S),
+  updated_at  REAL DEFAULT (NOW_S)
+);
+
+CREATE TABLE IF NOT EXISTS player_cards (
+  user_id         INTEGER PRIMARY KEY REFERENCES players(user_id) ON DELETE CASCADE,
+  prompt_snippet  TEXT,
+  persona_tags    TEXT NOT NULL DEFAULT '[]',
+  scores          TEXT NOT NULL DEFAULT '{"activity":0,"helpfulness":0,"marketing":0,"toxicity":0,"trust":0}',
+  mood            REAL DEFAULT 0,
+  marketing_score INTEGER NOT NULL DEFAULT 0,
+  profanity       TEXT NOT NULL DEFAULT '{"points":0,"stage":0}',
+  tokens_today    INTEGER NOT NULL DEFAULT 0,
+  last_seen_at    REAL NOT NULL DEFAULT (NOW_S)
+);
+
+CREATE TABLE IF NOT EXISTS signals (
+  id         INTEGER PRIMARY KEY,
+  user_id    INTEGER NOT NULL,
+  channel_id INTEGER,
+  kind       TEXT,
+  intent     TEXT,
+  sentiment  REAL,
+  score      INTEGER,
+  value      REAL,
+  meta       TEXT,
+  ts         REAL NOT NULL DEFAULT (NOW_S)
+);
+CREATE INDEX IF NOT EXISTS signals_user_intent_idx ON signals (user_id, intent, score);
+CREATE INDEX IF NOT EXISTS signals_user_ts_idx ON signals (user_id, ts, sentiment);
+""")
+
+LEADERBOARD_SQL = """
+WITH a AS (
+  SELECT user_id, COUNT(*) AS n FROM signals WHERE intent = 'other' AND ts > ? GROUP BY user_id
+), ids AS (
+  SELECT user_id FROM players UNION SELECT user_id FROM a
+)
+SELECT ids.user_id, COALESCE(p.xp, 0) AS xp, COALESCE(c.marketing_score, 0) AS marketing,
+       COALESCE(a.n, 0) AS activity
+FROM ids
+LEFT JOIN players p ON p.user_id = ids.user_id
+LEFT JOIN player_cards c ON c.user_id = ids.user_id
+LEFT JOIN a ON a.user_id = ids.user_id
+"""
+
+# később felvett oszlopok: a régebbi adatbázis-fájlok ALTER TABLE-t kapnak
+COLUMNS: List[Tuple[str, str, str]] = [
+    ("players", "xp", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def _resolve(fut: asyncio.Future, result: Any, err: Optional[BaseException]) -> None:
+    if fut.done():
+        return
+    if err is not None:
+        fut.set_exception(err)
+    else:
+        fut.set_result(result)
+
+
+class SQLiteStore:
+    def __init__(self, path: str, batch_max: int = SQLITE_BATCH_MAX):
+        self.path = path
+        self.batch_max = max(1, batch_max)
+        self.commits = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._q: "queue.Queue[Optional[Tuple[Callable, asyncio.Future, asyncio.AbstractEventLoop]]]" = queue.Queue()
+        self._writer_con = self._connect()
+        self._writer_con.executescript(SCHEMA)
+        for table, column, decl in COLUMNS:
+            have = {r["name"] for r in self._writer_con.execute(f"PRAGMA table_info({table})")}
+            if column not in have:
+                self._writer_con.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer, name="isero-sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA foreign_keys=ON")
+        return con
+
+    # ---- writer thread ----
+    def _writer(self) -> None:
+        con = self._writer_con
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_max:
+                try:
+                    nxt = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._run_batch(con, batch)
+
+    def _run_batch(self, con: sqlite3.Connection, batch) -> None:
+        done: List[Tuple[asyncio.Future, asyncio.AbstractEventLoop, Any, Optional[BaseException]]] = []
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            for fn, fut, loop in batch:
+                con.execute("SAVEPOINT op")
+                try:
+                    res = fn(con)
+                    con.execute("RELEASE op")
+                    done.append((fut, loop, res, None))
+                except Exception as e:
+                    con.execute("ROLLBACK TO op")
+                    con.execute("RELEASE op")
+                    done.append((fut, loop, None, e))
+            con.execute("COMMIT")
+            self.commits += 1
+        except Exception as e:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            done = [(fut, loop, None, e) for fut, loop in ((b[1], b[2]) for b in batch)]
+        for fut, loop, res, err in done:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut, res, err)
+            except RuntimeError:
+                pass  # a hívó loopja már leállt
+
+    # ---- async API ----
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn(con)`` on the writer thread inside the next batch transaction."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._q.put((fn, fut, loop))
+        return await fut
+
+    async def execute(self, sql: str, args: tuple = ()) -> None:
+        await self.write(lambda con: con.execute(sql, args))
+
+    def _read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._read_lock:
+            return fn(self._reader)
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.to_thread(self._read, fn)
+
+    async def fetchone(self, sql: str, args: tuple = ()) -> Optional[sqlite3.Row]:
+        return await self.read(lambda con: con.execute(sql, args).fetchone())
+
+    async def close(self) -> None:
+        self._q.put(None)
+        await asyncio.to_thread(self._thread.join, 10)
+        self._writer_con.close()
+        with self._read_lock:
+            self._reader.close()
+
+
+def _ensure(con: sqlite3.Connection, user_id: int) -> None:
+    con.execute("INSERT OR IGNORE INTO players(user_id) VALUES(?)", (user_id,))
+    con.execute("INSERT OR IGNORE INTO player_cards(user_id) VALUES(?)", (user_id,))
+
+
+def _card_from_row(row: sqlite3.Row) -> PlayerCard:
+    return PlayerCard(
+        user_id=row["user_id"],
+        prompt_snippet=row["prompt_snippet"],
+        persona_tags=json.loads(row["persona_tags"] or "[]"),
+        scores=json.loads(row["scores"]),
+        mood=row["mood"] or 0.0,
+        marketing_score=row["marketing_score"] or 0,
+        profanity=json.loads(row["profanity"]),
+        tokens_today=row["tokens_today"] or 0,
+    )
+
+
+class SQLiteCardStore:
+    """PlayerCardStore API on :class:`SQLiteStore` (deltas applied in Python, same math)."""
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    async def ensure_player(self, user_id: int) -> None:
+        await self.store.write(lambda con: _ensure(con, user_id))
+
+    async def get_card(self, user_id: int) -> PlayerCard:
+        row = await self.store.fetchone("SELECT * FROM player_cards WHERE user_id=?", (user_id,))
+        if row is None:
+            await self.ensure_player(user_id)
+            row = await self.store.fetchone("SELECT * FROM player_cards WHERE user_id=?", (user_id,))
+        return _card_from_row(row)
+
+    async def set_prompt(self, user_id: int, snippet: str | None) -> None:
+        await self.store.execute("UPDATE player_cards SET prompt_snippet=? WHERE user_id=?", (snippet, user_id))
+
+    async def add_signal(self, user_id: int, kind: str, value: float | None,
+                         meta: Dict[str, Any] | None = None) -> None:
+        await self.store.execute("INSERT INTO signals(user_id, kind, value, meta) VALUES(?,?,?,?)",
+                                 (user_id, kind, value, json.dumps(meta or {})))
+
+    async def _apply(self, user_id: int, delta: CardDelta) -> None:
+        await self.write_batch({user_id: delta}, [])
+
+    async def bump_marketing(self, user_id: int, points: int) -> None:
+        d = CardDelta()
+        d.marketing(points)
+        await self._apply(user_id, d)
+
+    async def update_mood(self, user_id: int, obs: float) -> None:
+        d = CardDelta()
+        d.mood(obs)
+        await self._apply(user_id, d)
+
+    async def add_profanity_points(self, user_id: int, points: int, stage_delta: int = 0) -> None:
+        d = CardDelta()
+        d.profanity(int(points), int(stage_delta))
+        await self._apply(user_id, d)
+
+    async def add_tokens(self, user_id: int, tokens: int) -> None:
+        d = CardDelta()
+        d.tokens = tokens
+        await self._apply(user_id, d)
+
+    async def write_batch(self, dirty: Dict[int, CardDelta], signals: List[Tuple[int, str, Optional[float], str]]) -> None:
+        def run(con: sqlite3.Connection) -> None:
+            now = time.time()
+            for uid in sorted(dirty):
+                _ensure(con, uid)
+                row = con.execute("SELECT * FROM player_cards WHERE user_id=?", (uid,)).fetchone()
+                d = dirty[uid]
+                card = d.apply(_card_from_row(row))
+                con.execute(
+                    "UPDATE player_cards SET mood=?, marketing_score=?, scores=?, profanity=?, tokens_today=?,"
+                    " last_seen_at=CASE WHEN ? THEN ? ELSE last_seen_at END WHERE user_id=?",
+                    (card.mood, card.marketing_score, json.dumps(card.scores), json.dumps(card.profanity),
+                     card.tokens_today, d.seen, now, uid),
+                )
+            if signals:
+                con.executemany("INSERT INTO signals(user_id, kind, value, meta) VALUES(?,?,?,?)", signals)
+
+        await self.store.write(run)
+
+
+class SQLitePlayerDB(PlayerDB):
+    """PlayerDB on SQLite; the snapshot LRU/flush logic is inherited unchanged."""
+
+    def __init__(self, store: SQLiteStore, owner_id: int | None = None):
+        super().__init__(f"sqlite:///{store.path}", owner_id=owner_id)
+        self.store = store
+
+    async def start(self) -> None:
+        self._pool = self.store  # a PlayerDB-ben a "_pool van" = "van háttértár"
+        if self._owner_id:
+            await self.store.execute(
+                "INSERT OR IGNORE INTO players(user_id, role, trust, allow_admin, locale, style)"
+                " VALUES(?, 'owner', 3, 1, 'hu', 'pro_sarcastic_concise')",
+                (self._owner_id,),
+            )
+        log.info("PlayerDB ready (sqlite: %s)", self.store.path)
+
+    async def close(self) -> None:
+        await super().close()
+        await self.store.close()
+
+    async def get_player(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = await self.store.fetchone("SELECT * FROM players WHERE user_id=?", (user_id,))
+        return dict(row) if row is not None else None
+
+    async def set_pref(self, user_id: int, locale: Optional[str], style: Optional[str]) -> None:
+        await self.store.execute(
+            _now("""
+            INSERT INTO players(user_id, locale, style)
+            VALUES(?1, COALESCE(?2,'en'), COALESCE(?3,'pro_sarcastic_concise'))
+            ON CONFLICT (user_id) DO UPDATE SET
+                locale = COALESCE(?2, players.locale),
+                style  = COALESCE(?3, players.style),
+                updated_at = NOW_S
+            """),
+            (user_id, locale, style),
+        )
+
+    async def log_signal(self, user_id: int, channel_id: int, sentiment: float, intent: str, score: int) -> None:
+        await self.store.execute(
+            "INSERT INTO signals(user_id, channel_id, sentiment, intent, score) VALUES(?,?,?,?,?)",
+            (user_id, channel_id, sentiment, intent, score),
+        )
+
+    async def get_scores(self, user_id: int) -> Tuple[float, float]:
+        row = await self.store.fetchone(
+            "SELECT COALESCE((SELECT AVG(sentiment) FROM signals WHERE user_id=?1), 0),"
+            " COALESCE((SELECT AVG(score) FROM signals WHERE user_id=?1 AND intent='buy'), 0)",
+            (user_id,),
+        )
+        return float(row[0] or 0.0), float(row[1] or 0.0)
+
+    async def allow_admin(self, user_id: int) -> bool:
+        row = await self.store.fetchone("SELECT allow_admin FROM players WHERE user_id=?", (user_id,))
+        return bool(row and row[0])
+
+    async def get_levels(self, user_ids: Optional[Sequence[int]] = None) -> Dict[int, int]:
+        if user_ids is None:
+            sql, args = "SELECT user_id, level FROM players", ()
+        else:
+            sql = "SELECT user_id, level FROM players WHERE user_id IN (SELECT value FROM json_each(?))"
+            args = (json.dumps(list(user_ids)),)
+        rows = await self.store.read(lambda con: con.execute(sql, args).fetchall())
+        return {r["user_id"]: int(r["level"] or 0) for r in rows}
+
+    async def get_xp(self) -> Dict[int, int]:
+        rows = await self.store.read(
+            lambda con: con.execute("SELECT user_id, xp FROM players WHERE xp > 0").fetchall())
+        return {r["user_id"]: int(r["xp"]) for r in rows}
+
+    async def add_xp(self, batch: Dict[int, Tuple[int, int]]) -> None:
+        await self.store.write(lambda con: con.executemany(
+            _now("INSERT INTO players(user_id, xp, level) VALUES(?, ?, ?) ON CONFLICT (user_id) DO UPDATE SET"
+                 " xp = players.xp + excluded.xp, level = MAX(players.level, excluded.level), updated_at = NOW_S"),
+            [(uid, *batch[uid]) for uid in sorted(batch)],
+        ))
+
+    async def iter_leaderboard(self, activity_days: int, prefetch: int = 1000
+                               ) -> AsyncIterator[Tuple[int, int, int, int]]:
+        since = time.time() - activity_days * 86400
+        cur = await self.store.read(lambda con: con.execute(LEADERBOARD_SQL, (since,)))
+        while True:
+            rows = await self.store.read(lambda con: cur.fetchmany(prefetch))
+            if not rows:
+                return
+            for r in rows:
+                yield r["user_id"], int(r["xp"]), int(r["marketing"]), int(r["activity"])
+
+    async def _read_snapshot(self, user_id: int) -> Dict[str, Any]:
+        row = await self.store.fetchone("SELECT snapshot FROM players WHERE user_id=?", (user_id,))
+        return json.loads(row[0]) if row is not None else {}
+
+    async def _write_snapshots(self, dirty: Dict[int, Dict[str, Any]]) -> None:
+        def run(con: sqlite3.Connection) -> None:
+            con.executemany(
+                _now("INSERT INTO players(user_id, snapshot) VALUES(?, ?) ON CONFLICT (user_id) DO UPDATE SET"
+                     " snapshot = json_patch(players.snapshot, excluded.snapshot), updated_at = NOW_S"),
+                [(uid, json.dumps(dirty[uid])) for uid in sorted(dirty)],
+            )
+
+        await self.store.write(run)
+
+
+def make_player_db(url: str, owner_id: int | None = None) -> PlayerDB:
+    """``sqlite:///path`` → SQLite PlayerDB (+ CARDS backend), anything else → Postgres."""
+    if url.startswith("sqlite:///"):
+        store = SQLiteStore(url[len("sqlite:///"):])
+        CARDS.backend = SQLiteCardStore(store)
+        return SQLitePlayerDB(store, owner_id=owner_id)
+    return PlayerDB(url, owner_id=owner_id)
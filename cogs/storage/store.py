@@ -1,55 +1,148 @@
 # storage/store.py
+"""Process-wide asyncpg pool (PlayerDB, PlayerCardStore, SharedState, retention).
+
+* one pool per process, sized by ``DB_POOL_MIN`` / ``DB_POOL_MAX``;
+* ``connection(op)`` records acquire wait + query latency per ``op``;
+* ``execute_hot(name, *args)`` runs one of :data:`HOT_SQL` through a named
+  prepared statement, prepared once per connection.  Behind pgbouncer in
+  transaction mode set ``DB_STATEMENT_CACHE_SIZE=0``: that disables both the
+  asyncpg statement cache and the named statements (plain text queries).
+"""
 from __future__ import annotations
+import asyncio
 import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
 import asyncpg
 import logging
 
+from cogs.storage.migrations import migrate
+from cogs.utils.metrics import REGISTRY
+
 log = logging.getLogger("isero.playerdb")
 
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+DB_POOL_MIN = _env_int("DB_POOL_MIN", 2)
+DB_POOL_MAX = _env_int("DB_POOL_MAX", 10)
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 256)
+DB_COMMAND_TIMEOUT_S = _env_int("DB_COMMAND_TIMEOUT_S", 10)
+
+M_POOL_WAIT = REGISTRY.histogram("isero_playerdb_pool_wait_seconds", "Time spent waiting for a pooled connection")
+M_QUERY = REGISTRY.histogram("isero_playerdb_query_seconds", "PlayerDB query latency by operation", ("op",))
+M_POOL_SIZE = REGISTRY.gauge("isero_playerdb_pool_size", "Open connections in the PlayerDB pool")
+M_POOL_IDLE = REGISTRY.gauge("isero_playerdb_pool_idle", "Idle connections in the PlayerDB pool")
+
+# forró írások: név → SQL (a név a szerveroldali prepared statement neve is)
+HOT_SQL: Dict[str, str] = {
+    "log_signal": "INSERT INTO signals(user_id, channel_id, sentiment, intent, score) VALUES($1,$2,$3,$4,$5)",
+    "add_signal": "INSERT INTO signals(user_id, kind, value, meta) VALUES($1,$2,$3,$4)",
+    # egy utasítás, egy körút: players + player_cards sor
+    "ensure_player": """
+        WITH p AS (
+          INSERT INTO players(user_id) VALUES($1) ON CONFLICT (user_id) DO NOTHING
+        )
+        INSERT INTO player_cards(user_id) VALUES($1) ON CONFLICT (user_id) DO NOTHING
+    """,
+    "bump_marketing": """
+        UPDATE player_cards
+        SET marketing_score = LEAST(100, GREATEST(0, marketing_score + $2)),
+            scores = jsonb_set(scores, '{marketing}', to_jsonb(((scores->>'marketing')::float + $3)), true),
+            last_seen_at = NOW()
+        WHERE user_id=$1
+    """,
+    # gördülő átlag: új = (régi*0.8 + obs*0.2)
+    "update_mood": """
+        UPDATE player_cards
+        SET mood = (COALESCE(mood,0)*0.8 + $2*0.2),
+            last_seen_at = NOW()
+        WHERE user_id=$1
+    """,
+}
+
 _POOL: asyncpg.Pool | None = None
+_POOL_LOCK = asyncio.Lock()
+# nyers Connection → {név: PreparedStatement}; a kapcsolattal együtt eltűnik
+_PREPARED: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
 
-SCHEMA = r"""
-CREATE TABLE IF NOT EXISTS players (
-  user_id BIGINT PRIMARY KEY,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-  first10 BOOLEAN NOT NULL DEFAULT FALSE,
-  rank INT NOT NULL DEFAULT 0,
-  level INT NOT NULL DEFAULT 0,
-  lang_pref TEXT,
-  flags JSONB NOT NULL DEFAULT '{}'::jsonb
-);
-
-CREATE TABLE IF NOT EXISTS player_cards (
-  user_id BIGINT PRIMARY KEY REFERENCES players(user_id) ON DELETE CASCADE,
-  prompt_snippet TEXT,
-  persona_tags TEXT[] DEFAULT '{}',
-  scores JSONB NOT NULL DEFAULT '{"activity":0,"helpfulness":0,"marketing":0,"toxicity":0,"trust":0}'::jsonb,
-  mood DOUBLE PRECISION DEFAULT 0,
-  marketing_score INT NOT NULL DEFAULT 0,
-  profanity JSONB NOT NULL DEFAULT '{"points":0,"stage":0}'::jsonb,
-  tokens_today INT NOT NULL DEFAULT 0,
-  last_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-
-CREATE TABLE IF NOT EXISTS signals (
-  id BIGSERIAL PRIMARY KEY,
-  user_id BIGINT NOT NULL,
-  kind TEXT NOT NULL,
-  value DOUBLE PRECISION,
-  meta JSONB,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-"""
 
-async def get_pool() -> asyncpg.Pool:
+async def get_pool(dsn: str | None = None) -> asyncpg.Pool:
     global _POOL
     if _POOL:
         return _POOL
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL hiányzik az ENV-ből")
-    _POOL = await asyncpg.create_pool(dsn=db_url, min_size=1, max_size=5)
-    async with _POOL.acquire() as con:
-        await con.execute(SCHEMA)
-    log.info("isero.playerdb: schema ensured.")
+    async with _POOL_LOCK:
+        if _POOL:
+            return _POOL
+        db_url = dsn or os.getenv("DATABASE_URL")
+        if not db_url:
+            raise RuntimeError("DATABASE_URL hiányzik az ENV-ből")
+        pool = await asyncpg.create_pool(
+            dsn=db_url,
+            min_size=min(DB_POOL_MIN, DB_POOL_MAX),
+            max_size=DB_POOL_MAX,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT_S,
+        )
+        async with pool.acquire() as con:
+            applied = await migrate(con)
+        M_POOL_SIZE.set_function(lambda: pool.get_size())
+        M_POOL_IDLE.set_function(lambda: pool.get_idle_size())
+        _POOL = pool
+    log.info("isero.playerdb: schema ensured (%d migrations applied), pool %d..%d.",
+             applied, DB_POOL_MIN, DB_POOL_MAX)
     return _POOL
+
+
+def pool_ready() -> bool:
+    """The shared pool is open (``get_pool`` succeeded and ``close_pool`` has not run)."""
+    return _POOL is not None
+
+
+async def close_pool() -> None:
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None:
+        await pool.close()
+
+
+@asynccontextmanager
+async def connection(op: str):
+    """Pooled connection with wait/query timing for /metrics."""
+    pool = await get_pool()
+    t0 = time.monotonic()
+    async with pool.acquire() as con:
+        M_POOL_WAIT.observe(time.monotonic() - t0)
+        with M_QUERY.labels(op).time():
+            yield con
+
+
+async def _prepared(con, name: str):
+    if DB_STATEMENT_CACHE_SIZE <= 0:
+        return None
+    raw = getattr(con, "_con", con)  # PoolConnectionProxy → Connection
+    stmts = _PREPARED.get(raw)
+    if stmts is None:
+        stmts = _PREPARED[raw] = {}
+    stmt = stmts.get(name)
+    if stmt is None:
+        stmt = stmts[name] = await con.prepare(HOT_SQL[name], name=f"isero_{name}")
+    return stmt
+
+
+async def execute_hot(name: str, *args: Any) -> None:
+    """Run a :data:`HOT_SQL` write through its per-connection prepared statement."""
+    async with connection(name) as con:
+        stmt = await _prepared(con, name)
+        if stmt is None:
+            await con.execute(HOT_SQL[name], *args)
+        else:
+            await stmt.fetchval(*args)
@@ -10,7 +10,9 @@ import discord
 import datetime as dt
 from discord.ext import commands
 from ..utils.prompt import compose_mebinu_prompt
+from ..utils.outbound import OUTBOUND, Prio
 from ..utils.sales import calc_total, env_prices
+from ..agent.playerdb import player_db
 from .general_flow import _is_nsfw_env
 
 MAX_TURNS = 10
@@ -80,7 +82,7 @@ async def _purge_legacy_block(channel: discord.TextChannel):
             txt = m.content or ""
             if any(k in txt for k in LEGACY_KEYS):
                 try:
-                    await m.delete()
+                    await OUTBOUND.run(channel.id, Prio.CLEANUP, m.delete, route="delete")
                     log.info("Legacy prompt removed msg_id=%s in #%s", m.id, channel.id)
                 except Exception:
                     pass
@@ -112,7 +114,7 @@ async def strip_legacy_bot_message(bot, message: discord.Message):
         txt = message.content or ""
         if any(k in txt for k in LEGACY_KEYS):
             try:
-                await message.delete()
+                await OUTBOUND.run(ch.id, Prio.CLEANUP, message.delete, route="delete")
                 log.info("Legacy prompt auto-removed msg_id=%s in #%s", message.id, ch.id)
             except Exception:
                 pass
@@ -257,10 +259,10 @@ async def offer(ctx: commands.Context, qty: int | None = None):
     if qty is None:
         qty = 1
         if os.getenv("PLAYER_CARD_ENABLED", "false").lower() == "true":
-            pcog = ctx.bot.get_cog("PlayerDB")
-            if pcog and hasattr(pcog, "get_snapshot"):
+            pcog = player_db(ctx.bot)
+            if pcog and hasattr(pcog, "fetch_snapshot"):
                 try:
-                    snap = pcog.get_snapshot(ctx.author.id) or {}
+                    snap = await pcog.fetch_snapshot(ctx.author.id) or {}
                     qty = int(snap.get("last_qty") or qty)
                 except Exception:
                     pass
@@ -284,10 +286,10 @@ async def checkoutmebinu(ctx: commands.Context, qty: int | None = None):
     if qty is None:
         qty = 1
         if os.getenv("PLAYER_CARD_ENABLED", "false").lower() == "true":
-            pcog = ctx.bot.get_cog("PlayerDB")
-            if pcog and hasattr(pcog, "get_snapshot"):
+            pcog = player_db(ctx.bot)
+            if pcog and hasattr(pcog, "fetch_snapshot"):
                 try:
-                    snap = pcog.get_snapshot(opener.id) or {}
+                    snap = await pcog.fetch_snapshot(opener.id) or {}
                     qty = int(snap.get("last_qty") or qty)
                 except Exception:
                     pass
@@ -314,11 +316,11 @@ async def summarymebinu(ctx: commands.Context):
     if not isinstance(ctx.channel, discord.TextChannel):
         return await ctx.reply("Csak csatornában használható.")
     opener = ctx.author
-    pcog = ctx.bot.get_cog("PlayerDB")
+    pcog = player_db(ctx.bot)
     snap = {}
     if pcog and os.getenv("PLAYER_CARD_ENABLED", "false").lower() == "true":
         try:
-            snap = pcog.get_snapshot(opener.id) or {}
+            snap = await pcog.fetch_snapshot(opener.id) or {}
         except Exception:
             snap = {}
     qty = int(snap.get("last_qty") or 1)
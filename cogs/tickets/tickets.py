@@ -21,6 +21,11 @@ from cogs.tickets.mebinu_flow import (
     strip_legacy_bot_message,
 )
 from cogs.utils.ticket_kb import load_ticket_kb
+from cogs.utils.prompt import warm_prompt_templates
+from cogs.utils.metrics import REGISTRY
+from cogs.utils.outbound import OUTBOUND, Prio
+from cogs.utils.guildstate import guild_id_of
+from cogs.utils.shared_state import SHARED
 
 TICKET_HUB_CHANNEL_ID = settings.CHANNEL_TICKET_HUB
 TICKETS_CATEGORY_ID   = settings.CATEGORY_TICKETS
@@ -30,6 +35,10 @@ TICKET_COOLDOWN_SEC   = settings.TICKET_COOLDOWN_SECONDS
 NSFW_ROLE_NAME        = settings.NSFW_ROLE_NAME
 MAX_ATTACH            = 4  # self-flowban ennyi referencia kép engedett
 
+M_TICKET_OPENED   = REGISTRY.counter("isero_tickets_opened_total", "Tickets opened", ("kind",))
+M_TICKET_CLOSED   = REGISTRY.counter("isero_tickets_closed_total", "Tickets closed")
+M_TICKET_REJECTED = REGISTRY.counter("isero_ticket_open_rejected_total", "Ticket opens refused", ("reason",))
+
 # ---- channel topic marker / helpers ----
 def owner_marker(user_id: int) -> str:
     return f"owner:{user_id}"
@@ -203,7 +212,7 @@ class SummaryView(discord.ui.View):
 class TicketsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.last_open: dict[int, float] = {}   # cooldown map
+        # cooldown + nyitott ticket index: SHARED ("tickets:last_open:{gid}:{uid}", "tickets:open:{gid}:{uid}")
         self.pending: dict[int, dict[str, T.Any]] = {}  # ch_id -> {owner_id, desc, left}
         self.mebinu_sessions: dict[int, MebinuSession] = {}
         # region ISERO PATCH agent-sessions
@@ -218,6 +227,7 @@ class TicketsCog(commands.Cog):
             self.kb = load_ticket_kb(kb_dir)
         except Exception:
             self.kb = {}
+        self.kb_version = warm_prompt_templates(self.kb)
         self.default_sla_days = int(os.getenv("TICKET_DEFAULT_SLA_DAYS", "3") or "3")
         # endregion ISERO PATCH ticket-kb-init
         # region ISERO PATCH ticket-perms/init
@@ -384,13 +394,21 @@ class TicketsCog(commands.Cog):
     # endregion
 
     # --------- Utilities ----------
-    def _cooldown_left(self, user_id: int) -> int:
+    async def _cooldown_left(self, user_id: int, guild_id: int = 0) -> int:
         now = time.time()
-        last = self.last_open.get(user_id, 0.0)
+        last = float(await SHARED.get(f"tickets:last_open:{guild_id}:{user_id}", 0.0))
         remain = int(TICKET_COOLDOWN_SEC - (now - last))
         return remain if remain > 0 else 0
 
     async def _find_existing_ticket(self, guild: discord.Guild, user_id: int) -> discord.TextChannel | None:
+        # region ISERO PATCH shared-ticket-index
+        cid = await SHARED.get(f"tickets:open:{guild.id}:{user_id}")
+        if cid:
+            ch = guild.get_channel(int(cid))
+            if isinstance(ch, discord.TextChannel) and ch.category_id == TICKETS_CATEGORY_ID:
+                return ch
+            await SHARED.delete(f"tickets:open:{guild.id}:{user_id}")  # elavult bejegyzés
+        # endregion
         cat = guild.get_channel(TICKETS_CATEGORY_ID) if TICKETS_CATEGORY_ID else None
         if not isinstance(cat, discord.CategoryChannel):
             return None
@@ -434,14 +452,17 @@ class TicketsCog(commands.Cog):
                     view.remove_item(item)
                     break
         # endregion ISERO PATCH NSFW_SAFE_MODE
-        await ch.send(embed=self.welcome_embed(user, key), view=view)
-        await ch.send(view=CloseTicketView(self))
+        # region ISERO PATCH outbound-prio
+        await OUTBOUND.run(ch.id, Prio.REPLY, lambda: ch.send(embed=self.welcome_embed(user, key), view=view))
+        await OUTBOUND.run(ch.id, Prio.REPLY, lambda: ch.send(view=CloseTicketView(self)))
+        # endregion
         return ch
 
     # --------- Category választás ---------
     async def on_category_chosen(self, i: discord.Interaction, key: str):
-        remain = self._cooldown_left(i.user.id)
+        remain = await self._cooldown_left(i.user.id, guild_id_of(i))
         if remain > 0:
+            M_TICKET_REJECTED.labels("cooldown").inc()
             await i.response.send_message(
                 f"Please wait **{remain}s** before creating another ticket.",
                 ephemeral=True
@@ -450,6 +471,7 @@ class TicketsCog(commands.Cog):
 
         existing = await self._find_existing_ticket(T.cast(discord.Guild, i.guild), i.user.id)
         if existing:
+            M_TICKET_REJECTED.labels("already_open").inc()
             await i.response.send_message(
                 f"You already have an open ticket: {existing.mention}\n"
                 "Please close it before opening a new one.",
@@ -459,7 +481,10 @@ class TicketsCog(commands.Cog):
 
         await i.response.defer(ephemeral=True)
         ch = await self.create_ticket_channel(i, key)
-        self.last_open[i.user.id] = time.time()
+        gid = guild_id_of(i)
+        await SHARED.set(f"tickets:last_open:{gid}:{i.user.id}", time.time(), ttl_s=TICKET_COOLDOWN_SEC)
+        await SHARED.set(f"tickets:open:{gid}:{i.user.id}", ch.id)
+        M_TICKET_OPENED.labels(key).inc()
         await i.followup.send(f"Your ticket is ready: {ch.mention}", ephemeral=True)
 
     # --------- Close ---------
@@ -483,6 +508,10 @@ class TicketsCog(commands.Cog):
         except discord.Forbidden:
             pass
 
+        m = re.search(r"owner:(\d+)", ch.topic or "")
+        if m:
+            await SHARED.delete(f"tickets:open:{guild.id}:{m.group(1)}")
+        M_TICKET_CLOSED.inc()
         await i.response.send_message("Ticket closed & archived.", ephemeral=True)
 
     # --------- „Én írom” flow ---------
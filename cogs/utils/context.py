@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, Tuple
 
@@ -8,6 +9,7 @@ import discord
 
 from bot.config import settings
 from cogs.utils.wake import WakeMatcher
+from cogs.utils.perf import PERF
 
 """Utilities for resolving message context and cross-cog message flags."""
 
@@ -44,6 +46,29 @@ def is_flagged(message) -> bool:
     return is_hidden(message) or is_moderated(message)
 # endregion ISERO PATCH moderated_skip_helpers
 
+# region ISERO PATCH moderation_pending
+# a profanity scan még fut (process pool): a válaszoló cogok megvárják
+_pending: dict[int, asyncio.Event] = {}
+
+def mark_pending(message) -> None:
+    _pending.setdefault(id(message), asyncio.Event())
+
+def clear_pending(message) -> None:
+    ev = _pending.pop(id(message), None)
+    if ev is not None:
+        ev.set()
+
+async def wait_moderation(message, timeout: float = 2.0) -> bool:
+    """Wait for a pending moderation verdict; returns :func:`is_flagged` afterwards."""
+    ev = _pending.get(id(message))
+    if ev is not None:
+        try:
+            await asyncio.wait_for(ev.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return is_flagged(message)
+# endregion ISERO PATCH moderation_pending
+
 
 def _csv(val: str | None) -> list[str]:
     if not val:
@@ -126,7 +151,8 @@ async def resolve(obj: Any, *, trigger_reason: str | None = None) -> MessageCont
                 break
     if not ticket_type and isinstance(channel, discord.TextChannel):
         try:
-            pins = await channel.pins()
+            with PERF.stage("pins"):
+                pins = await channel.pins()
             for pin in pins:
                 for row in getattr(pin, "components", []):
                     for comp in getattr(row, "children", []):
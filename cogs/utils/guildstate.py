@@ -0,0 +1,163 @@
+# cogs/utils/guildstate.py
+"""Guild-scoped state container.
+
+Cog state that used to live in process-global dicts keyed only by user or
+channel is resolved through ``GUILDS`` instead::
+
+    dedup = GUILDS.for_obj(message).ns("agent.dedup")   # plain dict, this guild only
+    cd = GUILDS.config(guild_id, "CHANNEL_BOT_COMMANDS", BOT_COMMANDS_CHANNEL_ID)
+
+* one :class:`GuildState` per guild id (0 = DMs), created lazily — there is
+  no registry-wide lock, everything runs on the loop of the shard that owns
+  the guild;
+* per-guild config overrides come from ``GUILD_CONFIG_PATH`` (YAML,
+  ``{guild_id: {KEY: value}}``) and fall back to the caller's default;
+* :func:`shard_for` is Discord's routing formula, so a cluster of processes
+  (``AutoShardedBot`` / one shard range per process) agrees on which one
+  owns a guild; ``GUILDS.owns()`` answers that for the running bot (per-guild
+  background loops skip guilds they do not own) and ``GUILDS.leads()`` picks
+  the one process (shard 0) that runs cluster-wide jobs.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import yaml
+from discord.ext import commands
+
+log = logging.getLogger("ISERO.GuildState")
+
+GUILD_CONFIG_PATH = os.getenv("GUILD_CONFIG_PATH", "config/guilds.yml")
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """Shard id that receives ``guild_id``'s events (Discord: ``(id >> 22) % n``)."""
+    if shard_count <= 1:
+        return 0
+    return (int(guild_id) >> 22) % shard_count
+
+
+def guild_id_of(obj: Any) -> int:
+    """Guild id of a Message / Interaction / channel / Member / Guild (0 if none)."""
+    if obj is None:
+        return 0
+    if isinstance(obj, int):
+        return obj
+    gid = getattr(obj, "guild_id", None)
+    if gid:
+        return int(gid)
+    guild = getattr(obj, "guild", None)
+    if guild is not None and getattr(guild, "id", None):
+        return int(guild.id)
+    # discord.Guild maga (van member_count, nincs guild attribútum)
+    if hasattr(obj, "member_count") and getattr(obj, "id", None):
+        return int(obj.id)
+    return 0
+
+
+class GuildState:
+    __slots__ = ("guild_id", "overrides", "_ns")
+
+    def __init__(self, guild_id: int, overrides: Optional[Dict[str, Any]] = None):
+        self.guild_id = guild_id
+        self.overrides: Dict[str, Any] = dict(overrides or {})
+        self._ns: Dict[str, Dict[Any, Any]] = {}
+
+    def ns(self, name: str) -> Dict[Any, Any]:
+        """Named dict owned by this guild (created on first use)."""
+        d = self._ns.get(name)
+        if d is None:
+            d = self._ns[name] = {}
+        return d
+
+    def config(self, key: str, default: Any = None) -> Any:
+        return self.overrides.get(key, default)
+
+    def sizes(self) -> Dict[str, int]:
+        return {k: len(v) for k, v in self._ns.items()}
+
+
+class GuildStateRegistry:
+    def __init__(self, overrides: Optional[Dict[int, Dict[str, Any]]] = None):
+        self._states: Dict[int, GuildState] = {}
+        self._overrides: Dict[int, Dict[str, Any]] = dict(overrides or {})
+        self.shard_ids: Optional[frozenset] = None  # None = minden guild a miénk
+        self.shard_count = 1
+
+    def load_overrides(self, path: str = GUILD_CONFIG_PATH) -> int:
+        p = Path(path)
+        if not p.exists():
+            return 0
+        try:
+            data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+        except Exception as e:
+            log.warning("guild config unreadable (%s): %s", path, e)
+            return 0
+        self._overrides = {int(gid): dict(cfg or {}) for gid, cfg in data.items()}
+        for gid, st in self._states.items():
+            st.overrides = dict(self._overrides.get(gid, {}))
+        return len(self._overrides)
+
+    def bind(self, bot: Any) -> None:
+        """Record which shards this process runs (AutoShardedBot or shard_id/shard_count)."""
+        count = getattr(bot, "shard_count", None) or 1
+        shards = getattr(bot, "shard_ids", None)
+        if shards is None and getattr(bot, "shard_id", None) is not None:
+            shards = [bot.shard_id]
+        self.shard_count = int(count)
+        self.shard_ids = frozenset(shards) if shards else None
+
+    def owns(self, guild_id: int) -> bool:
+        if self.shard_ids is None or not guild_id:
+            return True
+        return shard_for(guild_id, self.shard_count) in self.shard_ids
+
+    def leads(self) -> bool:
+        """True in the process that runs shard 0 (cluster-wide singleton jobs)."""
+        return self.shard_ids is None or 0 in self.shard_ids
+
+    def get(self, guild_id: int) -> GuildState:
+        st = self._states.get(guild_id)
+        if st is None:
+            st = self._states[guild_id] = GuildState(guild_id, self._overrides.get(guild_id))
+        return st
+
+    def for_obj(self, obj: Any) -> GuildState:
+        return self.get(guild_id_of(obj))
+
+    def config(self, guild: Any, key: str, default: Any = None) -> Any:
+        return self.get(guild_id_of(guild)).config(key, default)
+
+    def drop(self, guild_id: int) -> None:
+        self._states.pop(guild_id, None)
+
+    def __iter__(self) -> Iterator[GuildState]:
+        return iter(list(self._states.values()))
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+GUILDS = GuildStateRegistry()
+GUILDS.load_overrides()
+
+
+class GuildStates(commands.Cog):
+    """Binds shard ownership and drops a guild's state when the bot leaves it."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        GUILDS.bind(self.bot)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        GUILDS.drop(guild.id)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(GuildStates(bot))
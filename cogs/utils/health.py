@@ -44,6 +44,14 @@ class Health(commands.Cog):
         prof_diag = format_profanity_diag(self.bot)
         ticket_diag = format_ticket_kb_diag(self.bot)
         ctx = await resolve(interaction)
+        router = getattr(ag, "router", None) if ag else None
+        router_diag = router.summary() if router else "router=none"
+        breaker = getattr(ag, "llm_breaker", None) if ag else None
+        if breaker:
+            router_diag += " " + breaker.summary()
+        loopmon = self.bot.get_cog("LoopMonitor")
+        if loopmon:
+            router_diag += "\n" + loopmon.summary()
         msg = (
             f"trigger_reason={reason}\n"
             f"context channel={ctx.channel_name}/{ctx.channel_id} "
@@ -59,7 +67,8 @@ class Health(commands.Cog):
             f"suggestions={env.get('suggestions', 'unset')} "
             f"tickets_category={env.get('tickets_category', 'unset')} "
             f"wake_words_count={env.get('wake_words_count', 0)} "
-            f"deprecated_keys_detected={env.get('deprecated_keys_detected', False)}"
+            f"deprecated_keys_detected={env.get('deprecated_keys_detected', False)}\n"
+            f"{router_diag}"
         )
         await interaction.response.send_message(msg, ephemeral=True)
 
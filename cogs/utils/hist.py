@@ -0,0 +1,95 @@
+# cogs/utils/hist.py
+"""Fixed-memory log-linear latency histogram (HdrHistogram-style, pure Python).
+
+Each power-of-two octave above ``min_s`` is split into ``sub`` linear
+buckets, so percentiles carry at most ~1/(2*sub) relative error while
+``record`` stays O(1) and the memory stays a few hundred ints.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterator, List, Tuple
+
+DEFAULT_MIN_S = 1e-5   # 10 µs
+DEFAULT_OCTAVES = 24   # 10 µs … ~168 s
+DEFAULT_SUB = 8
+
+
+class LatencyHistogram:
+    __slots__ = ("min_s", "sub", "counts", "count", "total", "max")
+
+    def __init__(self, min_s: float = DEFAULT_MIN_S, octaves: int = DEFAULT_OCTAVES, sub: int = DEFAULT_SUB):
+        self.min_s = min_s
+        self.sub = sub
+        # 0: <= min_s, utolsó: túlcsordulás
+        self.counts: List[int] = [0] * (octaves * sub + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, v: float) -> int:
+        if v <= self.min_s:
+            return 0
+        m, e = math.frexp(v / self.min_s)  # v/min = m * 2**e, 0.5 <= m < 1
+        idx = (e - 1) * self.sub + int((m - 0.5) * 2 * self.sub) + 1
+        return min(idx, len(self.counts) - 1)
+
+    def upper_bound(self, idx: int) -> float:
+        if idx <= 0:
+            return self.min_s
+        if idx >= len(self.counts) - 1:
+            return math.inf
+        e, s = divmod(idx - 1, self.sub)
+        return self.min_s * (2 ** (e + 1)) * (0.5 + (s + 1) / (2 * self.sub))
+
+    def record(self, value_s: float) -> None:
+        v = max(0.0, float(value_s))
+        self.counts[self._index(v)] += 1
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.upper_bound(idx), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """``(upper_bound_s, cumulative_count)`` for non-empty buckets (Prometheus ``le``)."""
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c:
+                seen += c
+                yield self.upper_bound(idx), seen
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self, unit: str = "ms") -> str:
+        k = 1000.0 if unit == "ms" else 1.0
+        return (
+            f"n={self.count} p50={self.percentile(0.5) * k:.1f}{unit} "
+            f"p95={self.percentile(0.95) * k:.1f}{unit} p99={self.percentile(0.99) * k:.1f}{unit} "
+            f"max={self.max * k:.1f}{unit}"
+        )
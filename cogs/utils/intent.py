@@ -0,0 +1,223 @@
+# cogs/utils/intent.py
+"""Local fast-path intent classifier (hashed char n-grams + linear model).
+
+Pure Python on purpose: a few hundred sparse features per message, so
+inference stays well under a millisecond without NumPy.  Weights are a
+JSON file; without one the model is trained from the bundled seed set.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import random
+import re
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+log = logging.getLogger("ISERO.Intent")
+
+LABELS: Tuple[str, ...] = ("chitchat", "thanks", "question", "promo", "complaint")
+# ezekre nem kell LLM hívás (canned válasz vagy csend)
+SKIP_LABELS = frozenset({"chitchat", "thanks"})
+
+DEFAULT_DIM = 1 << 15
+DEFAULT_MODEL_PATH = "config/intent_model.json"
+DEFAULT_SEED_PATH = "config/intent_seed.jsonl"
+
+# logolt `signals.intent` → classifier címke (offline tanításhoz)
+SIGNAL_LABELS = {
+    "buy": "promo",
+    "brief": "promo",
+    "help": "question",
+}
+
+_RE_WS = re.compile(r"\s+")
+_RE_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    t = unicodedata.normalize("NFC", (text or "").lower())
+    t = re.sub(r"(.)\1{2,}", r"\1\1", t)  # "köszííí" → "köszíí"
+    return _RE_WS.sub(" ", t).strip()
+
+
+def _is_symbol_only(text: str) -> bool:
+    return bool(text) and not any(ch.isalnum() for ch in text)
+
+
+def _h(token: str, dim: int) -> int:
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+
+def featurize(text: str, dim: int = DEFAULT_DIM) -> Dict[int, float]:
+    """Hashed char 2–4-grams + word unigrams + a few shape flags."""
+    t = normalize(text)
+    feats: Dict[int, float] = {}
+    padded = f" {t} "
+    for n in (2, 3, 4):
+        for i in range(len(padded) - n + 1):
+            k = _h(f"c{n}:{padded[i:i + n]}", dim)
+            feats[k] = feats.get(k, 0.0) + 1.0
+    words = _RE_WORD.findall(t)
+    for w in words:
+        k = _h(f"w:{w}", dim)
+        feats[k] = feats.get(k, 0.0) + 1.0
+    if "?" in t:
+        feats[_h("f:qmark", dim)] = 1.0
+    if _is_symbol_only(t):
+        feats[_h("f:symbols", dim)] = 1.0
+    feats[_h(f"f:len{min(len(words), 6)}", dim)] = 1.0
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed features."""
+
+    def __init__(self, labels: Sequence[str] = LABELS, dim: int = DEFAULT_DIM):
+        self.labels = tuple(labels)
+        self.dim = dim
+        self.bias: List[float] = [0.0] * len(self.labels)
+        self.weights: Dict[int, List[float]] = {}
+
+    # ---- inference ----
+    def scores(self, text: str) -> List[float]:
+        out = list(self.bias)
+        n = len(out)
+        for k, v in featurize(text, self.dim).items():
+            w = self.weights.get(k)
+            if w is not None:
+                for j in range(n):
+                    out[j] += w[j] * v
+        return out
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        s = self.scores(text)
+        m = max(s)
+        exp = [math.exp(x - m) for x in s]
+        tot = sum(exp)
+        return {lab: e / tot for lab, e in zip(self.labels, exp)}
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        if _is_symbol_only(normalize(text)):
+            # csak emoji / írásjel: biztosan nem kell rá LLM
+            return "chitchat", 1.0
+        proba = self.predict_proba(text)
+        label = max(proba, key=proba.__getitem__)
+        return label, proba[label]
+
+    # ---- training ----
+    def fit(self, samples: Iterable[Tuple[str, str]], *, epochs: int = 30, lr: float = 0.5,
+            l2: float = 1e-4, seed: int = 7) -> "IntentClassifier":
+        data = [(featurize(t, self.dim), self.labels.index(y)) for t, y in samples if y in self.labels]
+        rng = random.Random(seed)
+        n = len(self.labels)
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for feats, y in data:
+                s = list(self.bias)
+                for k, v in feats.items():
+                    w = self.weights.get(k)
+                    if w is not None:
+                        for j in range(n):
+                            s[j] += w[j] * v
+                m = max(s)
+                exp = [math.exp(x - m) for x in s]
+                tot = sum(exp)
+                grad = [e / tot for e in exp]
+                grad[y] -= 1.0
+                for j in range(n):
+                    self.bias[j] -= lr * grad[j]
+                for k, v in feats.items():
+                    w = self.weights.setdefault(k, [0.0] * n)
+                    for j in range(n):
+                        w[j] -= lr * (grad[j] * v + l2 * w[j])
+        return self
+
+    # ---- persistence ----
+    def to_dict(self) -> dict:
+        return {
+            "labels": list(self.labels),
+            "dim": self.dim,
+            "bias": [round(b, 6) for b in self.bias],
+            "weights": {str(k): [round(x, 6) for x in w] for k, w in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IntentClassifier":
+        clf = cls(labels=data.get("labels") or LABELS, dim=int(data.get("dim") or DEFAULT_DIM))
+        clf.bias = [float(x) for x in data.get("bias") or clf.bias]
+        clf.weights = {int(k): [float(x) for x in w] for k, w in (data.get("weights") or {}).items()}
+        return clf
+
+    def save(self, path: str) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def read_samples(path: str) -> List[Tuple[str, str]]:
+    """Read JSONL rows of ``{"text", "label"}`` or ``{"text", "intent"}`` (signals export)."""
+    out: List[Tuple[str, str]] = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        text = str(row.get("text") or row.get("content") or "")
+        label = row.get("label") or SIGNAL_LABELS.get(str(row.get("intent") or ""))
+        if text and label:
+            out.append((text, str(label)))
+    return out
+
+
+_DEFAULT: Optional[IntentClassifier] = None
+
+
+def get_classifier() -> IntentClassifier:
+    """Process-wide classifier: saved weights if present, else trained from the seed set."""
+    global _DEFAULT
+    if _DEFAULT is not None:
+        return _DEFAULT
+    model_path = os.getenv("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH)
+    seed_path = os.getenv("INTENT_SEED_PATH", DEFAULT_SEED_PATH)
+    clf: Optional[IntentClassifier] = None
+    if Path(model_path).exists():
+        try:
+            clf = IntentClassifier.load(model_path)
+            log.info("intent model loaded: %s (%d features)", model_path, len(clf.weights))
+        except Exception as e:
+            log.warning("intent model load failed %s: %s", model_path, e)
+    if clf is None:
+        clf = IntentClassifier()
+        try:
+            samples = read_samples(seed_path)
+            clf.fit(samples)
+            log.info("intent model trained from seed: %s (%d samples)", seed_path, len(samples))
+        except Exception as e:
+            log.warning("intent seed training failed %s: %s", seed_path, e)
+    _DEFAULT = clf
+    return clf
+
+
+# ---- canned replies a fast-path címkékhez ----
+_CANNED = {
+    ("thanks", "hu"): "Szívesen. 😉",
+    ("thanks", "en"): "Anytime.",
+    ("chitchat", "hu"): "Itt vagyok. Ha kérdésed van, kérdezz.",
+    ("chitchat", "en"): "I'm here. Ask if you need something.",
+}
+
+
+def canned_reply(label: str, locale: str = "hu") -> Optional[str]:
+    lang = "hu" if (locale or "hu").lower().startswith("hu") else "en"
+    return _CANNED.get((label, lang))
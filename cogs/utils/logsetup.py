@@ -1,23 +1,313 @@
+# cogs/utils/logsetup.py
+"""Process-wide logging: queue handler on the loop, writer thread for I/O.
+
+``setup_logging()`` (called once from ``bot/bot.py``) installs a single root
+``QueueHandler``; formatting and the stdout write happen on a
+``QueueListener`` thread, so a log call on the event loop is a record copy
+plus a queue put.  loguru calls are forwarded into the same pipeline.
+
+* ``LOG_FORMAT=json`` (default) emits one JSON object per line; pass
+  ``extra=msg_extra(message)`` to attach guild/channel/user/message ids;
+* ``LOG_SAMPLE_BURST`` / ``LOG_SAMPLE_WINDOW_S``: DEBUG records (and INFO from
+  the ``LOG_SAMPLE_LOGGERS`` prefixes) from the same call site pass at most
+  ``burst`` times per window, the rest are counted and reported as
+  ``suppressed`` on the next record that passes;
+* ``LOG_MIRROR_CHANNEL_ID``: WARNING+ records are batched and posted to a
+  Discord channel every ``LOG_MIRROR_INTERVAL_S`` by the LogSetup cog.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
 from discord.ext import commands
 
 LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
 
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+LOG_LEVEL = (os.getenv("LOG_LEVEL", "INFO") or "INFO").upper()
+LOG_STYLE = (os.getenv("LOG_FORMAT", "json") or "json").lower()
+LOG_SAMPLE_BURST = _env_int("LOG_SAMPLE_BURST", 20)
+LOG_SAMPLE_WINDOW_S = _env_float("LOG_SAMPLE_WINDOW_S", 10.0)
+# ezeknek a loggereknek (prefix) az INFO sorait is mintavételezzük
+LOG_SAMPLE_LOGGERS = tuple(p.strip() for p in os.getenv("LOG_SAMPLE_LOGGERS", "").split(",") if p.strip())
+LOG_SAMPLE_MAX_KEYS = 2000
+LOG_MIRROR_CHANNEL_ID = _env_int("LOG_MIRROR_CHANNEL_ID", 0)
+LOG_MIRROR_LEVEL = (os.getenv("LOG_MIRROR_LEVEL", "WARNING") or "WARNING").upper()
+LOG_MIRROR_INTERVAL_S = _env_float("LOG_MIRROR_INTERVAL_S", 5.0)
+
+# ezek a LogRecord saját mezői, nem "extra"
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+CONTEXT_KEYS = ("guild_id", "channel_id", "user_id", "message_id")
+
+
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
+
+def msg_extra(message: Any) -> Dict[str, int]:
+    """``extra=`` ids for a discord.Message (missing parts are skipped)."""
+    out: Dict[str, int] = {}
+    for key, obj in (("guild_id", getattr(message, "guild", None)),
+                     ("channel_id", getattr(message, "channel", None)),
+                     ("user_id", getattr(message, "author", None))):
+        oid = getattr(obj, "id", None)
+        if oid is not None:
+            out[key] = oid
+    if getattr(message, "id", None) is not None:
+        out["message_id"] = message.id
+    return out
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra`` fields are kept as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED and not k.startswith("_"):
+                doc[k] = v
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            doc["exc"] = record.exc_text
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Per call site (``logger, pathname, lineno``) burst limit for DEBUG records.
+
+    INFO is sampled only for the ``loggers`` prefixes; the call site also
+    groups loguru-forwarded lines, whose ``msg`` is already formatted.
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window_s: float = LOG_SAMPLE_WINDOW_S,
+                 loggers: Tuple[str, ...] = LOG_SAMPLE_LOGGERS, max_keys: int = LOG_SAMPLE_MAX_KEYS,
+                 clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.window_s = window_s
+        self.loggers = loggers
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [ablak kezdete, átengedett, elnyelt]; ablakkezdés szerinti sorrendben
+        self._state: "OrderedDict[Tuple[str, str, int], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()  # a hívó szálakról fut
+
+    def _sampled(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG:
+            return True
+        return record.levelno < logging.WARNING and record.name.startswith(self.loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or not self._sampled(record):
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            now = self.clock()
+            st = self._state.get(key)
+            if st is None or now - st[0] >= self.window_s:
+                dropped = int(st[2]) if st else 0
+                self._state[key] = [now, 1, 0]
+                self._state.move_to_end(key)
+                if dropped:
+                    record.suppressed = dropped
+                while len(self._state) > self.max_keys:
+                    self._state.popitem(last=False)  # a legrégebbi ablak megy
+                return True
+            if st[1] < self.burst:
+                st[1] += 1
+                return True
+            st[2] += 1
+            return False
+
+
+class DiscordMirror(logging.Handler):
+    """Buffers formatted records for the LogSetup cog's batched sender.
+
+    Runs on the listener thread; ``deque.append`` / ``popleft`` are atomic, so
+    the loop side only drains it.
+    """
+
+    def __init__(self, level: int = logging.WARNING, maxlen: int = 200):
+        super().__init__(level)
+        self.buffer: Deque[str] = deque(maxlen=maxlen)
+        self.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # a saját discord küldés hibái ne gerjesszenek újabb tükrözést
+        if record.name.startswith("discord.http"):
+            return
+        try:
+            self.buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def drain(self, limit: int = 1900) -> List[str]:
+        """Pop lines into chunks of at most ``limit`` chars (one per message)."""
+        chunks: List[str] = []
+        cur = ""
+        while self.buffer:
+            line = self.buffer.popleft()[: limit - 10]
+            if cur and len(cur) + len(line) + 1 > limit:
+                chunks.append(cur)
+                cur = ""
+            cur = f"{cur}\n{line}" if cur else line
+        if cur:
+            chunks.append(cur)
+        return chunks
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Like QueueHandler, but the traceback stays a separate field (JSON ``"exc"``).
+
+    The stock ``prepare`` merges it into ``msg``; here it is rendered to
+    ``exc_text`` on the calling thread (the frames are not shipped) and the
+    formatters on the listener thread decide where it goes.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LoguruToStdlib(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        # loguru `bind()` mezők → ugyanolyan top-level kulcsok, mint az extra=
+        bound = record.__dict__.pop("extra", None)
+        if isinstance(bound, dict):
+            record.__dict__.update(bound)
+        # Logger.handle nem nézi a szintet: a LOG_LEVEL alatti loguru sorok itt esnek ki
+        target = logging.getLogger(record.name)
+        if target.isEnabledFor(record.levelno):
+            target.handle(record)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_mirror: Optional[DiscordMirror] = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: str = LOG_LEVEL, style: str = LOG_STYLE, stream=None) -> logging.handlers.QueueListener:
+    """Install the queue pipeline on the root logger (idempotent)."""
+    global _listener, _mirror
+    with _lock:
+        if _listener is not None:
+            return _listener
+        out = logging.StreamHandler(stream or sys.stdout)
+        out.setFormatter(JsonFormatter() if style == "json" else logging.Formatter(LOG_FORMAT))
+        handlers: List[logging.Handler] = [out]
+        if LOG_MIRROR_CHANNEL_ID:
+            _mirror = DiscordMirror(logging.getLevelName(LOG_MIRROR_LEVEL))
+            handlers.append(_mirror)
+
+        q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        qh = _QueueHandler(q)
+        qh.addFilter(SampleFilter())
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(qh)
+        root.setLevel(level)
+        # A discord.client loggerét lejjebb vesszük, hogy a PyNaCl WARNING ne zavarjon
+        logging.getLogger("discord.client").setLevel(logging.ERROR)
+
+        _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        try:
+            from loguru import logger as _loguru
+            _loguru.remove()
+            _loguru.add(_LoguruToStdlib(), format="{message}", level=0)
+        except Exception:  # loguru opcionális
+            pass
+        return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush and stop the writer thread (tests / clean exit)."""
+    global _listener, _mirror
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        _mirror = None
+
+
 class LogSetup(commands.Cog):
+    """Batched Discord mirror of WARNING+ records (``LOG_MIRROR_CHANNEL_ID``)."""
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Alap logging
-        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        setup_logging()
+        self._task: Optional[asyncio.Task] = None
 
-        # A discord.client loggerét lejjebb vesszük, hogy a PyNaCl WARNING ne zavarjon
-        logging.getLogger("discord.client").setLevel(logging.ERROR)
+    async def cog_load(self):
+        if _mirror is not None:
+            self._task = asyncio.create_task(self._mirror_loop(_mirror), name="isero: log-mirror")
+
+    async def cog_unload(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _mirror_loop(self, mirror: DiscordMirror):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(LOG_MIRROR_INTERVAL_S)
+            chunks = mirror.drain()
+            if not chunks:
+                continue
+            ch = self.bot.get_channel(LOG_MIRROR_CHANNEL_ID)
+            if ch is None:
+                continue
+            for chunk in chunks[:3]:  # egy körben max 3 üzenet, a többi eldobva
+                try:
+                    await ch.send(f"```\n{chunk}\n```")
+                except Exception:
+                    break
 
     @commands.Cog.listener()
     async def on_ready(self):
         logging.getLogger("bot").info("LogSetup ready.")
 
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(LogSetup(bot))
@@ -0,0 +1,253 @@
+# cogs/utils/loopmon.py
+"""Event-loop health: lag sampler, slow-callback detector, opt-in sampling profiler.
+
+* lag: a task sleeps ``LOOP_LAG_INTERVAL_S`` and records how late it woke up
+  (everything that blocked the loop in between shows up here);
+* slow callbacks: ``asyncio.Handle._run`` is wrapped with a timer (the only
+  per-callback cost); anything over ``LOOP_SLOW_CALLBACK_MS`` is attributed
+  to its task name + await chain, resolved after the slow step (e.g.
+  ``discord.py: on_message ProfanityWatcher.on_message``);
+* profiler: ``/loopprof`` (or ``LOOP_PROFILE_AUTO`` on a lag spike) samples the
+  loop thread's stack and writes folded stacks (flamegraph.pl / speedscope).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from cogs.utils.hist import LatencyHistogram
+from config import GUILD_ID
+
+log = logging.getLogger("ISERO.LoopMon")
+
+if GUILD_ID:
+    _guilds = app_commands.guilds(discord.Object(id=GUILD_ID))
+else:
+    def _guilds(func):
+        return func
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+LOOP_LAG_INTERVAL_S = _env_float("LOOP_LAG_INTERVAL_S", 0.5)
+LOOP_LAG_WARN_MS = _env_float("LOOP_LAG_WARN_MS", 250)
+LOOP_SLOW_CALLBACK_MS = _env_float("LOOP_SLOW_CALLBACK_MS", 100)
+LOOP_PROFILE_DIR = os.getenv("LOOP_PROFILE_DIR", "logs")
+LOOP_PROFILE_AUTO = (os.getenv("LOOP_PROFILE_AUTO", "false") or "").lower() in {"1", "true", "yes", "on"}
+LOOP_PROFILE_AUTO_COOLDOWN_S = 600
+OWNER_ID = int(os.getenv("OWNER_ID", "0") or "0")
+
+
+# ---- slow callback detector ----
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def await_chain(handle: asyncio.Handle) -> Optional[Tuple[asyncio.Task, List[str]]]:
+    """Task + qualnames of the coroutines it is suspended in (outermost first)."""
+    task = getattr(getattr(handle, "_callback", None), "__self__", None)
+    if not isinstance(task, asyncio.Task):
+        return None
+    names: List[str] = []
+    coro = task.get_coro()
+    while coro is not None and len(names) < 8:
+        q = getattr(coro, "__qualname__", None)
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+        if q and not (code and code.co_filename.startswith(_ASYNCIO_DIR)):
+            names.append(q)
+        coro = getattr(coro, "cr_await", None)
+    return task, names
+
+
+def describe_handle(handle: asyncio.Handle, chain=None) -> str:
+    """Task name + innermost awaited coroutines for a loop callback."""
+    chain = chain or await_chain(handle)
+    if chain:
+        task, names = chain
+        return f"{task.get_name()} {' > '.join(names[-2:]) or '?'}"
+    cb = getattr(handle, "_callback", None)
+    return getattr(cb, "__qualname__", None) or repr(cb)
+
+
+class SlowCallbacks:
+    """Per-callback ``(count, total_s, max_s)`` above a threshold."""
+
+    def __init__(self, threshold_s: float):
+        self.threshold_s = threshold_s
+        self.hist = LatencyHistogram()
+        self.stats: Dict[str, List[float]] = {}
+        self._orig_run = None
+
+    def record(self, name: str, dt: float) -> None:
+        self.hist.record(dt)
+        st = self.stats.setdefault(name, [0, 0.0, 0.0])
+        st[0] += 1
+        st[1] += dt
+        st[2] = max(st[2], dt)
+        if len(self.stats) > 500:
+            # ritka zaj kiszórása, hogy ne nőjön korlátlanul
+            for k in sorted(self.stats, key=lambda k: self.stats[k][1])[:250]:
+                del self.stats[k]
+
+    def top(self, n: int = 5) -> List[Tuple[str, int, float, float]]:
+        rows = sorted(self.stats.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [(k, int(v[0]), v[1], v[2]) for k, v in rows]
+
+    def install(self) -> None:
+        if self._orig_run is not None or self.threshold_s <= 0:
+            return
+        orig = asyncio.events.Handle._run
+        threshold = self.threshold_s
+        perf = time.perf_counter
+
+        def _run(handle):
+            # a forró úton csak időmérés; a lánc feloldása csak a lassú lépésnél
+            # (a lépés utáni állapot: ahol a task legközelebb felfüggesztődött)
+            t0 = perf()
+            orig(handle)
+            dt = perf() - t0
+            if dt >= threshold:
+                try:
+                    self.record(describe_handle(handle), dt)
+                except Exception:
+                    pass
+
+        self._orig_run = orig
+        asyncio.events.Handle._run = _run
+
+    def uninstall(self) -> None:
+        if self._orig_run is not None:
+            asyncio.events.Handle._run = self._orig_run
+            self._orig_run = None
+
+
+# ---- sampling profiler ----
+def _folded(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def sample_thread(thread_id: int, seconds: float, interval_s: float = 0.005) -> Counter:
+    """Sample ``thread_id``'s stack for ``seconds``; returns folded stack counts."""
+    stacks: Counter = Counter()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[_folded(frame)] += 1
+        time.sleep(interval_s)
+    return stacks
+
+
+def write_profile(stacks: Counter, directory: str = LOOP_PROFILE_DIR) -> Path:
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = Path(directory) / time.strftime("loopprof-%Y%m%d-%H%M%S.folded")
+    path.write_text("".join(f"{k} {v}\n" for k, v in stacks.most_common()), encoding="utf-8")
+    return path
+
+
+def top_frames(stacks: Counter, n: int = 5) -> List[Tuple[str, int]]:
+    """Leaf frames by sample count, ignoring the idle selector wait."""
+    leaves: Counter = Counter()
+    for stack, c in stacks.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        if leaf.startswith("selectors.py:") or leaf.endswith(":select"):
+            continue
+        leaves[leaf] += c
+    return leaves.most_common(n)
+
+
+class LoopMonitor(commands.Cog):
+    """Loop lag histogram + slow callback attribution for /diag."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.lag = LatencyHistogram()
+        self.slow = SlowCallbacks(LOOP_SLOW_CALLBACK_MS / 1000)
+        self._task: Optional[asyncio.Task] = None
+        self._loop_thread: Optional[int] = None
+        self._profiling = False
+        self._last_auto = 0.0
+        self._auto_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        self._loop_thread = threading.get_ident()
+        self.slow.install()
+        self._task = asyncio.create_task(self._lag_sampler(), name="isero: loop-lag")
+
+    async def cog_unload(self):
+        self.slow.uninstall()
+        if self._task:
+            self._task.cancel()
+
+    async def _lag_sampler(self):
+        interval = LOOP_LAG_INTERVAL_S
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - t0 - interval)
+            self.lag.record(lag)
+            if lag * 1000 >= LOOP_LAG_WARN_MS:
+                top = self.slow.top(1)
+                log.warning("event loop lag %.0f ms (worst callback: %s)", lag * 1000,
+                            top[0][0] if top else "n/a")
+                if LOOP_PROFILE_AUTO and time.monotonic() - self._last_auto > LOOP_PROFILE_AUTO_COOLDOWN_S:
+                    self._last_auto = time.monotonic()
+                    self._auto_task = asyncio.create_task(self.profile(10.0))
+
+    async def profile(self, seconds: float) -> Tuple[Optional[Path], List[Tuple[str, int]]]:
+        if self._profiling or self._loop_thread is None:
+            return None, []
+        self._profiling = True
+        try:
+            stacks = await asyncio.to_thread(sample_thread, self._loop_thread, seconds)
+            path = await asyncio.to_thread(write_profile, stacks)
+            log.info("loop profile written: %s (%d samples)", path, sum(stacks.values()))
+            return path, top_frames(stacks)
+        finally:
+            self._profiling = False
+
+    def summary(self) -> str:
+        top = self.slow.top(3)
+        worst = "; ".join(f"{name} x{n} max={mx * 1000:.0f}ms" for name, n, _, mx in top) or "none"
+        return (
+            f"loop lag {self.lag.summary()}\n"
+            f"slow_callbacks(>{LOOP_SLOW_CALLBACK_MS:.0f}ms) n={self.slow.hist.count} worst: {worst}"
+        )
+
+    @app_commands.command(name="loopprof", description="Sampling profile of the event loop (owner/admin)")
+    @app_commands.describe(seconds="Mintavételezés hossza (1–60 mp)")
+    @_guilds
+    async def loopprof(self, itx: discord.Interaction, seconds: app_commands.Range[int, 1, 60] = 10):
+        member = itx.user if isinstance(itx.user, discord.Member) else None
+        if not (itx.user.id == OWNER_ID or (member and member.guild_permissions.manage_guild)):
+            return await itx.response.send_message("Nincs jogod ehhez.", ephemeral=True)
+        if self._profiling:
+            return await itx.response.send_message("Már fut egy profil.", ephemeral=True)
+        await itx.response.defer(ephemeral=True, thinking=True)
+        path, top = await self.profile(float(seconds))
+        lines = [f"`{frame}` {n}" for frame, n in top] or ["(csak üresjárat)"]
+        await itx.followup.send(f"Profil: `{path}`\n" + "\n".join(lines), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(LoopMonitor(bot))
@@ -0,0 +1,256 @@
+# cogs/utils/metrics.py
+"""Lightweight Prometheus-style metrics (counters, gauges, histograms).
+
+Everything is updated from the event loop thread, so children are plain
+Python attributes — no locks, an ``inc()`` is a dict lookup plus an add.
+Metrics are created once at import time::
+
+    TICKETS_OPENED = REGISTRY.counter("isero_tickets_opened_total", "Tickets opened", ("kind",))
+    TICKETS_OPENED.labels("mebinu").inc()
+
+``REGISTRY.render()`` produces the text exposition format served on the
+local ``/metrics`` listener (``METRICS_HTTP_PORT``).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from discord.ext import commands
+
+from cogs.utils.hist import LatencyHistogram
+
+log = logging.getLogger("ISERO.Metrics")
+
+METRICS_HTTP_HOST = os.getenv("METRICS_HTTP_HOST", "127.0.0.1")
+METRICS_HTTP_PORT = int(os.getenv("METRICS_HTTP_PORT", "0") or "0")
+
+# Prometheus `le` határok (fix halmaz, hogy a scrape-ek összevethetők legyenek)
+EXPORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else f"{v:.6g}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _Timer:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist: LatencyHistogram):
+        self._hist = hist
+        self._t0 = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._t0 = time.monotonic()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._hist.record(time.monotonic() - self._t0)
+
+
+class _HistogramChild(LatencyHistogram):
+    __slots__ = ()
+
+    def observe(self, value: float) -> None:
+        self.record(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Metric:
+    type = "untyped"
+    _child_cls: type = _CounterChild
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self.labels()  # címke nélküli metrika 0-val is megjelenik
+
+    def labels(self, *values) -> object:
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            child = self.children[key] = self._child_cls()
+        return child
+
+    def _labelstr(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{n}="{_esc(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        out = self.header()
+        for key, child in sorted(self.children.items()):
+            out.append(f"{self.name}{self._labelstr(key)} {_fmt(child.value)}")
+        return out
+
+
+class Counter(Metric):
+    type = "counter"
+    _child_cls = _CounterChild
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+    _child_cls = _GaugeChild
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Evaluate ``fn`` at scrape time (unlabelled gauges only)."""
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                self.set(self._fn())
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(Metric):
+    type = "histogram"
+    _child_cls = _HistogramChild
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def render(self) -> List[str]:
+        out = self.header()
+        for key, h in sorted(self.children.items()):
+            cum = list(h.cumulative())
+            i = seen = 0
+            for le in EXPORT_BUCKETS:
+                while i < len(cum) and cum[i][0] <= le:
+                    seen = cum[i][1]
+                    i += 1
+                le_lab = 'le="%s"' % le
+                out.append(f"{self.name}_bucket{self._labelstr(key, le_lab)} {seen}")
+            inf_lab = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{self._labelstr(key, inf_lab)} {h.count}")
+            out.append(f"{self.name}_sum{self._labelstr(key)} {h.total:.6f}")
+            out.append(f"{self.name}_count{self._labelstr(key)} {h.count}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _get(self, cls, name: str, help_text: str, labelnames: Sequence[str]) -> Metric:
+        m = self.metrics.get(name)
+        if m is None:
+            m = self.metrics[name] = cls(name, help_text, labelnames)
+        elif not isinstance(m, cls) or m.labelnames != tuple(labelnames):
+            raise ValueError(f"metric {name} already registered as {m.type}{m.labelnames}")
+        return m
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)  # type: ignore[return-value]
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames)  # type: ignore[return-value]
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metrics(commands.Cog):
+    """Local ``/metrics`` listener (only when ``METRICS_HTTP_PORT`` is set)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._runner = None
+
+    async def cog_load(self):
+        if METRICS_HTTP_PORT:
+            await self._start_http(METRICS_HTTP_HOST, METRICS_HTTP_PORT)
+
+    async def cog_unload(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _start_http(self, host: str, port: int) -> None:
+        from aiohttp import web
+
+        async def metrics(_request):
+            return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info("metrics on http://%s:%d/metrics", host, port)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Metrics(bot))
@@ -0,0 +1,188 @@
+# cogs/utils/modlog.py
+"""Coalescing mod-log sender.
+
+Moderation code calls ``MODLOG.post(channel, embed)`` — a synchronous queue
+append, it never awaits Discord.  A background task flushes every
+``MODLOG_FLUSH_S`` seconds, packing up to 10 embeds (and at most 6000 embed
+characters) into one message and sending at most ``MODLOG_BUCKET_SENDS``
+messages per ``MODLOG_BUCKET_WINDOW_S`` per channel, so a raid costs a few
+mod-log messages instead of one per event and never competes with
+user-facing replies for the bucket.  When a channel queue is full, new
+events are dropped and summarised in a single embed on the next flush.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+import discord
+
+from cogs.utils.metrics import REGISTRY
+from cogs.utils.outbound import OUTBOUND, Prio
+
+log = logging.getLogger("ISERO.ModLog")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+MODLOG_FLUSH_S = _env_float("MODLOG_FLUSH_S", 2.0)
+MODLOG_MAX_QUEUE = _env_int("MODLOG_MAX_QUEUE", 200)
+MODLOG_BUCKET_SENDS = _env_int("MODLOG_BUCKET_SENDS", 4)
+MODLOG_BUCKET_WINDOW_S = _env_float("MODLOG_BUCKET_WINDOW_S", 5.0)
+
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+
+M_EVENTS = REGISTRY.counter("isero_modlog_events_total", "Mod-log events by outcome", ("result",))
+M_MESSAGES = REGISTRY.counter("isero_modlog_messages_total", "Mod-log messages sent")
+M_QUEUED = REGISTRY.gauge("isero_modlog_queued", "Mod-log events waiting to be sent")
+
+
+def text_embed(text: str, *, title: Optional[str] = None, url: Optional[str] = None,
+               color: discord.Color = discord.Color.dark_grey()) -> discord.Embed:
+    """Only ``text`` is truncated; ``url`` (e.g. a jump link) links the title."""
+    em = discord.Embed(title=title, url=url, description=text[:1500], color=color)
+    em.timestamp = discord.utils.utcnow()
+    return em
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "embeds", "dropped", "sent_at")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.embeds: Deque[discord.Embed] = deque()
+        self.dropped: Counter = Counter()
+        self.sent_at: Deque[float] = deque()
+
+
+class ModLogDispatcher:
+    def __init__(self, flush_s: float = MODLOG_FLUSH_S, max_queue: int = MODLOG_MAX_QUEUE,
+                 bucket_sends: int = MODLOG_BUCKET_SENDS, bucket_window_s: float = MODLOG_BUCKET_WINDOW_S,
+                 clock=time.monotonic):
+        self.flush_s = flush_s
+        self.max_queue = max_queue
+        self.bucket_sends = max(1, bucket_sends)
+        self.bucket_window_s = bucket_window_s
+        self.clock = clock
+        self._queues: Dict[int, _ChannelQueue] = {}
+        self._task: Optional[asyncio.Task] = None
+        M_QUEUED.set_function(self.queued)
+
+    def queued(self) -> int:
+        return sum(len(q.embeds) for q in self._queues.values())
+
+    def post(self, channel, embed: discord.Embed) -> bool:
+        """Queue ``embed`` for ``channel``; False if it was dropped (overload)."""
+        if channel is None:
+            return False
+        q = self._queues.get(channel.id)
+        if q is None:
+            q = self._queues[channel.id] = _ChannelQueue(channel)
+        if len(q.embeds) >= self.max_queue:
+            q.dropped[embed.title or "event"] += 1
+            M_EVENTS.labels("dropped").inc()
+            return False
+        q.embeds.append(embed)
+        M_EVENTS.labels("queued").inc()
+        self._ensure_task()
+        return True
+
+    def _ensure_task(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # nincs futó loop (teszt/szkript): flush() kézzel
+        self._task = loop.create_task(self._run(), name="isero: modlog-flush")
+
+    async def _run(self) -> None:
+        while self._queues:
+            await asyncio.sleep(self.flush_s)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("modlog flush failed")
+
+    def _bucket_free(self, q: _ChannelQueue) -> int:
+        now = self.clock()
+        while q.sent_at and now - q.sent_at[0] >= self.bucket_window_s:
+            q.sent_at.popleft()
+        return self.bucket_sends - len(q.sent_at)
+
+    @staticmethod
+    def _take_batch(q: _ChannelQueue) -> List[discord.Embed]:
+        batch: List[discord.Embed] = []
+        chars = 0
+        while q.embeds and len(batch) < EMBEDS_PER_MESSAGE:
+            n = len(q.embeds[0])
+            if batch and chars + n > EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(q.embeds.popleft())
+            chars += n
+        return batch
+
+    @staticmethod
+    def _summary(dropped: Counter) -> discord.Embed:
+        total = sum(dropped.values())
+        top = ", ".join(f"{k} ×{n}" for k, n in dropped.most_common(5))
+        return text_embed(f"{total} esemény eldobva (túlterhelés): {top}",
+                          title="modlog overload", color=discord.Color.red())
+
+    async def flush(self) -> int:
+        """Send what the channel buckets allow; returns messages sent."""
+        sent = 0
+        for cid in list(self._queues):
+            q = self._queues[cid]
+            if q.dropped:  # az összesítő a limit fölött is belefér
+                q.embeds.append(self._summary(q.dropped))
+                q.dropped.clear()
+            while q.embeds and self._bucket_free(q) > 0:
+                batch = self._take_batch(q)
+                q.sent_at.append(self.clock())
+                try:
+                    await OUTBOUND.run(cid, Prio.LOG, lambda: q.channel.send(
+                        embeds=batch, allowed_mentions=discord.AllowedMentions.none()))
+                    M_MESSAGES.inc()
+                    sent += 1
+                except (discord.Forbidden, discord.NotFound) as e:
+                    # végleges hiba: ide úgysem tudunk írni
+                    M_EVENTS.labels("failed").inc(len(batch))
+                    log.warning("modlog send failed (%s): %s", cid, e)
+                    q.embeds.clear()
+                    break
+                except Exception as e:
+                    # átmeneti hiba (telített sor, 5xx): a köteg a sor elejére, a következő flush viszi
+                    q.embeds.extendleft(reversed(batch))
+                    M_EVENTS.labels("requeued").inc(len(batch))
+                    log.warning("modlog send failed (%s), retrying later: %s", cid, e)
+                    break
+            if not q.embeds and not q.dropped:
+                del self._queues[cid]
+        return sent
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+MODLOG = ModLogDispatcher()
@@ -0,0 +1,233 @@
+# cogs/utils/outbound.py
+"""Priority scheduler for outgoing Discord REST calls.
+
+Every send/delete goes through ``await OUTBOUND.run(channel_id, Prio.X, factory)``
+where ``factory`` returns the discord.py coroutine (``lambda: msg.delete()``).
+Calls are queued per ``(channel, route)`` — one in flight per queue, so the
+per-channel order of messages is kept — and when a slot frees up the most
+urgent head across all queues goes next:
+
+    MODERATION (deletes) > REPLY (agent answers, echoes, welcome) > LOG > CLEANUP
+
+Before starting a call the scheduler peeks at discord.py's rate-limit bucket
+for that channel route (``X-RateLimit-Remaining`` / reset as parsed by
+``HTTPClient``): an exhausted bucket parks the queue until reset instead of
+occupying a slot inside discord.py's sleep, and the last ``OUTBOUND_RESERVE``
+tokens are kept for MODERATION/REPLY.  LOG/CLEANUP work is rejected with
+:class:`OutboundDropped` once ``OUTBOUND_MAX_PENDING`` calls are queued.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from discord.ext import commands
+
+from cogs.utils.metrics import REGISTRY
+
+log = logging.getLogger("ISERO.Outbound")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+OUTBOUND_CONCURRENCY = _env_int("OUTBOUND_CONCURRENCY", 8)
+OUTBOUND_MAX_PENDING = _env_int("OUTBOUND_MAX_PENDING", 500)
+OUTBOUND_RESERVE = _env_int("OUTBOUND_RESERVE", 1)
+
+
+class Prio(IntEnum):
+    MODERATION = 0
+    REPLY = 1
+    LOG = 2
+    CLEANUP = 3
+
+
+# discord.py Route kulcsok (method, path) a bucket lekérdezéshez
+ROUTES = {
+    "send": ("POST", "/channels/{channel_id}/messages"),
+    "delete": ("DELETE", "/channels/{channel_id}/messages/{message_id}"),
+    # tagszerkesztés (szerepkör-szinkron): itt a "channel_id" kulcs a guild_id
+    "member": ("PATCH", "/guilds/{guild_id}/members/{user_id}"),
+}
+
+M_WAIT = REGISTRY.histogram("isero_outbound_wait_seconds", "Outbound call queue wait", ("prio",))
+M_DROPPED = REGISTRY.counter("isero_outbound_dropped_total", "Outbound calls rejected on overload", ("prio",))
+M_PARKED = REGISTRY.counter("isero_outbound_parked_total", "Queues parked on an exhausted bucket", ("prio",))
+
+
+class OutboundDropped(RuntimeError):
+    """Low-priority call rejected because the scheduler is saturated."""
+
+
+def bucket_state(http, route: str, channel_id: int) -> Optional[Tuple[int, float]]:
+    """``(remaining, reset_in_s)`` of discord.py's bucket for a channel route, if known."""
+    if http is None or route not in ROUTES:
+        return None
+    try:
+        route_key = "%s %s" % ROUTES[route]
+        bucket_hash = http._bucket_hashes.get(route_key)
+        rl = http._buckets.get(f"{bucket_hash or route_key}:{channel_id}")
+        if rl is None or rl.expires is None:
+            return None
+        reset_in = rl.expires - asyncio.get_running_loop().time()
+        if reset_in <= 0:
+            return None
+        return int(rl.remaining), reset_in
+    except Exception:  # belső API: ha változik, egyszerűen vakon ütemezünk
+        return None
+
+
+class _Item:
+    __slots__ = ("prio", "seq", "factory", "fut", "t0")
+
+    def __init__(self, prio: int, seq: int, factory, fut: asyncio.Future):
+        self.prio = prio
+        self.seq = seq
+        self.factory = factory
+        self.fut = fut
+        self.t0 = time.monotonic()
+
+    def __lt__(self, other: "_Item") -> bool:
+        return (self.prio, self.seq) < (other.prio, other.seq)
+
+
+class OutboundScheduler:
+    def __init__(self, concurrency: int = OUTBOUND_CONCURRENCY, max_pending: int = OUTBOUND_MAX_PENDING,
+                 reserve: int = OUTBOUND_RESERVE, http=None):
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.reserve = reserve
+        self.http = http
+        self._queues: Dict[Tuple[int, str], List[_Item]] = {}
+        self._busy: Set[Tuple[int, str]] = set()
+        self._inflight = 0
+        self._pending = 0
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, channel_id: int, prio: Prio, factory: Callable[[], Awaitable[Any]],
+               *, route: str = "send") -> asyncio.Future:
+        if self._pending >= self.max_pending and prio >= Prio.LOG:
+            M_DROPPED.labels(prio.name.lower()).inc()
+            raise OutboundDropped(f"outbound saturated ({self._pending} pending)")
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues.setdefault((channel_id, route), []),
+                       _Item(int(prio), next(self._seq), factory, fut))
+        self._pending += 1
+        self._pump()
+        return fut
+
+    async def run(self, channel_id: int, prio: Prio, factory: Callable[[], Awaitable[Any]],
+                  *, route: str = "send") -> Any:
+        """Queue the call and wait for its result (exceptions propagate)."""
+        return await self.submit(channel_id, prio, factory, route=route)
+
+    def _park_for(self, key: Tuple[int, str], prio: int) -> float:
+        st = bucket_state(self.http, key[1], key[0])
+        if st is None:
+            return 0.0
+        remaining, reset_in = st
+        if remaining <= 0 or (remaining <= self.reserve and prio >= Prio.LOG):
+            return reset_in
+        return 0.0
+
+    def _pump(self) -> None:
+        parked: Optional[float] = None
+        while self._inflight < self.concurrency:
+            best: Optional[Tuple[Tuple[int, str], _Item]] = None
+            for key, heap in self._queues.items():
+                while heap and heap[0].fut.done():  # a hívó közben feladta
+                    heapq.heappop(heap)
+                    self._pending -= 1
+                if not heap or key in self._busy:
+                    continue
+                head = heap[0]
+                if best is not None and not head < best[1]:
+                    continue
+                wait = self._park_for(key, head.prio)
+                if wait > 0:
+                    M_PARKED.labels(Prio(head.prio).name.lower()).inc()
+                    parked = wait if parked is None else min(parked, wait)
+                    continue
+                best = (key, head)
+            if best is None:
+                break
+            key, item = best
+            heapq.heappop(self._queues[key])
+            self._busy.add(key)
+            self._inflight += 1
+            M_WAIT.labels(Prio(item.prio).name.lower()).observe(time.monotonic() - item.t0)
+            asyncio.get_running_loop().create_task(self._exec(key, item))
+        for key in [k for k, h in self._queues.items() if not h and k not in self._busy]:
+            del self._queues[key]
+        if parked is not None:
+            self._schedule_wakeup(parked)
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._pump()
+
+    async def _exec(self, key: Tuple[int, str], item: _Item) -> None:
+        try:
+            result = await item.factory()
+        except asyncio.CancelledError:
+            item.fut.cancel()
+            raise
+        except BaseException as e:
+            if not item.fut.done():
+                item.fut.set_exception(e)
+        else:
+            if not item.fut.done():
+                item.fut.set_result(result)
+        finally:
+            self._busy.discard(key)
+            self._inflight -= 1
+            self._pending -= 1
+            self._pump()
+
+    def summary(self) -> str:
+        return f"outbound pending={self._pending} inflight={self._inflight} queues={len(self._queues)}"
+
+
+OUTBOUND = OutboundScheduler()
+
+
+class Outbound(commands.Cog):
+    """Binds the scheduler to the bot's HTTP client (bucket peeking)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        OUTBOUND.http = getattr(self.bot, "http", None)
+
+    async def cog_unload(self):
+        OUTBOUND.http = None
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Outbound(bot))
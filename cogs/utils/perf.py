@@ -0,0 +1,62 @@
+# cogs/utils/perf.py
+"""Per-stage latency histograms for the agent message path.
+
+``with PERF.stage("resolve"):`` feeds a fixed-memory histogram per stage.
+Exported with the rest of the metrics registry on ``/metrics`` and
+summarised by the ``/perf`` command.
+"""
+from __future__ import annotations
+
+from typing import List
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from cogs.utils.metrics import REGISTRY, Histogram
+from config import GUILD_ID
+
+if GUILD_ID:
+    _guilds = app_commands.guilds(discord.Object(id=GUILD_ID))
+else:
+    def _guilds(func):
+        return func
+
+
+class StageHistograms(Histogram):
+    """One latency histogram per stage label (``with PERF.stage("llm"): ...``)."""
+
+    def __init__(self, name: str, help_text: str, label: str = "stage"):
+        super().__init__(name, help_text, (label,))
+
+    def stage(self, stage: str):
+        return self.labels(stage).time()
+
+    def observe(self, stage: str, seconds: float) -> None:  # type: ignore[override]
+        self.labels(stage).observe(seconds)
+
+    def render_prometheus(self) -> str:
+        return "\n".join(self.render()) + "\n"
+
+    def summary_lines(self) -> List[str]:
+        return [f"{key[0]:<12} {h.summary()}" for key, h in sorted(self.children.items())]
+
+
+PERF = REGISTRY.register(StageHistograms("isero_agent_stage_seconds", "AgentGate.on_message stage latency in seconds"))
+
+
+class Perf(commands.Cog):
+    """/perf summary of the agent stage histograms."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="perf", description="Agent message path stage latencies")
+    @_guilds
+    async def perf(self, interaction: discord.Interaction) -> None:
+        lines = PERF.summary_lines() or ["(még nincs mérés)"]
+        await interaction.response.send_message("```\n" + "\n".join(lines) + "\n```", ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Perf(bot))
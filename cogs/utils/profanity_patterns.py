@@ -3,7 +3,8 @@ try:
     import regex as re  # supports Unicode properties like \P{L}
 except Exception:  # pragma: no cover
     import re
-from typing import Iterable, List, Tuple
+import time
+from typing import Iterable, List, Optional, Tuple
 
 __all__ = [
     "build_patterns",
@@ -96,10 +97,19 @@ def build_patterns_with_sepmax(words: Iterable[str], sepmax: int = 4, repeatmax:
 def build_patterns(words: Iterable[str]) -> List[re.Pattern]:
     return build_patterns_with_sepmax(words, sepmax=4, repeatmax=1)
 
-def find_matches(patterns: List[re.Pattern], text: str) -> List[Tuple[int, int]]:
+def find_matches(patterns: List[re.Pattern], text: str, timeout: Optional[float] = None) -> List[Tuple[int, int]]:
+    """Merged match spans.  ``timeout`` is a total budget in seconds across all
+    patterns (``regex`` module only); exceeding it raises ``TimeoutError``."""
     spans: List[Tuple[int, int]] = []
+    deadline = time.monotonic() + timeout if timeout and re.__name__ == "regex" else None
     for p in patterns:
-        for m in p.finditer(text):
+        kw = {}
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError("profanity scan budget exceeded")
+            kw["timeout"] = left
+        for m in p.finditer(text, **kw):
             spans.append((m.start(), m.end()))
     if not spans:
         return []
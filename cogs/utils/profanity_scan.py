@@ -0,0 +1,159 @@
+# cogs/utils/profanity_scan.py
+"""Off-loop profanity scanning for long messages.
+
+The tolerant patterns (``\\P{L}{0,n}`` separators, ``{1,n}`` repeats) are cheap
+on chat-sized text but can backtrack badly on long pastes.  Short messages
+are scanned inline; above ``min_chars`` the scan runs in a process pool whose
+workers compile the patterns once (pool initializer).  Every scan has a time
+budget via the ``regex`` module's ``timeout=``; on timeout we fall back to a
+literal word-prefix scan and, if that finds nothing, flag the message for
+human review instead of guessing.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import regex as re
+except Exception:  # pragma: no cover
+    import re
+
+from .profanity_patterns import build_patterns_with_sepmax, find_matches
+
+log = logging.getLogger("ISERO.ProfanityScan")
+
+Span = Tuple[int, int]
+
+STATUS_INLINE = "inline"
+STATUS_POOL = "pool"
+STATUS_FALLBACK = "fallback"   # budget túllépve, literális találat
+STATUS_REVIEW = "review"       # budget túllépve, nincs literális találat → staff nézze meg
+
+_RE_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class ScanResult:
+    spans: List[Span] = field(default_factory=list)
+    status: str = STATUS_INLINE
+
+    @property
+    def needs_review(self) -> bool:
+        return self.status == STATUS_REVIEW
+
+
+def literal_spans(words: Sequence[str], text: str) -> List[Span]:
+    """Linear-time fallback: tokens that start with a listed word (no obfuscation handling)."""
+    stems = tuple(w for w in (w.strip().lower() for w in words) if w and " " not in w)
+    if not stems:
+        return []
+    return [m.span() for m in _RE_TOKEN.finditer(text) if m.group(0).lower().startswith(stems)]
+
+
+def _scan(patterns, words: Sequence[str], text: str, timeout_s: Optional[float]) -> Tuple[List[Span], bool]:
+    """Return ``(spans, timed_out)``."""
+    try:
+        return find_matches(patterns, text, timeout=timeout_s), False
+    except TimeoutError:
+        return literal_spans(words, text), True
+
+
+# ---- worker oldal (külön processz) ----
+_W_PATTERNS: list = []
+_W_WORDS: Tuple[str, ...] = ()
+
+
+def _worker_init(words: Sequence[str], sepmax: int, repeatmax: int) -> None:
+    global _W_PATTERNS, _W_WORDS
+    _W_WORDS = tuple(words)
+    _W_PATTERNS = build_patterns_with_sepmax(_W_WORDS, sepmax=sepmax, repeatmax=repeatmax)
+
+
+def _worker_scan(text: str, timeout_s: Optional[float]) -> Tuple[List[Span], bool]:
+    return _scan(_W_PATTERNS, _W_WORDS, text, timeout_s)
+
+
+def _worker_ping() -> int:
+    return len(_W_PATTERNS)
+
+
+class ProfanityScanner:
+    """Inline scan for short text, process pool above ``min_chars``."""
+
+    def __init__(
+        self,
+        words: Sequence[str],
+        *,
+        sepmax: int = 4,
+        repeatmax: int = 6,
+        min_chars: int = 1000,
+        workers: int = 2,
+        timeout_s: Optional[float] = 0.25,
+        patterns: Optional[list] = None,
+    ):
+        self.words = tuple(words)
+        self.sepmax = sepmax
+        self.repeatmax = repeatmax
+        self.min_chars = min_chars
+        self.workers = workers
+        self.timeout_s = timeout_s if timeout_s and timeout_s > 0 else None
+        self.patterns = patterns if patterns is not None else build_patterns_with_sepmax(
+            self.words, sepmax=sepmax, repeatmax=repeatmax
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.timeouts = 0
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn: a bot processz szálait (discord, logging) nem forkoljuk
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(self.words, self.sepmax, self.repeatmax),
+            )
+        return self._pool
+
+    async def warm(self) -> None:
+        """Start the workers and compile the patterns before the first long paste."""
+        pool = self._get_pool()
+        if pool is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _worker_ping) for _ in range(self.workers)))
+
+    def scan_inline(self, text: str) -> ScanResult:
+        spans, timed_out = _scan(self.patterns, self.words, text, self.timeout_s)
+        return self._result(spans, timed_out, STATUS_INLINE)
+
+    async def scan(self, text: str) -> ScanResult:
+        pool = self._get_pool() if len(text) >= self.min_chars else None
+        if pool is None:
+            return self.scan_inline(text)
+        loop = asyncio.get_running_loop()
+        try:
+            spans, timed_out = await loop.run_in_executor(pool, _worker_scan, text, self.timeout_s)
+        except BrokenProcessPool:
+            log.warning("profanity pool broken; restarting, literal scan for this message")
+            self._pool = None
+            return self._result(literal_spans(self.words, text), True, STATUS_POOL)
+        return self._result(spans, timed_out, STATUS_POOL)
+
+    def _result(self, spans: List[Span], timed_out: bool, status: str) -> ScanResult:
+        if not timed_out:
+            return ScanResult(spans, status)
+        self.timeouts += 1
+        return ScanResult(spans, STATUS_FALLBACK if spans else STATUS_REVIEW)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
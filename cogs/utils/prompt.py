@@ -1,6 +1,13 @@
 import os
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
 import discord
 
+from cogs.utils.metrics import REGISTRY
+from cogs.utils.ticket_kb import kb_hash
+from cogs.agent.playerdb import player_db
+
 # region ISERO PATCH prompt-composer
 
 def _nsfw(ch: discord.abc.GuildChannel) -> str:
@@ -19,7 +26,7 @@ def _roles_str(member: discord.Member) -> str:
 def _player_snapshot(bot, user_id: int) -> str:
     if os.getenv("PLAYER_CARD_ENABLED", "false").lower() != "true":
         return ""
-    pcog = getattr(bot, "get_cog", lambda _n: None)("PlayerDB")
+    pcog = player_db(bot)
     if not pcog or not hasattr(pcog, "get_snapshot"):
         return ""
     try:
@@ -39,94 +46,141 @@ def _player_snapshot(bot, user_id: int) -> str:
     except Exception:
         return ""
 
-def compose_mebinu_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
-    """Mebinu értékesítő persona: NEM listáz, barátságos, egy kérdés/kör."""
+# region ISERO PATCH prompt-templates
+# A persona szövegek csak a KB-tól és az ENV-től függenek, ezért KB-betöltéskor
+# egyszer építjük fel őket; ticket nyitáskor már csak a csatorna/user meta kerül bele.
+@dataclass(frozen=True)
+class PromptTemplate:
+    head: str
+    tail: str = ""
+    show_nsfw: bool = True
+
+    def render(self, channel, opener, pc: str = "") -> str:
+        cat = getattr(channel, "category", None)
+        cat_name = cat.name if cat else "—"
+        meta_ch = f"Channel: {cat_name} / #{channel.name}"
+        if self.show_nsfw:
+            meta_ch += f" ({_nsfw(channel)})"
+        meta_user = f"User: {opener.display_name} • Roles: {_roles_str(opener)}"
+        if pc:
+            meta_user += f" • PlayerCard: {pc}"
+        out = f"{self.head}\n{meta_ch}\n{meta_user}"
+        return f"{out}\n{self.tail}" if self.tail else out
+
+
+_TEMPLATES: Dict[str, Dict[str, PromptTemplate]] = {}
+_TEMPLATE_CACHE = REGISTRY.counter("isero_prompt_template_cache_total", "Prompt template cache lookups", ("result",))
+
+
+def kb_version(kb: dict | None) -> str:
+    """Short hash of the ticket KB content.
+
+    ``load_ticket_kb`` stamps it once per load (``TicketKB.version``); other
+    dicts are hashed on every call.
+    """
+    if not kb:
+        return "empty"
+    ver = getattr(kb, "version", None)
+    return ver if ver is not None else kb_hash(kb)
+
+
+def _kb_lines(section: dict, *, with_questions: bool = False) -> Tuple[str, str, list]:
+    facts = ""; closes = ""; qs: list = []
+    if isinstance(section.get("facts"), list):
+        facts = "Facts: " + " | ".join(section["facts"][:6])
+    if isinstance(section.get("closing_lines"), list):
+        closes = "Closing cues: " + " || ".join(section["closing_lines"][:2])
+    if with_questions and isinstance(section.get("questions"), list):
+        qs = section["questions"][:4]
+    return facts, closes, qs
+
+
+def build_prompt_templates(kb: dict | None) -> Dict[str, PromptTemplate]:
+    """Precompute the per-persona templates for one KB version."""
+    kb = kb or {}
     sla_d = os.getenv("TICKET_DEFAULT_SLA_DAYS", "3")
-    cat = getattr(channel, "category", None)
-    cat_name = cat.name if cat else "—"
-    meta_ch = f"Channel: {cat_name} / #{channel.name}"
-    meta_user = f"User: {opener.display_name} • Roles: {_roles_str(opener)}"
-    pc = _player_snapshot(bot, opener.id)
-    if pc:
-        meta_user += f" • PlayerCard: {pc}"
-    persona = (
+    base_img = os.getenv("IMG_BASE_PRICE_USD", "6")
+    img_min  = os.getenv("IMG_BULK_MIN_QTY", "4")
+    img_off  = os.getenv("IMG_BULK_OFF_USD", "1")
+    per5     = os.getenv("VID_PRICE_PER_5S_USD", "20")
+    vid_min  = os.getenv("VID_BULK_MIN_QTY", "4")
+    vid_off  = os.getenv("VID_BULK_OFF_USD", "5")
+
+    mebinu = (
         "You are ISERO, a friendly, sales-savvy assistant for *Mebinu* character orders."
-        "\nRules:" 
+        "\nRules:"
         "\n• Ask exactly one focused question per turn (1–2 sentences)."
         "\n• Warm, playful tone; reply in user's language."
         "\n• Extract: variant/figure, colors & vibe, quantity, deadline, budget, refs."
         "\n• Subtle upsell if user seems open; never pushy."
         "\n• Never list multiple questions or mention internal limits."
-        f"\n• Typical turnaround ≈ {sla_d} days; confirm expectations." 
+        f"\n• Typical turnaround ≈ {sla_d} days; confirm expectations."
         "\nStart with a single welcoming question tailored to what the user said."
     )
-    return "\n".join([persona, meta_ch, meta_user])
-# endregion ISERO PATCH prompt-composer
 
-# region ISERO PATCH commission-prompt
-def compose_commission_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
-    base_img = os.getenv("IMG_BASE_PRICE_USD", "6")
-    img_min  = os.getenv("IMG_BULK_MIN_QTY", "4")
-    img_off  = os.getenv("IMG_BULK_OFF_USD", "1")
-    per5     = os.getenv("VID_PRICE_PER_5S_USD", "20")
-    vid_min  = os.getenv("VID_BULK_MIN_QTY", "4")
-    vid_off  = os.getenv("VID_BULK_OFF_USD", "5")
-    sla_d    = os.getenv("TICKET_DEFAULT_SLA_DAYS", "3")
-    cat = getattr(channel, "category", None)
-    cat_name = cat.name if cat else "—"
-    meta_ch = f"Channel: {cat_name} / #{channel.name} ({_nsfw(channel)})"
-    meta_user = f"User: {opener.display_name} • Roles: {_roles_str(opener)}"
-    pc = _player_snapshot(bot, opener.id)
-    if pc: meta_user += f" • PlayerCard: {pc}"
-    facts = ""; closes = ""
-    if kb:
-        cm = (kb.get("commission") or {})
-        if isinstance(cm.get("facts"), list):
-            facts = "Facts: " + " | ".join(cm["facts"][:6])
-        if isinstance(cm.get("closing_lines"), list):
-            closes = "Closing cues: " + " || ".join(cm["closing_lines"][:2])
-    persona = (
+    facts, closes, _ = _kb_lines(kb.get("commission") or {})
+    commission = (
         "You are ISERO, a sales-savvy creative agent for image/video commissions. "
         "Goal: clarify scope and close; reply in user's language; 1–3 sentences; one focused question each turn. "
         f"Images: ${base_img} each; {img_min}+ → -${img_off}/img. "
         f"Video: ${per5} per 5s block; {vid_min}+ videos → -${vid_off} per video. "
         f"Typical turnaround ≈ {sla_d} days. Detect qty/seconds/budget/style; confirm and move forward."
     )
-    lines = [persona, meta_ch, meta_user, (facts or "Facts: —"), (closes or "Closing cues: —"),
-             "If user greets, greet shortly and ask what they need: images or videos (or both)."]
-    return "\n".join(lines)
-# endregion ISERO PATCH commission-prompt
+    commission_tail = "\n".join([
+        facts or "Facts: —", closes or "Closing cues: —",
+        "If user greets, greet shortly and ask what they need: images or videos (or both).",
+    ])
 
-# region ISERO PATCH general-prompt
-def compose_general_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
-    sla_d = os.getenv("TICKET_DEFAULT_SLA_DAYS", "3")
-    cat = getattr(channel, "category", None)
-    cat_name = cat.name if cat else "—"
-    meta_ch = f"Channel: {cat_name} / #{channel.name} ({_nsfw(channel)})"
-    meta_user = f"User: {opener.display_name} • Roles: {_roles_str(opener)}"
-    pc = _player_snapshot(bot, opener.id)
-    if pc:
-        meta_user += f" • PlayerCard: {pc}"
-    facts = ""; closes = ""; qs = []
-    if kb:
-        gh = kb.get("general") or {}
-        if isinstance(gh.get("facts"), list):
-            facts = "Facts: " + " | ".join(gh["facts"][:6])
-        if isinstance(gh.get("closing_lines"), list):
-            closes = "Closing cues: " + " || ".join(gh["closing_lines"][:2])
-        if isinstance(gh.get("questions"), list):
-            qs = gh["questions"][:4]
-    persona = (
+    facts, closes, qs = _kb_lines(kb.get("general") or {}, with_questions=True)
+    general = (
         "You are ISERO, a concise, helpful support agent for General Help tickets. "
         "Goal: triage the issue and collect minimal reproducible details, then confirm next steps. "
         "Keep replies 1–3 sentences; ask exactly one focused question each turn; reply in user's language. "
         f"Typical turnaround ≈ {sla_d} days; escalate if critical."
     )
-    lines = [persona, meta_ch, meta_user, (facts or "Facts: —"), (closes or "Closing cues: —")]
-    if qs:
-        lines.append("Start by asking: " + qs[0])
+    start = ("Start by asking: " + qs[0]) if qs else 'Start by asking: "Mi a probléma röviden?"'
+    general_tail = "\n".join([facts or "Facts: —", closes or "Closing cues: —", start])
+
+    return {
+        "mebinu": PromptTemplate(mebinu, show_nsfw=False),
+        "commission": PromptTemplate(commission, commission_tail),
+        "general": PromptTemplate(general, general_tail),
+    }
+
+
+def get_prompt_template(persona: str, kb: dict | None) -> PromptTemplate:
+    ver = kb_version(kb)
+    tpls = _TEMPLATES.get(ver)
+    if tpls is None:
+        _TEMPLATE_CACHE.labels("miss").inc()
+        tpls = build_prompt_templates(kb)
+        _TEMPLATES[ver] = tpls
     else:
-        lines.append('Start by asking: "Mi a probléma röviden?"')
-    return "\n".join(lines)
-# endregion ISERO PATCH general-prompt
+        _TEMPLATE_CACHE.labels("hit").inc()
+    return tpls[persona]
+
+
+def warm_prompt_templates(kb: dict | None) -> str:
+    """Build the templates right after the KB loads; returns the KB version."""
+    get_prompt_template("mebinu", kb)
+    return kb_version(kb)
 
+
+def clear_prompt_cache() -> None:
+    _TEMPLATES.clear()
+# endregion ISERO PATCH prompt-templates
+
+def compose_mebinu_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
+    """Mebinu értékesítő persona: NEM listáz, barátságos, egy kérdés/kör."""
+    return get_prompt_template("mebinu", kb).render(channel, opener, _player_snapshot(bot, opener.id))
+# endregion ISERO PATCH prompt-composer
+
+# region ISERO PATCH commission-prompt
+def compose_commission_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
+    return get_prompt_template("commission", kb).render(channel, opener, _player_snapshot(bot, opener.id))
+# endregion ISERO PATCH commission-prompt
+
+# region ISERO PATCH general-prompt
+def compose_general_prompt(bot, channel: discord.TextChannel, opener: discord.Member, kb: dict | None) -> str:
+    return get_prompt_template("general", kb).render(channel, opener, _player_snapshot(bot, opener.id))
+# endregion ISERO PATCH general-prompt
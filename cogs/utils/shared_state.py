@@ -0,0 +1,234 @@
+# cogs/utils/shared_state.py
+"""Cross-process key/value state for cluster mode (budgets, cooldowns, ticket index).
+
+``SHARED`` is chosen by ``SHARED_STATE_URL``:
+
+* ``memory://`` (default) — in-process dict, single bot process;
+* ``sqlite:///path/state.db`` — WAL-mode SQLite file shared by the workers of
+  one host (also the test stand-in);
+* ``postgres://…`` / ``postgresql://…`` — ``shared_state`` table in the
+  production database (through the ``DATABASE_URL`` pool).
+
+All backends expose the same async API; values must be JSON-serialisable and
+``incr`` is atomic across processes (expired counters restart from 0).
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "memory://")
+
+
+class SharedState(abc.ABC):
+    #: True when the state lives in this process only (no I/O on the hot path)
+    local = False
+
+    @abc.abstractmethod
+    async def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        """Add ``amount`` and return the new value; ``ttl_s`` applies when the key is (re)created."""
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryState(SharedState):
+    local = True
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        item = self._live(key)
+        return default if item is None else item[0]
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        self._data[key] = (value, self.clock() + ttl_s if ttl_s else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        item = self._live(key)
+        if item is None:
+            item = (0, self.clock() + ttl_s if ttl_s else None)
+        value = int(item[0]) + int(amount)
+        self._data[key] = (value, item[1])
+        return value
+
+
+class SQLiteState(SharedState):
+    """One connection per process; writes use ``BEGIN IMMEDIATE`` so ``incr`` is atomic across processes."""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+        )
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT value FROM shared_state WHERE key=? AND (expires IS NULL OR expires > ?)",
+                (key, self.clock()),
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl_s: Optional[float]) -> None:
+        exp = self.clock() + ttl_s if ttl_s else None
+        with self._lock:
+            self._con.execute(
+                "INSERT INTO shared_state(key, value, expires) VALUES (?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value, expires=excluded.expires",
+                (key, json.dumps(value), exp),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._con.execute("DELETE FROM shared_state WHERE key=?", (key,))
+
+    def _incr(self, key: str, amount: int, ttl_s: Optional[float]) -> int:
+        now = self.clock()
+        with self._lock:
+            con = self._con
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                row = con.execute("SELECT value, expires FROM shared_state WHERE key=?", (key,)).fetchone()
+                if row is None or (row[1] is not None and row[1] <= now):
+                    value, exp = int(amount), (now + ttl_s if ttl_s else None)
+                else:
+                    value, exp = int(json.loads(row[0])) + int(amount), row[1]
+                con.execute(
+                    "INSERT INTO shared_state(key, value, expires) VALUES (?,?,?) "
+                    "ON CONFLICT(key) DO UPDATE SET value=excluded.value, expires=excluded.expires",
+                    (key, json.dumps(value), exp),
+                )
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        return value
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        value = await asyncio.to_thread(self._get, key)
+        return default if value is None else value
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl_s)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        return await asyncio.to_thread(self._incr, key, amount, ttl_s)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+class PostgresState(SharedState):
+    """``shared_state`` table; created by schema migration 5 when the pool opens.
+
+    Lives in the ``DATABASE_URL`` database and uses its shared pool, so
+    :func:`make_state` only accepts a URL naming that same database.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+
+    async def _pool(self):
+        from cogs.storage.store import get_pool
+
+        return await get_pool(self.dsn)
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        pool = await self._pool()
+        raw = await pool.fetchval(
+            "SELECT value FROM shared_state WHERE key=$1 AND (expires_at IS NULL OR expires_at > now())", key
+        )
+        return default if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        pool = await self._pool()
+        await pool.execute(
+            """
+            INSERT INTO shared_state(key, value, expires_at)
+            VALUES ($1, $2::jsonb, CASE WHEN $3::float8 IS NULL THEN NULL ELSE now() + make_interval(secs => $3) END)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+            """,
+            key, json.dumps(value), ttl_s,
+        )
+
+    async def delete(self, key: str) -> None:
+        pool = await self._pool()
+        await pool.execute("DELETE FROM shared_state WHERE key=$1", key)
+
+    async def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        pool = await self._pool()
+        # lejárt számláló: 0-ról indul és új lejáratot kap
+        return await pool.fetchval(
+            """
+            INSERT INTO shared_state(key, value, expires_at)
+            VALUES ($1, to_jsonb($2::bigint),
+                    CASE WHEN $3::float8 IS NULL THEN NULL ELSE now() + make_interval(secs => $3) END)
+            ON CONFLICT (key) DO UPDATE SET
+              value = to_jsonb(CASE WHEN shared_state.expires_at <= now() THEN 0
+                                    ELSE (shared_state.value #>> '{}')::bigint END + $2::bigint),
+              expires_at = CASE WHEN shared_state.expires_at <= now() THEN EXCLUDED.expires_at
+                                ELSE shared_state.expires_at END
+            RETURNING (value #>> '{}')::bigint
+            """,
+            key, int(amount), ttl_s,
+        )
+
+
+def _pg_dsn(url: str) -> str:
+    return "postgres://" + url.split("://", 1)[1] if url.startswith("postgresql://") else url
+
+
+def make_state(url: str = SHARED_STATE_URL) -> SharedState:
+    if not url or url.startswith("memory:"):
+        return MemoryState()
+    if url.startswith("sqlite:///"):
+        return SQLiteState(url[len("sqlite:///"):])
+    if url.startswith(("postgres://", "postgresql://")):
+        db_url = os.getenv("DATABASE_URL", "")
+        if _pg_dsn(url) != _pg_dsn(db_url):
+            raise ValueError("a postgres SHARED_STATE_URL must point at DATABASE_URL (shared pool)")
+        return PostgresState(url)
+    raise ValueError(f"unsupported SHARED_STATE_URL: {url}")
+
+
+SHARED: SharedState = make_state()
@@ -2,6 +2,7 @@
 from __future__ import annotations
 import re
 import os
+import unicodedata
 from datetime import timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -10,6 +11,8 @@ import yaml
 import discord
 from loguru import logger as log
 from .profanity_db import load_db
+from .modlog import MODLOG, text_embed
+from .outbound import OUTBOUND, Prio
 
 from bot.config import settings
 from utils import policy, logsetup
@@ -42,26 +45,92 @@ def no_repeat(s: str) -> str:
     return s.strip()
 
 
-def chunk_message(text: str, limit: Optional[int] = None) -> List[str]:
+DISCORD_MSG_LIMIT = 2000
+EMBED_DESC_LIMIT = 4096
+
+_SENTENCE_END = re.compile(r"(?:[.!?…]+[\"')\]»”]*|\n)\s+")
+_SPACE = re.compile(r"\s+")
+_ZWJ = "\u200d"
+
+
+def _grapheme_cut(text: str, cut: int) -> int:
+    """Move ``cut`` left so it does not split a combining/ZWJ/VS/surrogate sequence."""
+    while cut > 1:
+        ch, prev = text[cut], text[cut - 1]
+        if (unicodedata.combining(ch) or ch == _ZWJ or prev == _ZWJ
+                or "\ufe00" <= ch <= "\ufe0f" or "\udc00" <= ch <= "\udfff"
+                or "\U0001f3fb" <= ch <= "\U0001f3ff"):
+            cut -= 1
+            continue
+        break
+    return cut
+
+
+def _split_at_boundaries(text: str, budget: int) -> List[str]:
+    """Greedy split: last sentence end, else last whitespace, else grapheme boundary."""
+    out: List[str] = []
+    rest = text
+    while len(rest) > budget:
+        window = rest[: budget + 1]
+        cut = 0
+        for m in _SENTENCE_END.finditer(window):
+            cut = m.end()
+        if cut < budget // 2:
+            spaces = [m.end() for m in _SPACE.finditer(window)]
+            if spaces and spaces[-1] >= budget // 3:
+                cut = spaces[-1]
+        if cut < budget // 3:
+            cut = _grapheme_cut(rest, budget)
+        piece = rest[:cut].rstrip()
+        if not piece:  # csupa whitespace az ablakban
+            piece, cut = rest[:budget], budget
+        out.append(piece)
+        rest = rest[cut:].lstrip()
+    if rest:
+        out.append(rest)
+    return out
+
+
+def chunk_message(text: str, limit: Optional[int] = None, *, prefix: bool = True) -> List[str]:
     """Split ``text`` into <=limit character pieces with (n/m) prefixes.
 
-    Each chunk fits within ``limit`` including the ``(n/m)`` marker when
-    multiple chunks are returned.
+    Cuts prefer sentence ends, then whitespace, then grapheme boundaries, so
+    words and emoji sequences are not broken.  Each chunk fits within
+    ``limit`` including the ``(n/m)`` marker when multiple chunks are returned.
+    Replies should pass ``DISCORD_MSG_LIMIT`` to keep the number of sends low.
     """
     limit = limit or settings.MAX_MSG_CHARS
     if len(text) <= limit:
         return [text]
-    raw_chunks = [text[i : i + limit] for i in range(0, len(text), limit)]
-    total = len(raw_chunks)
-    out: List[str] = []
-    for idx, chunk in enumerate(raw_chunks, start=1):
-        if total > 1:
-            prefix = f"({idx}/{total}) "
-        else:
-            prefix = ""
-        allowed = limit - len(prefix)
-        out.append(prefix + chunk[:allowed])
-    return out
+    if not prefix:
+        return _split_at_boundaries(text, limit)
+    total = 9
+    while True:
+        marker = len(f"({total}/{total}) ")
+        chunks = _split_at_boundaries(text, max(1, limit - marker))
+        if len(str(len(chunks))) <= len(str(total)):
+            break
+        total = len(chunks)  # több jegyű számláló → kisebb keret, újra
+    n = len(chunks)
+    return [f"({i}/{n}) {c}" for i, c in enumerate(chunks, start=1)]
+
+
+def embed_chunks(text: str, *, title: Optional[str] = None,
+                 color: discord.Color = discord.Color.blurple()) -> List[List[discord.Embed]]:
+    """Long content as embeds, grouped per message (<=10 embeds, <=6000 chars)."""
+    messages: List[List[discord.Embed]] = []
+    cur: List[discord.Embed] = []
+    used = 0
+    for part in chunk_message(text, EMBED_DESC_LIMIT, prefix=False):
+        em = discord.Embed(title=title if not messages and not cur else None, description=part, color=color)
+        if cur and (used + len(em) > 6000 or len(cur) == 10):
+            messages.append(cur)
+            cur, used = [], 0
+        cur.append(em)
+        used += len(em)
+    if cur:
+        messages.append(cur)
+    return messages
 
 
 # region ISERO PATCH profanity_helpers
@@ -93,10 +162,9 @@ def load_profanity_words() -> List[str]:
 async def send_audit(bot, audit_channel_id: int, message: discord.Message, *, reason: str, original: str, redacted: str) -> None:
     ch = bot.get_channel(audit_channel_id)
     if ch:
-        try:
-            await ch.send(f"[{reason}] {original}\n{message.jump_url}")
-        except Exception:
-            pass
+        # region ISERO PATCH modlog-batch
+        MODLOG.post(ch, text_embed(original, title=reason, url=message.jump_url))
+        # endregion
 
 
 async def safe_echo(bot, channel: discord.abc.Messageable, content: str, *, mimic_webhook: bool = True, author: Optional[discord.abc.User] = None) -> None:
@@ -105,13 +173,16 @@ async def safe_echo(bot, channel: discord.abc.Messageable, content: str, *, mimi
 
 async def echo_masked(bot, message: discord.Message, masked: str, ttl_s: int = 30):
     """Delete original then echo masked text via optional webhook mimic."""
-    try:
+    async def _echo():
         if getattr(settings, "USE_WEBHOOK_MIMIC", True) and hasattr(message.channel, "create_webhook"):
             wh = await message.channel.create_webhook(name=message.author.display_name)
             await wh.send(masked, avatar_url=message.author.display_avatar.url, username=message.author.display_name)
             await wh.delete()
         else:
             await message.channel.send(masked)
+
+    try:
+        await OUTBOUND.run(message.channel.id, Prio.REPLY, _echo, route="echo")
     except Exception as e:
         log.warning(f"echo_masked failed: {e}")
 
@@ -258,7 +329,7 @@ async def modlog_profanity(message: discord.Message, *, original: str, starred:
     if not ch:
         return
     lvl = f"L{level}" if level else "L0"
-    try:
-        await ch.send(f"[profanity:{lvl}] {message.author.mention} in <#{message.channel.id}>\n`{original}`\n→ `{starred}`")
-    except Exception:
-        log.exception("modlog send failed")
+    # region ISERO PATCH modlog-batch
+    MODLOG.post(ch, text_embed(f"{message.author.mention} in <#{message.channel.id}>\n`{original}`\n→ `{starred}`",
+                               title=f"profanity:{lvl}", color=discord.Color.orange()))
+    # endregion
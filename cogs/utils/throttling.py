@@ -5,6 +5,8 @@ import time
 from typing import Dict, Tuple
 import time
 
+from cogs.utils.guildstate import GUILDS
+
 class Deduper:
     """Per-channel dedup + cooldown. Nem enged duplát és túl sűrű választ."""
     def __init__(self, cooldown_sec: int = 20, ttl_sec: int = 5):
@@ -30,10 +32,16 @@ class Deduper:
         return True
 
 
-_redir_state: Dict[str, float] = {}
+# region ISERO PATCH guild-scoped
+# redirect dedup + TTL pontok guildenként: GUILDS.get(gid).ns("throttle.redirect" | "throttle.points");
+# a guild_id kötelező, hogy egy hívó se essen vissza csendben a közös 0-s névtérre
+def _redir_state(guild_id: int) -> Dict[str, float]:
+    return GUILDS.get(guild_id).ns("throttle.redirect")
+
 
-# ISERO PATCH: simple point tracker with TTL
-_points: Dict[str, Tuple[int, float]] = {}
+def _points(guild_id: int) -> Dict[str, Tuple[int, float]]:
+    return GUILDS.get(guild_id).ns("throttle.points")
+# endregion
 
 
 class PerUserChannelTTL:
@@ -51,35 +59,37 @@ class PerUserChannelTTL:
         return True
 
 
-def should_redirect(key: str, ttl: int = 120) -> bool:
+def should_redirect(key: str, ttl: int = 120, *, guild_id: int) -> bool:
     """Return True if redirect should be sent for ``key`` (else dedup)."""
     now = time.time()
-    last = _redir_state.get(key, 0.0)
+    state = _redir_state(guild_id)
+    last = state.get(key, 0.0)
     if now - last < ttl:
         return False
-    _redir_state[key] = now
+    state[key] = now
     return True
 
 
-def add_points(key: str, amount: int, ttl: int = 180) -> int:
+def add_points(key: str, amount: int, ttl: int = 180, *, guild_id: int) -> int:
     """Add ``amount`` points to ``key`` and return new total (with TTL)."""
     now = time.time()
-    total, expires = _points.get(key, (0, 0.0))
+    points = _points(guild_id)
+    total, expires = points.get(key, (0, 0.0))
     if now > expires:
         total = 0
     total += int(amount)
-    _points[key] = (total, now + ttl)
+    points[key] = (total, now + ttl)
     return total
 
 
-def bump_score(scope, inc: int, ttl_seconds: int) -> int:
+def bump_score(scope, inc: int, ttl_seconds: int, *, guild_id: int) -> int:
     key = ":".join(str(x) for x in scope)
-    return add_points(key, inc, ttl_seconds)
+    return add_points(key, inc, ttl_seconds, guild_id=guild_id)
 
 
-def get_score(scope) -> int:
+def get_score(scope, *, guild_id: int) -> int:
     key = ":".join(str(x) for x in scope)
-    total, expires = _points.get(key, (0, 0.0))
+    total, expires = _points(guild_id).get(key, (0, 0.0))
     if time.time() > expires:
         return 0
     return total
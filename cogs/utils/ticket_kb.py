@@ -1,3 +1,5 @@
+import hashlib
+import json
 import logging
 from pathlib import Path
 from typing import Dict
@@ -5,8 +7,26 @@ import yaml
 
 logger = logging.getLogger(__name__)
 
+
+# region ISERO PATCH kb-version
+def kb_hash(kb: dict) -> str:
+    """Short content hash of a KB dict."""
+    raw = json.dumps(kb, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+class TicketKB(dict):
+    """KB sections plus ``version``, hashed once per (re)load."""
+    version = 'empty'
+
+    def rehash(self) -> str:
+        self.version = kb_hash(self) if self else 'empty'
+        return self.version
+# endregion ISERO PATCH kb-version
+
+
 def load_ticket_kb(root_dir: str) -> Dict[str, dict]:
-    out: Dict[str, dict] = {}
+    out = TicketKB()
     names = {
         'mebinu': 'kb_mebinu.yml',
         'commission': 'kb_commission.yml',
@@ -25,4 +45,5 @@ def load_ticket_kb(root_dir: str) -> Dict[str, dict]:
             logger.info('ISERO/TicketKB: loaded %s (%s)', key, p)
         except Exception as e:
             logger.error('ISERO/TicketKB: failed %s (%s)', p, e)
+    out.rehash()
     return out
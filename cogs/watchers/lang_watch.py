@@ -4,6 +4,7 @@ import logging
 import discord
 from discord.ext import commands
 from cogs.utils import context as ctx
+from cogs.ranks.leaderboard import BOARDS
 
 log = logging.getLogger("isero.watch.lang")
 
@@ -45,6 +46,10 @@ class LangWatch(commands.Cog):
             )
         except Exception as e:
             log.debug("signal write failed: %s", e)
+            return
+        # region ISERO PATCH leaderboard
+        BOARDS["activity"].add(message.author.id, 1)
+        # endregion
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(LangWatch(bot))
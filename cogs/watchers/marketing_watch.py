@@ -4,7 +4,8 @@ import logging
 import re
 from discord.ext import commands
 import discord
-from storage.playercard import PlayerCardStore
+from cogs.storage.playercard import CARDS
+from cogs.utils.logsetup import msg_extra
 
 log = logging.getLogger("watch.marketing")
 
@@ -35,10 +36,10 @@ class MarketingWatch(commands.Cog):
         pts = _points(message.content)
         if pts <= 0:
             return
-        await PlayerCardStore.ensure_player(message.author.id)
-        await PlayerCardStore.bump_marketing(message.author.id, pts)
-        await PlayerCardStore.add_signal(message.author.id, "marketing", float(pts), {"len": len(message.content)})
-        log.info("marketing +%d for %s", pts, message.author.id)
+        # write-behind: memóriában összevonva, PLAYERCARD_FLUSH_S-enként egy tranzakció
+        CARDS.bump_marketing(message.author.id, pts)
+        CARDS.add_signal(message.author.id, "marketing", float(pts), {"len": len(message.content)})
+        log.info("marketing +%d for %s", pts, message.author.id, extra=msg_extra(message))
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(MarketingWatch(bot))
@@ -7,7 +7,16 @@ try:
     import regex as re
 except Exception:  # pragma: no cover
     import re
-from ..utils.profanity_patterns import build_patterns_with_sepmax, find_matches, mask_spans
+from ..utils.profanity_patterns import build_patterns_with_sepmax, mask_spans
+from ..utils.profanity_scan import ProfanityScanner
+from ..utils.metrics import REGISTRY
+from ..utils.outbound import OUTBOUND, Prio
+
+def _env_float(name, default):
+    try:
+        return float(policy.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
 
 WORDLIST = textutil.load_profanity_words()
 logger.info(f"Loaded profanity wordlist ({len(WORDLIST)} entries)")
@@ -16,6 +25,15 @@ REPEAT_MAX = int(policy.getenv("PROFANITY_REPEAT_MAX", "6") or "6")
 PATTERNS = build_patterns_with_sepmax(WORDLIST, sepmax=SEP_MAX, repeatmax=REPEAT_MAX)
 USE_WEBHOOK = policy.getbool("USE_WEBHOOK_MIMIC", default=True)
 MODE = policy.getenv("PROFANITY_MODE", "echo_star")
+# hosszú paste-ek process poolban, időkerettel (0 worker = mindig inline)
+POOL_MIN_CHARS = policy.getint("PROFANITY_POOL_MIN_CHARS", 1000)
+POOL_WORKERS = policy.getint("PROFANITY_POOL_WORKERS", 2)
+SCAN_TIMEOUT_S = _env_float("PROFANITY_SCAN_TIMEOUT_S", 0.25)
+
+M_SCANS = REGISTRY.counter("isero_profanity_scans_total", "Profanity scans by path", ("status",))
+M_HITS = REGISTRY.counter("isero_profanity_hits_total", "Messages with at least one profanity match")
+M_DELETES = REGISTRY.counter("isero_profanity_deletes_total", "Message delete attempts", ("result",))
+M_ECHO = REGISTRY.histogram("isero_profanity_echo_seconds", "Masked echo latency (webhook/send)")
 
 def build_tolerant_pattern(words):
     pats = build_patterns_with_sepmax(words, sepmax=SEP_MAX, repeatmax=REPEAT_MAX)
@@ -52,8 +70,22 @@ async def echo_censored(msg, txt):
 class ProfanityWatcher(commands.Cog):
     def __init__(self, bot):
         self.bot=bot
+        self.scanner = ProfanityScanner(
+            WORDLIST, sepmax=SEP_MAX, repeatmax=REPEAT_MAX, min_chars=POOL_MIN_CHARS,
+            workers=POOL_WORKERS, timeout_s=SCAN_TIMEOUT_S, patterns=PATTERNS,
+        )
         logger.info("Profanity Watcher v2 loaded (echo-star)")
 
+    async def cog_load(self):
+        try:
+            await self.scanner.warm()
+        except Exception as e:
+            logger.warning(f"Profanity pool warm-up failed, scanning inline: {e}")
+            self.scanner.workers = 0
+
+    async def cog_unload(self):
+        self.scanner.close()
+
     @commands.Cog.listener()
     async def on_message(self, message):
         if not message.guild or message.author.bot:
@@ -63,20 +95,39 @@ class ProfanityWatcher(commands.Cog):
         txt = message.content or ""
         if not txt.strip():
             return
-        spans = find_matches(PATTERNS, txt)
+        # a pool-os scan alatt más listenerek is futnak: jelezzük, hogy ítélet jön
+        ctx_flags.mark_pending(message)
+        try:
+            res = await self.scanner.scan(txt)
+            M_SCANS.labels(res.status).inc()
+            if res.needs_review:
+                # nem törlünk, de az agent se válaszoljon rá
+                ctx_flags.mark_moderated(message)
+            elif res.spans:
+                ctx_flags.mark_moderated(message)
+                ctx_flags.mark_hidden(message)
+        finally:
+            ctx_flags.clear_pending(message)
+        if res.needs_review:
+            # időkeret túllépve, literális szűrés sem talált: nem törlünk, staff nézi meg
+            logger.warning(f"Profanity scan budget exceeded ({len(txt)} chars), flagged for review")
+            await textutil.send_audit(self.bot, policy.getint("CHANNEL_MOD_LOGS",0), message, reason="profanity_review", original=txt[:1500], redacted=txt[:1500])
+            return
+        spans = res.spans
         if not spans:
             return
-        ctx_flags.mark_moderated(message)
-        ctx_flags.mark_hidden(message)
+        M_HITS.inc()
         try:
-            await message.delete()
+            await OUTBOUND.run(message.channel.id, Prio.MODERATION, message.delete, route="delete")
+            M_DELETES.labels("ok").inc()
         except Exception:
-            pass
+            M_DELETES.labels("failed").inc()
         starred = mask_spans(txt, spans)
         await textutil.send_audit(self.bot, policy.getint("CHANNEL_MOD_LOGS",0), message, reason="profanity", original=txt, redacted=starred)
         if policy.is_nsfw(message.channel):
             return
-        await textutil.echo_masked(self.bot, message, starred, ttl_s=policy.getint("PROFANITY_ECHO_TTL_S",30))
+        with M_ECHO.time():
+            await textutil.echo_masked(self.bot, message, starred, ttl_s=policy.getint("PROFANITY_ECHO_TTL_S",30))
         if policy.is_exempt_user(message.author):
             return
         # scoring hook placeholder
@@ -4,7 +4,7 @@ import logging
 import re
 from discord.ext import commands
 import discord
-from storage.playercard import PlayerCardStore
+from cogs.storage.playercard import CARDS
 
 log = logging.getLogger("watch.sentiment")
 
@@ -31,9 +31,9 @@ class SentimentWatch(commands.Cog):
         s = _score(message.content)
         if s == 0.0:
             return
-        await PlayerCardStore.ensure_player(message.author.id)
-        await PlayerCardStore.update_mood(message.author.id, s)
-        await PlayerCardStore.add_signal(message.author.id, "sentiment", s, {"text_len": len(message.content)})
+        # write-behind: memóriában összevonva, PLAYERCARD_FLUSH_S-enként egy tranzakció
+        CARDS.update_mood(message.author.id, s)
+        CARDS.add_signal(message.author.id, "sentiment", s, {"text_len": len(message.content)})
         log.debug("sentiment %.2f by %s", s, message.author.id)
 
 async def setup(bot: commands.Bot):
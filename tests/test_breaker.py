@@ -0,0 +1,50 @@
+from cogs.agent.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from cogs.agent.fallback import local_fallback_reply
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _breaker(clock):
+    return CircuitBreaker("t", fail_threshold=2, latency_budget_s=5.0, open_seconds=10, min_samples=3, clock=clock)
+
+
+def test_opens_after_failures_and_probes_half_open():
+    clock = _Clock()
+    br = _breaker(clock)
+    br.record_failure()
+    assert br.allow()
+    br.record_failure()
+    assert br.state == OPEN and not br.allow()
+    clock.t = 10.5
+    assert br.state == HALF_OPEN
+    assert br.allow()          # egy próba
+    assert not br.allow()      # a többi még fallback
+    br.record_success(0.4)
+    assert br.state == CLOSED and br.allow()
+    assert br.trips == 1 and br.short_circuited == 2
+
+
+def test_slow_p95_trips_and_failed_probe_reopens():
+    clock = _Clock()
+    br = _breaker(clock)
+    for _ in range(3):
+        br.record_success(8.0)
+    assert br.state == OPEN
+    clock.t = 11
+    assert br.allow()
+    br.record_failure()
+    assert br.state == OPEN and br.trips == 2
+
+
+def test_fallback_reply_quotes_prices_and_kb():
+    kb = {"mebinu": {"facts": ["Adoptable és custom is van."]}}
+    out = local_fallback_reply("mennyi 4 mebinu ára?", kb=kb)
+    assert "Mebinu: 4×" in out and "Adoptable" in out
+    assert "Kép:" in local_fallback_reply("", ticket_type="commission")
+    assert local_fallback_reply("hello").endswith("gyors módban vagyok.")
@@ -0,0 +1,117 @@
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from bot.cluster import Supervisor, plan_shards
+from cogs.utils.shared_state import MemoryState, PostgresState, SQLiteState, make_state
+
+
+def test_plan_shards_contiguous_and_balanced():
+    assert plan_shards(8, 3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert plan_shards(2, 4) == [[0], [1]]
+    assert sum(len(p) for p in plan_shards(17, 4)) == 17
+
+
+class FakeProc:
+    _pid = 100
+
+    def __init__(self):
+        FakeProc._pid += 1
+        self.pid = FakeProc._pid
+        self.exitcode = None
+        self._alive = True
+
+    def is_alive(self):
+        return self._alive
+
+    def terminate(self):
+        self._alive = False
+        self.exitcode = -15
+
+
+def test_supervisor_restarts_with_backoff_and_reports_health():
+    now = [0.0]
+    beats = queue.Queue()
+    spawned = []
+
+    def spawn(slot):
+        p = FakeProc()
+        spawned.append((slot.worker_id, p))
+        return p
+
+    sup = Supervisor(plan_shards(4, 2), 4, spawn=spawn, heartbeats=beats,
+                     clock=lambda: now[0], heartbeat_timeout_s=30)
+    sup.start()
+    beats.put({"worker": 0, "ready": True, "guilds": 3, "latency_ms": 40.0})
+    sup.tick()
+    st = sup.status()
+    assert st["ok"] and st["workers"][0]["guilds"] == 3 and st["workers"][1]["shards"] == [2, 3]
+
+    spawned[1][1]._alive = False  # worker 1 meghal
+    now[0] = 1.0
+    sup.tick()
+    assert not sup.status()["ok"]
+    now[0] = 1.5
+    sup.tick()
+    assert len(spawned) == 2  # backoff: még nem indult újra
+    now[0] = 2.1
+    sup.tick()
+    assert len(spawned) == 3 and sup.status()["workers"][1]["restarts"] == 1
+
+    now[0] = 39.0
+    beats.put({"worker": 1, "ready": True})
+    now[0] = 40.0  # worker 0 heartbeatje elavult → kill + restart
+    sup.tick()
+    assert not spawned[0][1].is_alive() and spawned[-1][1].is_alive()
+    now[0] = 41.1
+    sup.tick()
+    assert spawned[-1][0] == 0 and sup.status()["ok"]
+
+
+def test_sqlite_state_shared_between_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    a, b = SQLiteState(path), SQLiteState(path)
+
+    def hammer(st):
+        for _ in range(50):
+            st._incr("agent:budget:2026-01-01", 10, 3600)
+
+    threads = [threading.Thread(target=hammer, args=(st,)) for st in (a, b, a, b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    async def check():
+        assert await b.get("agent:budget:2026-01-01") == 2000
+        await a.set("tickets:open:1:2", 555)
+        assert await b.get("tickets:open:1:2") == 555
+        await b.delete("tickets:open:1:2")
+        assert await a.get("tickets:open:1:2", "gone") == "gone"
+        await a.close()
+        await b.close()
+
+    asyncio.run(check())
+
+
+def test_memory_state_ttl_and_incr():
+    now = [0.0]
+    st = MemoryState(clock=lambda: now[0])
+
+    async def run():
+        assert await st.incr("k", 5, ttl_s=10) == 5
+        assert await st.incr("k", -2) == 3
+        now[0] = 11
+        assert await st.get("k") is None
+        assert await st.incr("k", 1, ttl_s=10) == 1
+
+    asyncio.run(run())
+
+
+def test_postgres_shared_state_must_use_database_url(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://u@db/isero")
+    assert isinstance(make_state("postgres://u@db/isero"), PostgresState)
+    with pytest.raises(ValueError):
+        make_state("postgres://u@other/state")
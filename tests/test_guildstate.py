@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from cogs.utils import throttling
+from cogs.utils.guildstate import GUILDS, GuildStateRegistry, guild_id_of, shard_for
+
+
+def test_namespaces_are_isolated_per_guild():
+    reg = GuildStateRegistry(overrides={1: {"CHANNEL_BOT_COMMANDS": 55}})
+    reg.get(1).ns("agent.dedup")[7] = ("hi", 0.0)
+    assert 7 not in reg.get(2).ns("agent.dedup")
+    assert reg.config(1, "CHANNEL_BOT_COMMANDS", 9) == 55
+    assert reg.config(2, "CHANNEL_BOT_COMMANDS", 9) == 9
+    reg.drop(1)
+    assert reg.get(1).ns("agent.dedup") == {}
+    assert reg.get(1).config("CHANNEL_BOT_COMMANDS") == 55
+
+
+def test_guild_id_resolution_and_shard_routing():
+    msg = SimpleNamespace(guild=SimpleNamespace(id=42))
+    itx = SimpleNamespace(guild_id=43)
+    dm = SimpleNamespace(guild=None)
+    assert (guild_id_of(msg), guild_id_of(itx), guild_id_of(dm)) == (42, 43, 0)
+
+    gid = 81384788765712384
+    assert shard_for(gid, 1) == 0
+    assert shard_for(gid, 4) == (gid >> 22) % 4
+    reg = GuildStateRegistry()
+    reg.bind(SimpleNamespace(shard_count=4, shard_ids=[shard_for(gid, 4)]))
+    assert reg.owns(gid) and not reg.owns(gid + (1 << 22))
+    assert reg.leads() == (shard_for(gid, 4) == 0)
+    reg.bind(SimpleNamespace(shard_count=4, shard_ids=[0, 1]))
+    assert reg.leads() and GuildStateRegistry().leads()
+
+
+def test_redirect_dedup_does_not_collide_across_guilds():
+    assert throttling.should_redirect("redir:1:2:x", guild_id=101)
+    assert not throttling.should_redirect("redir:1:2:x", guild_id=101)
+    assert throttling.should_redirect("redir:1:2:x", guild_id=102)
+    GUILDS.drop(101)
+    GUILDS.drop(102)
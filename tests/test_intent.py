@@ -0,0 +1,29 @@
+from cogs.utils.intent import IntentClassifier, canned_reply, get_classifier, read_samples
+from tools.intent_eval import evaluate
+
+
+def test_seed_model_fast_path_labels():
+    clf = get_classifier()
+    assert clf.classify("köszi!")[0] == "thanks"
+    assert clf.classify("ok")[0] == "chitchat"
+    assert clf.classify("👍👍") == ("chitchat", 1.0)
+    assert clf.classify("mennyibe kerül egy mebinu?")[0] == "promo"
+    assert clf.classify("hogyan tudok ticketet nyitni?")[0] == "question"
+
+
+def test_roundtrip_and_eval(tmp_path):
+    samples = read_samples("config/intent_seed.jsonl")
+    clf = IntentClassifier().fit(samples, epochs=5)
+    path = tmp_path / "m.json"
+    clf.save(str(path))
+    loaded = IntentClassifier.load(str(path))
+    assert loaded.classify("thanks a lot")[0] == clf.classify("thanks a lot")[0]
+    rep = evaluate(loaded, samples)
+    assert rep["n"] == len(samples)
+    assert rep["llm_calls_saved"] > 0
+    assert set(rep["labels"]) == set(clf.labels)
+
+
+def test_canned_reply_locale():
+    assert canned_reply("thanks", "hu-HU") == "Szívesen. 😉"
+    assert canned_reply("question", "en") is None
@@ -0,0 +1,86 @@
+import asyncio
+import random
+
+from cogs.ranks.leaderboard import TopK, page_embed, rebuild
+from cogs.storage.sqlite_store import SQLiteCardStore, SQLitePlayerDB, SQLiteStore
+
+
+def _brute(scores, k):
+    return sorted(((-s, u) for u, s in scores.items()))[:k]
+
+
+def test_topk_matches_full_sort_under_random_updates():
+    rng = random.Random(7)
+    board = TopK(k=5)
+    board.rebuild({})
+    for _ in range(3000):
+        uid = rng.randrange(40)
+        if rng.random() < 0.5:
+            board.set(uid, rng.randrange(100))
+        else:
+            board.add(uid, rng.randrange(-30, 30), lo=0, hi=100)
+        want = _brute(board.scores, 5)
+        assert [(r, u, s) for r, u, s in board.page(0, 5)] == [(i + 1, u, -s) for i, (s, u) in enumerate(want)]
+    best = want[0][1]
+    assert board.rank_of(best) == 1
+    assert board.page(3, 10) == board.page(0, 5)[3:]
+
+
+def test_add_waits_for_rebuild():
+    board = TopK(k=3)
+    board.add(1, 10)
+    assert board.scores == {}
+    board.rebuild({1: 5, 2: 7})
+    board.add(1, 10)
+    assert board.page(0, 3) == [(1, 1, 15), (2, 2, 7)]
+
+
+def test_rebuild_streams_from_sqlite(tmp_path):
+    async def run():
+        store = SQLiteStore(str(tmp_path / "lb.db"))
+        db = SQLitePlayerDB(store)
+        await db.start()
+        await db.add_xp({1: (500, 3), 2: (900, 4)})
+        cards = SQLiteCardStore(store)
+        await cards.bump_marketing(2, 40)
+        for _ in range(3):
+            await db.log_signal(3, 10, 0.0, "other", 0)  # players sor nélkül is számít
+        boards = {"xp": TopK(3), "marketing": TopK(3), "activity": TopK(3)}
+        n = await rebuild(db, boards)
+        assert n == 3
+        assert boards["xp"].page(0, 3) == [(1, 2, 900), (2, 1, 500)]
+        assert boards["marketing"].page(0, 3) == [(1, 2, 40)]
+        assert boards["activity"].page(0, 3) == [(1, 3, 3)]
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_page_embed_shows_viewer_rank():
+    from cogs.ranks import leaderboard
+
+    leaderboard.BOARDS["xp"].rebuild({i: 100 - i for i in range(1, 26)})
+    embed = page_embed("xp", 1, viewer_id=12)
+    assert "<@11>" in embed.description and "<@21>" not in embed.description
+    assert embed.footer.text == "Oldal 2/3 · a helyezésed: #12"
+
+
+def test_rebuild_adds_only_unflushed_xp(tmp_path):
+    from cogs.ranks.xp import XP
+
+    async def run():
+        db = SQLitePlayerDB(SQLiteStore(str(tmp_path / "lb.db")))
+        await db.start()
+        # a DB-ben egy másik worker már 900-ra vitte; ennek a workernek 100 a régi képe
+        await db.add_xp({1: (900, 4)})
+        saved = XP.xp, XP.levels, XP._dirty, XP.ready
+        XP.xp, XP._dirty, XP.ready = {1: 100, 2: 30}, {1: 15, 2: 30}, True
+        try:
+            boards = {"xp": TopK(3), "marketing": TopK(3), "activity": TopK(3)}
+            await rebuild(db, boards)
+        finally:
+            XP.xp, XP.levels, XP._dirty, XP.ready = saved
+        assert boards["xp"].page(0, 3) == [(1, 1, 915), (2, 2, 30)]
+        await db.close()
+
+    asyncio.run(run())
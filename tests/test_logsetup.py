@@ -0,0 +1,105 @@
+import io
+import json
+import logging
+from types import SimpleNamespace
+
+from cogs.utils.logsetup import DiscordMirror, JsonFormatter, SampleFilter, msg_extra
+
+
+def _record(msg, *args, level=logging.INFO, name="watch.marketing", **extra):
+    rec = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_json_formatter_includes_message_ids():
+    message = SimpleNamespace(id=5, guild=SimpleNamespace(id=1), channel=SimpleNamespace(id=2),
+                              author=SimpleNamespace(id=3))
+    rec = _record("marketing +%d for %s", 5, 3, **msg_extra(message))
+    doc = json.loads(JsonFormatter().format(rec))
+    assert doc["msg"] == "marketing +5 for 3"
+    assert doc["level"] == "INFO" and doc["logger"] == "watch.marketing"
+    assert (doc["guild_id"], doc["channel_id"], doc["user_id"], doc["message_id"]) == (1, 2, 3, 5)
+
+
+def test_sample_filter_limits_bursts_and_reports_suppressed():
+    now = [0.0]
+    f = SampleFilter(burst=3, window_s=10, clock=lambda: now[0])
+    passed = [f.filter(_record("marketing +%d for %s", i, 1, level=logging.DEBUG)) for i in range(10)]
+    assert passed.count(True) == 3
+    assert f.filter(_record("boom", level=logging.WARNING))
+    now[0] = 11.0
+    rec = _record("marketing +%d for %s", 1, 1, level=logging.DEBUG)
+    assert f.filter(rec) and rec.suppressed == 7
+
+
+def test_sample_filter_keys_on_call_site_and_spares_info():
+    f = SampleFilter(burst=2, window_s=10, loggers=("watch.",), max_keys=3, clock=lambda: 0.0)
+    # INFO csak az engedélyezett loggereknél
+    assert all(f.filter(_record("ticket opened", name="ISERO.Tickets")) for _ in range(10))
+    assert [f.filter(_record("x")) for _ in range(3)] == [True, True, False]
+    # loguru: kész szöveg, de ugyanaz a hívási hely → egy kulcs
+    texts = [_record(f"scan {i}", level=logging.DEBUG, name="ISERO.Scan") for i in range(5)]
+    assert [f.filter(r) for r in texts].count(True) == 2
+    for line in range(10):
+        rec = _record("y", level=logging.DEBUG)
+        rec.lineno = 100 + line
+        f.filter(rec)
+    assert len(f._state) == 3
+
+
+def test_discord_mirror_batches_into_chunks():
+    m = DiscordMirror(logging.WARNING)
+    for i in range(50):
+        m.handle(_record("x" * 80 + " %d", i, level=logging.WARNING, name="ISERO.Test"))
+    chunks = m.drain(limit=1000)
+    assert len(chunks) >= 4 and all(len(c) <= 1000 for c in chunks)
+    assert sum(c.count("\n") + 1 for c in chunks) == 50
+    assert m.drain() == []
+
+
+def test_setup_logging_writes_from_listener_thread():
+    from cogs.utils import logsetup
+
+    logsetup.shutdown_logging()
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    buf = io.StringIO()
+    try:
+        logsetup.setup_logging("INFO", "json", stream=buf)
+        assert logsetup.setup_logging() is logsetup._listener
+        logging.getLogger("ISERO.Test").info("hello %s", "world", extra={"user_id": 7})
+        logsetup.shutdown_logging()
+        doc = json.loads(buf.getvalue().strip().splitlines()[-1])
+        assert doc["msg"] == "hello world" and doc["user_id"] == 7
+    finally:
+        logsetup.shutdown_logging()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+
+
+def test_queue_pipeline_keeps_exc_separate_and_honours_level():
+    from cogs.utils import logsetup
+
+    logsetup.shutdown_logging()
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    buf = io.StringIO()
+    try:
+        logsetup.setup_logging("INFO", "json", stream=buf)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("ISERO.Test").exception("failed %d", 1)
+        # loguru-ból érkező DEBUG sor INFO szinten nem jelenhet meg
+        fwd = logsetup._LoguruToStdlib()
+        fwd.emit(_record("noisy debug", level=logging.DEBUG, name="ISERO.Test"))
+        logsetup.shutdown_logging()
+        lines = buf.getvalue().strip().splitlines()
+        doc = json.loads(lines[-1])
+        assert doc["msg"] == "failed 1" and "ValueError: boom" in doc["exc"]
+        assert not any("noisy debug" in line for line in lines)
+    finally:
+        logsetup.shutdown_logging()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from cogs.utils.hist import LatencyHistogram
+from cogs.utils.loopmon import SlowCallbacks, top_frames
+
+
+def test_histogram_percentiles_within_bucket_error():
+    h = LatencyHistogram()
+    for i in range(1, 1001):
+        h.record(i / 1000)  # 1 ms … 1 s
+    assert h.count == 1000 and h.max == 1.0
+    assert abs(h.percentile(0.5) - 0.5) / 0.5 < 0.07
+    assert abs(h.percentile(0.99) - 0.99) / 0.99 < 0.07
+    assert h.percentile(1.0) == 1.0
+    bounds = list(h.cumulative())
+    assert bounds[-1][1] == 1000
+    assert "p95=" in h.summary()
+
+
+def test_slow_callback_attributed_to_listener():
+    async def on_message():
+        await asyncio.sleep(0)
+        time.sleep(0.06)
+
+    async def main():
+        sc = SlowCallbacks(0.03)
+        sc.install()
+        try:
+            await asyncio.create_task(on_message(), name="discord.py: on_message")
+            await asyncio.sleep(0)
+        finally:
+            sc.uninstall()
+        return sc
+
+    sc = asyncio.run(main())
+    (name, n, _, mx), = sc.top()
+    assert name.startswith("discord.py: on_message") and "on_message" in name.split(" ", 2)[-1]
+    assert n == 1 and mx >= 0.06
+
+
+def test_top_frames_ignores_idle_select():
+    from collections import Counter
+
+    stacks = Counter({
+        "bot.py:main;base_events.py:_run_once;selectors.py:select": 90,
+        "bot.py:main;profanity_watch.py:on_message;_regex.py:finditer": 10,
+    })
+    assert top_frames(stacks) == [("_regex.py:finditer", 10)]
+
+
+def test_stage_histograms_render_prometheus():
+    from cogs.utils.perf import StageHistograms
+
+    perf = StageHistograms("t_stage_seconds", "test")
+    with perf.stage("resolve"):
+        pass
+    perf.observe("llm", 0.3)
+    perf.observe("llm", 12.0)
+    text = perf.render_prometheus()
+    assert '# TYPE t_stage_seconds histogram' in text
+    assert 't_stage_seconds_bucket{stage="llm",le="0.5"} 1' in text
+    assert 't_stage_seconds_bucket{stage="llm",le="+Inf"} 2' in text
+    assert 't_stage_seconds_count{stage="resolve"} 1' in text
+    assert perf.summary_lines()[0].startswith("llm")
@@ -0,0 +1,35 @@
+import pytest
+
+from cogs.utils.metrics import Registry
+
+
+def test_counter_gauge_histogram_render():
+    reg = Registry()
+    opened = reg.counter("t_opened_total", "Tickets opened", ("kind",))
+    opened.labels("mebinu").inc()
+    opened.labels("mebinu").inc(2)
+    opened.labels("commission").inc()
+    spent = reg.gauge("t_spent", "Spent")
+    spent.set_function(lambda: 1234)
+    lat = reg.histogram("t_query_seconds", "Query latency", ("op",))
+    with lat.labels("get").time():
+        pass
+    lat.labels("get").observe(0.2)
+
+    text = reg.render()
+    assert '# TYPE t_opened_total counter' in text
+    assert 't_opened_total{kind="mebinu"} 3' in text
+    assert 't_opened_total{kind="commission"} 1' in text
+    assert 't_spent 1234' in text
+    assert 't_query_seconds_bucket{op="get",le="0.25"} 2' in text
+    assert 't_query_seconds_count{op="get"} 2' in text
+
+
+def test_registry_is_idempotent_and_checks_labels():
+    reg = Registry()
+    c = reg.counter("t_x_total", "x", ("a",))
+    assert reg.counter("t_x_total", "x", ("a",)) is c
+    with pytest.raises(ValueError):
+        reg.gauge("t_x_total", "x", ("a",))
+    with pytest.raises(ValueError):
+        c.labels("1", "2")
@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from cogs.storage.migrations import MIGRATIONS, LATEST, migrate, pending
+
+
+class FakeCon:
+    """Just enough of asyncpg.Connection: a schema_version table in a list."""
+
+    def __init__(self, versions=None):
+        self.versions = list(versions) if versions is not None else None
+        self.sql = []
+
+    async def fetchval(self, sql, *args):
+        if "to_regclass" in sql:
+            return None if self.versions is None else "schema_version"
+        return max(self.versions or [0])
+
+    async def execute(self, sql, *args):
+        self.sql.append(sql.strip())
+        if "CREATE TABLE IF NOT EXISTS schema_version" in sql and self.versions is None:
+            self.versions = []
+        elif sql.startswith("INSERT INTO schema_version"):
+            self.versions.append(args[0])
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def test_current_schema_skips_all_ddl():
+    con = FakeCon(versions=range(1, LATEST + 1))
+    assert asyncio.run(migrate(con)) == 0
+    assert con.sql == []
+
+
+def test_pending_migrations_run_in_order_under_lock():
+    ran = []
+
+    async def step(con):
+        ran.append("py")
+
+    migrations = [(1, "one", "CREATE TABLE a (x int)"), (2, "two", step), (3, "three", "CREATE TABLE c (x int)")]
+    con = FakeCon(versions=[1])
+    assert asyncio.run(migrate(con, migrations)) == 2
+    assert con.versions == [1, 2, 3] and ran == ["py"]
+    assert "pg_advisory_lock" in con.sql[0] and "pg_advisory_unlock" in con.sql[-1]
+    assert "CREATE TABLE a" not in "\n".join(con.sql)
+
+    assert [m[0] for m in pending(0)] == [m[0] for m in MIGRATIONS] == sorted({m[0] for m in MIGRATIONS})
@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+
+import cogs.agent.agent_gate as ag_mod
+from tools.mock_openai import MockOpenAI
+from tools.replay import percentile
+
+
+def _call(mock):
+    ag_mod.set_openai_transport(mock.transport())
+    try:
+        return asyncio.run(ag_mod.call_openai_chat([{"role": "user", "content": "hi"}], model="m"))
+    finally:
+        ag_mod.set_openai_transport(None)
+
+
+def test_mock_replays_recorded_completions_in_order():
+    mock = MockOpenAI([{"content": "első"}, {"content": "második"}])
+    assert _call(mock) == "első"
+    assert _call(mock) == "második"
+    assert _call(mock) == "első"
+    assert mock.calls == 3 and mock.errors == 0
+
+
+def test_mock_error_rate_raises_http_error():
+    mock = MockOpenAI([{"content": "x"}], error_rate=1.0)
+    with pytest.raises(httpx.HTTPStatusError):
+        _call(mock)
+    assert mock.errors == 1
+
+
+def test_percentile():
+    vals = [i / 100 for i in range(1, 101)]
+    assert percentile(vals, 0.5) == 0.51
+    assert percentile(vals, 0.99) == 0.99
+    assert percentile([], 0.95) == 0.0
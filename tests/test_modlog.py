@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+from cogs.utils.modlog import ModLogDispatcher, text_embed
+
+
+class FakeChannel:
+    def __init__(self, cid=1):
+        self.id = cid
+        self.sent = []
+
+    async def send(self, *, embeds, allowed_mentions=None):
+        self.sent.append(list(embeds))
+
+
+def test_coalesces_up_to_ten_embeds_within_bucket():
+    now = [0.0]
+    d = ModLogDispatcher(max_queue=100, bucket_sends=2, bucket_window_s=5, clock=lambda: now[0])
+    ch = FakeChannel()
+    for i in range(35):
+        assert d.post(ch, text_embed(f"event {i}", title="profanity"))
+    assert asyncio.run(d.flush()) == 2
+    assert [len(b) for b in ch.sent] == [10, 10]
+    now[0] = 5.0
+    asyncio.run(d.flush())
+    assert [len(b) for b in ch.sent] == [10, 10, 10, 5]
+    assert d.queued() == 0
+
+
+def test_overload_drops_and_summarises():
+    d = ModLogDispatcher(max_queue=3, bucket_sends=5)
+    ch = FakeChannel()
+    results = [d.post(ch, text_embed("x", title="raid")) for _ in range(8)]
+    assert results.count(False) == 5
+    asyncio.run(d.flush())
+    embeds = [e for batch in ch.sent for e in batch]
+    assert len(embeds) == 4
+    assert embeds[-1].title == "modlog overload" and "5 esemény" in embeds[-1].description
+
+
+def test_post_without_channel_is_noop():
+    d = ModLogDispatcher()
+    assert d.post(None, text_embed("x")) is False
+    assert d.queued() == 0
+
+
+def test_text_embed_keeps_url_out_of_truncation():
+    em = text_embed("x" * 5000, title="profanity", url="https://discord.com/channels/1/2/3")
+    assert len(em.description) == 1500
+    assert em.url == "https://discord.com/channels/1/2/3"
+
+
+def test_failed_batch_is_requeued_in_order():
+    class Flaky(FakeChannel):
+        fail = True
+
+        async def send(self, *, embeds, allowed_mentions=None):
+            if self.fail:
+                raise RuntimeError("503")
+            await super().send(embeds=embeds)
+
+    d = ModLogDispatcher(bucket_sends=5)
+    ch = Flaky()
+    for i in range(12):
+        d.post(ch, text_embed(f"event {i}"))
+    assert asyncio.run(d.flush()) == 0 and d.queued() == 12
+    ch.fail = False
+    asyncio.run(d.close())
+    sent = [e.description for batch in ch.sent for e in batch]
+    assert sent == [f"event {i}" for i in range(12)]
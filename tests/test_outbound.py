@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from cogs.utils.outbound import OutboundDropped, OutboundScheduler, Prio
+
+
+def test_most_urgent_head_goes_first():
+    order = []
+
+    async def main():
+        s = OutboundScheduler(concurrency=1)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+            order.append("blocker")
+
+        def job(name):
+            async def _run():
+                order.append(name)
+                return name
+            return _run
+
+        first = s.submit(1, Prio.LOG, blocker)
+        futs = [s.submit(2, Prio.CLEANUP, job("cleanup")), s.submit(3, Prio.LOG, job("log")),
+                s.submit(4, Prio.REPLY, job("reply")), s.submit(5, Prio.MODERATION, job("delete"), route="delete")]
+        gate.set()
+        await first
+        assert await asyncio.gather(*futs) == ["cleanup", "log", "reply", "delete"]
+        assert s.pending == 0
+
+    asyncio.run(main())
+    assert order == ["blocker", "delete", "reply", "log", "cleanup"]
+
+
+def test_exhausted_bucket_parks_low_priority_only():
+    order = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        rl = SimpleNamespace(remaining=1, expires=loop.time() + 0.05)
+        http = SimpleNamespace(_bucket_hashes={"POST /channels/{channel_id}/messages": "h"},
+                               _buckets={"h:7": rl})
+        s = OutboundScheduler(concurrency=4, reserve=1, http=http)
+
+        def job(name):
+            async def _run():
+                order.append(name)
+            return _run
+
+        log_fut = s.submit(7, Prio.LOG, job("log"))
+        await asyncio.sleep(0.01)
+        assert order == []  # az utolsó token a válaszoké
+        await s.run(7, Prio.REPLY, job("reply"))
+        await log_fut
+
+    asyncio.run(main())
+    assert order == ["reply", "log"]
+
+
+def test_overload_rejects_logs_but_not_replies():
+    async def main():
+        s = OutboundScheduler(concurrency=1, max_pending=1)
+        gate = asyncio.Event()
+        held = s.submit(1, Prio.REPLY, gate.wait)
+        with pytest.raises(OutboundDropped):
+            s.submit(2, Prio.LOG, gate.wait)
+        reply = s.submit(2, Prio.REPLY, gate.wait)
+        gate.set()
+        await asyncio.gather(held, reply)
+
+    asyncio.run(main())
+
+
+def test_errors_propagate_to_caller():
+    async def main():
+        s = OutboundScheduler()
+
+        async def boom():
+            raise ValueError("403")
+
+        with pytest.raises(ValueError):
+            await s.run(1, Prio.MODERATION, boom, route="delete")
+        assert s.pending == 0
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from cogs.agent import playerdb
+from cogs.agent.playerdb import PlayerDB, player_db
+
+
+class FakeCon:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    async def fetchval(self, sql, uid):
+        return self.rows.get(uid)
+
+    async def execute(self, sql, *args):
+        self.executed.append(args)
+
+
+def _db(monkeypatch, rows):
+    con = FakeCon(rows)
+
+    @asynccontextmanager
+    async def fake_connection(op):
+        yield con
+
+    monkeypatch.setattr(playerdb, "connection", fake_connection)
+    db = PlayerDB("postgres://test")
+    db._pool = object()
+    return db, con
+
+
+def test_snapshot_loads_lazily_and_merges_pending_writes(monkeypatch):
+    db, con = _db(monkeypatch, {1: json.dumps({"last_qty": 3, "last_style": "neon"})})
+
+    async def go():
+        assert db.get_snapshot(1) == {}  # miss: háttérben tölt
+        await db.set_fields(1, last_budget=50)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert db.get_snapshot(1) == {"last_qty": 3, "last_style": "neon", "last_budget": 50}
+        await db.set_fields(1, last_qty=5)
+        await db.set_fields(2, last_qty=1)
+        assert (await db.fetch_snapshot(2)) == {"last_qty": 1}
+        assert await db.flush_snapshots() == 2
+        uids, payloads = con.executed[0]
+        assert uids == [1, 2]
+        assert json.loads(payloads[0]) == {"last_budget": 50, "last_qty": 5}
+        await db.close()
+
+    asyncio.run(go())
+
+
+def test_snapshot_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(playerdb, "PLAYER_SNAPSHOT_MAX", 2)
+    db = PlayerDB("postgres://test")  # pool nélkül: csak memória
+    for uid in (1, 2, 3):
+        asyncio.run(db.set_fields(uid, last_qty=uid))
+    assert db.get_snapshot(1) == {} and db.get_snapshot(3) == {"last_qty": 3}
+
+
+def test_player_db_lives_on_agent_gate():
+    db = object()
+    bot = SimpleNamespace(get_cog=lambda name: SimpleNamespace(db=db) if name == "AgentGate" else None)
+    assert player_db(bot) is db
+    assert player_db(SimpleNamespace(get_cog=lambda name: None)) is None
@@ -0,0 +1,189 @@
+import asyncio
+import copy
+import random
+from contextlib import asynccontextmanager
+
+import pytest
+
+from cogs.storage import playercard as pc
+from cogs.storage.playercard import CardDelta, PlayerCard, PlayerCardCache, flush_args
+
+
+@pytest.fixture(autouse=True)
+def _postgres_pool(monkeypatch):
+    # a Postgres backend csak nyitott pool mellett ír
+    monkeypatch.setattr(pc, "pool_ready", lambda: True)
+
+
+def _sql_path(card, op, *args):
+    """One PlayerCardStore UPDATE per call, as the SQL statements compute it."""
+    c = copy.deepcopy(card)
+    if op == "mood":
+        c.mood = (c.mood or 0) * 0.8 + args[0] * 0.2
+    elif op == "marketing":
+        c.marketing_score = min(100, max(0, c.marketing_score + args[0]))
+        c.scores["marketing"] = c.scores["marketing"] + float(args[0])
+    elif op == "profanity":
+        c.profanity = {"points": c.profanity["points"] + args[0], "stage": c.profanity["stage"] + args[1]}
+        c.scores["toxicity"] = c.scores["toxicity"] + args[0]
+    elif op == "tokens":
+        c.tokens_today += args[0]
+    return c
+
+
+def _ops(seed, n=200):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        kind = rnd.choice(["mood", "marketing", "marketing", "profanity", "tokens"])
+        if kind == "mood":
+            out.append(("mood", rnd.uniform(-1, 1)))
+        elif kind == "marketing":
+            out.append(("marketing", rnd.randint(-30, 30)))
+        elif kind == "profanity":
+            out.append(("profanity", rnd.randint(0, 3), rnd.randint(0, 1)))
+        else:
+            out.append(("tokens", rnd.randint(0, 500)))
+    return out
+
+
+def _apply(cache, uid, op):
+    name, *args = op
+    {"mood": cache.update_mood, "marketing": cache.bump_marketing,
+     "profanity": cache.add_profanity_points, "tokens": cache.add_tokens}[name](uid, *args)
+
+
+def _same(a, b):
+    assert a.mood == pytest.approx(b.mood)
+    assert a.marketing_score == b.marketing_score
+    assert a.scores["marketing"] == pytest.approx(b.scores["marketing"])
+    assert a.scores["toxicity"] == pytest.approx(b.scores["toxicity"])
+    assert a.profanity == b.profanity and a.tokens_today == b.tokens_today
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_cached_card_and_coalesced_flush_match_sql_path(seed):
+    base = PlayerCard(user_id=7, mood=0.3, marketing_score=95)
+    ref = base
+    cache = PlayerCardCache()
+    cache._remember(copy.deepcopy(base))
+    ops = _ops(seed)
+    for op in ops:
+        ref = _sql_path(ref, *op)
+        _apply(cache, 7, op)
+    _same(asyncio.run(cache.get_card(7)), ref)
+    # egyetlen összevont UPDATE ugyanazt adja, mint a lépésenkénti SQL
+    _same(cache._dirty[7].apply(base), ref)
+
+    # sikertelen flush után: régi delta + újabb írások összefűzve
+    first, second = CardDelta(), CardDelta()
+    for op in ops[:100]:
+        _apply_delta(first, op)
+    for op in ops[100:]:
+        _apply_delta(second, op)
+    _same(first.then(second).apply(base), ref)
+
+
+def _apply_delta(d, op):
+    name, *args = op
+    if name == "mood":
+        d.mood(args[0])
+    elif name == "marketing":
+        d.marketing(args[0])
+    elif name == "profanity":
+        d.profanity(*args)
+    else:
+        d.tokens += args[0]
+
+
+class FakeCon:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def execute(self, sql, *args):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.calls.append(("execute", sql.split()[0], args))
+
+    async def executemany(self, sql, rows):
+        self.calls.append(("executemany", sql.split()[0], list(rows)))
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def test_flush_writes_one_update_and_requeues_on_failure(monkeypatch):
+    con = FakeCon(fail=True)
+
+    @asynccontextmanager
+    async def fake_connection(op):
+        yield con
+
+    monkeypatch.setattr(pc, "connection", fake_connection)
+    cache = PlayerCardCache()
+    cache.bump_marketing(2, 5)
+    cache.bump_marketing(1, 3)
+    cache.add_signal(2, "marketing", 5.0, {"len": 9})
+    with pytest.raises(ConnectionError):
+        asyncio.run(cache.flush())
+    cache.bump_marketing(2, 4)
+    assert cache._dirty[2].mkt_sum == 9 and len(cache._signals) == 1
+
+    con.fail = False
+    assert asyncio.run(cache.flush()) == 2
+    ensure, update, signals = con.calls
+    assert ensure[2] == ([1, 2],)
+    assert update[0:2] == ("execute", "UPDATE") and update[2][0] == [1, 2] and update[2][3] == [3, 9]
+    assert signals[2] == [(2, "marketing", 5.0, '{"len": 9}')]
+    assert not cache._dirty and not cache._signals
+    assert flush_args({})[0] == []
+
+
+def test_read_through_single_flight_and_ttl(monkeypatch):
+    loads = []
+
+    async def fake_get_card(uid):
+        loads.append(uid)
+        await asyncio.sleep(0)
+        return PlayerCard(user_id=uid, mood=0.5, marketing_score=40)
+
+    monkeypatch.setattr(pc.PlayerCardStore, "get_card", staticmethod(fake_get_card))
+    now = [0.0]
+    cache = PlayerCardCache(ttl_s=60, clock=lambda: now[0])
+
+    async def go():
+        cache.prewarm(5)
+        a, b = await asyncio.gather(cache.get_card(5), cache.get_card(5))
+        assert loads == [5] and a.mood == b.mood == 0.5
+        cache.bump_marketing(5, 10)  # helyi írás a cache-elt kártyán
+        assert (await cache.get_card(5)).marketing_score == 50 and loads == [5]
+        now[0] = 61.0
+        # lejárt: DB (még flush előtt) + függő delta
+        assert (await cache.get_card(5)).marketing_score == 50 and loads == [5, 5]
+
+    asyncio.run(go())
+
+
+def test_persona_dials_from_card():
+    calm = pc.persona_dials(PlayerCard(user_id=1, mood=1.0, marketing_score=80))
+    assert calm["tone"] == {"sarcasm": 0.4, "warmth": 0.5, "emoji": True}
+    assert calm["promo"] == {"affinity": 0.8}
+    rude = pc.persona_dials(PlayerCard(user_id=1, mood=-1.0, profanity={"points": 9, "stage": 2}))
+    assert rude["tone"]["emoji"] is False and rude["tone"]["warmth"] == 0.0
+
+
+def test_writes_are_noops_without_storage(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgres://test")
+    monkeypatch.setattr(pc, "pool_ready", lambda: False)  # a pool létrehozása elbukott
+    cache = PlayerCardCache()
+
+    async def go():
+        cache.bump_marketing(1, 5)
+        cache.update_mood(1, 0.5)
+        cache.add_signal(1, "marketing", 5.0)
+        assert not cache._dirty and not cache._signals and cache._task is None
+        await cache.close()
+
+    asyncio.run(go())
@@ -0,0 +1,61 @@
+import asyncio
+
+from cogs.utils.profanity_scan import (
+    STATUS_FALLBACK,
+    STATUS_INLINE,
+    STATUS_POOL,
+    STATUS_REVIEW,
+    ProfanityScanner,
+    literal_spans,
+)
+
+WORDS = ["kurva", "geci"]
+
+
+def test_short_text_scanned_inline():
+    sc = ProfanityScanner(WORDS, min_chars=100, workers=2)
+    res = asyncio.run(sc.scan("ez k.u.r.v.a jó"))
+    assert res.status == STATUS_INLINE and len(res.spans) == 1
+    assert sc._pool is None  # rövid üzenetnél nem is indul pool
+
+
+def test_long_text_uses_pool_with_preloaded_patterns():
+    sc = ProfanityScanner(WORDS, min_chars=100, workers=1, timeout_s=5)
+
+    async def run():
+        await sc.warm()
+        return await sc.scan("lorem ipsum " * 50 + "g3ci")
+
+    try:
+        res = asyncio.run(run())
+    finally:
+        sc.close()
+    assert res.status == STATUS_POOL and len(res.spans) == 1
+
+
+def test_budget_exceeded_falls_back_conservatively():
+    sc = ProfanityScanner(WORDS, workers=0, timeout_s=1e-7)
+    long_clean = "a . " * 3000
+    assert sc.scan_inline(long_clean + "kurvaanyja").status == STATUS_FALLBACK
+    assert sc.scan_inline(long_clean).status == STATUS_REVIEW
+    assert sc.timeouts == 2
+    assert literal_spans(WORDS, "Kurvanyád, geci!") == [(0, 9), (11, 15)]
+
+
+def test_wait_moderation_blocks_until_verdict():
+    from types import SimpleNamespace
+
+    from cogs.utils import context as ctx_flags
+
+    msg = SimpleNamespace()
+
+    async def run():
+        ctx_flags.mark_pending(msg)
+        waiter = asyncio.create_task(ctx_flags.wait_moderation(msg, timeout=5))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        ctx_flags.mark_moderated(msg)
+        ctx_flags.clear_pending(msg)
+        return await waiter
+
+    assert asyncio.run(run()) is True
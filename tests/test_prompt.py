@@ -0,0 +1,49 @@
+import types
+
+from cogs.utils import prompt
+from cogs.utils.ticket_kb import load_ticket_kb
+
+
+def _channel(nsfw=False):
+    cat = types.SimpleNamespace(name="Tickets")
+    return types.SimpleNamespace(name="commission-u", category=cat, is_nsfw=lambda: nsfw)
+
+
+def _member():
+    roles = [types.SimpleNamespace(name="@everyone"), types.SimpleNamespace(name="VIP")]
+    return types.SimpleNamespace(id=7, display_name="U", roles=roles)
+
+
+def test_commission_prompt_uses_kb_facts():
+    kb = {"commission": {"facts": ["a", "b"], "closing_lines": ["x"]}}
+    out = prompt.compose_commission_prompt(None, _channel(), _member(), kb)
+    lines = out.split("\n")
+    assert lines[1] == "Channel: Tickets / #commission-u (SFW)"
+    assert lines[2] == "User: U • Roles: VIP"
+    assert lines[3] == "Facts: a | b"
+    assert lines[4] == "Closing cues: x"
+
+
+def test_templates_cached_per_kb_version():
+    prompt.clear_prompt_cache()
+    kb = load_ticket_kb("config/tickets")
+    ver = prompt.warm_prompt_templates(kb)
+    tpl = prompt.get_prompt_template("general", kb)
+    assert prompt.get_prompt_template("general", kb) is tpl
+    other = {"general": {"facts": ["changed"]}}
+    assert prompt.kb_version(other) != ver
+    assert prompt.get_prompt_template("general", other) is not tpl
+
+
+def test_mebinu_prompt_has_no_nsfw_marker():
+    out = prompt.compose_mebinu_prompt(None, _channel(nsfw=True), _member(), None)
+    assert "Channel: Tickets / #commission-u\n" in out
+
+
+def test_kb_version_is_stamped_on_load():
+    kb = load_ticket_kb("config/tickets")
+    ver = prompt.kb_version(kb)
+    assert ver == kb.version != "empty"
+    kb["general"] = {"facts": ["edited"]}
+    assert prompt.kb_version(kb) == ver  # a verzió a betöltéshez kötött
+    assert kb.rehash() != ver and prompt.kb_version(kb) == kb.version
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+from cogs.ranks.rolesync import RoleSync, parse_level_roles, plan_edit, plan_guild
+
+ROLES = {0: 100, 5: 105, 10: 110}
+
+
+def test_parse_and_plan():
+    assert parse_level_roles("0:100, 5:105,bad,10:x") == {0: 100, 5: 105}
+    assert plan_edit({1, 105}, 7, ROLES) is None
+    assert plan_edit({1, 100}, 12, ROLES) == ({110}, {100})
+    # több szintszerep egyszerre: csak a célszerep marad
+    assert plan_edit({100, 105, 110}, 5, ROLES) == (set(), {100, 110})
+    assert plan_edit(set(), -1, ROLES) is None
+
+    members = [(1, {105}), (2, {100}), (3, set())]
+    edits, unchanged = plan_guild(members, {1: 6, 2: 10}, ROLES)
+    # 3-nak nincs players sora: érintetlen
+    assert edits == [(2, {110}, {100})] and unchanged == 1
+
+
+def _role(rid):
+    return SimpleNamespace(id=rid, is_default=lambda: rid == 1)
+
+
+def test_sync_guild_edits_only_changed_members():
+    calls = []
+
+    def member(uid, *rids):
+        m = SimpleNamespace(id=uid, bot=False, roles=[_role(1), *map(_role, rids)])
+
+        async def edit(roles, reason=None):
+            calls.append((uid, sorted(r.id for r in roles)))
+
+        m.edit = edit
+        return m
+
+    members = {u: member(u, *r) for u, r in {1: (105,), 2: (100, 7), 3: ()}.items()}
+    guild = SimpleNamespace(id=42, members=list(members.values()),
+                            get_member=members.get, get_role=_role)
+    for m in members.values():
+        m.guild = guild
+
+    async def get_levels(user_ids=None):
+        return {1: 5, 2: 11, 3: 0}
+
+    db = SimpleNamespace(get_levels=get_levels)
+    bot = SimpleNamespace(get_cog=lambda name: SimpleNamespace(db=db) if name == "AgentGate" else None)
+    rs = RoleSync(bot)
+    rs.level_roles = dict(ROLES)
+
+    from cogs.ranks.xp import XP
+    saved = XP.levels
+    # a worker memóriája régebbi (2: 3 < 11), a DB szint nem csökkenhet tőle
+    XP.levels = {2: 3}
+    try:
+        assert asyncio.run(rs.sync_guild(guild)) == (2, 1)
+    finally:
+        XP.levels = saved
+    assert calls == [(2, [7, 110]), (3, [100])]
+
+
+def test_apply_builds_roles_from_current_member():
+    calls = []
+    queued = SimpleNamespace(id=5, roles=[_role(1), _role(100)])
+    # a sorban állás alatt kapott egy kézi szerepet (9): nem vész el
+    current = SimpleNamespace(id=5, roles=[_role(1), _role(100), _role(9)])
+
+    async def edit(roles, reason=None):
+        calls.append(sorted(r.id for r in roles))
+
+    current.edit = edit
+    guild = SimpleNamespace(id=42, get_member={5: current}.get, get_role=_role)
+    queued.guild = guild
+    rs = RoleSync(SimpleNamespace(get_cog=lambda name: None))
+
+    assert asyncio.run(rs._apply(queued, {105}, {100}))
+    assert calls == [[9, 105]]
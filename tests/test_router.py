@@ -0,0 +1,32 @@
+from cogs.agent.router import ROUTE_HEAVY, ROUTE_MINI, ModelRouter
+
+
+def _router():
+    return ModelRouter("mini-m", "heavy-m", threshold=0.6, cost_mini_per_1k=0.001, cost_heavy_per_1k=0.01)
+
+
+def test_short_chat_goes_to_mini():
+    route, model, score = _router().choose(prompt_len=40, ticket_type=None, promo_hits=0, turns=0)
+    assert (route, model) == (ROUTE_MINI, "mini-m")
+    assert score < 0.6
+
+
+def test_long_sales_ticket_escalates():
+    route, model, _ = _router().choose(
+        prompt_len=500, ticket_type="commission", promo_hits=2, turns=5, prefer_heavy=True
+    )
+    assert (route, model) == (ROUTE_HEAVY, "heavy-m")
+
+
+def test_force_heavy_and_counters():
+    r = _router()
+    route, _, score = r.choose(force_heavy=True, prompt_len=1)
+    assert route == ROUTE_HEAVY and score == 1.0
+    r.record(ROUTE_MINI, 0.5, 1000)
+    r.record(ROUTE_MINI, 1.5, 1000)
+    r.record(ROUTE_HEAVY, 2.0, 0, ok=False)
+    snap = r.snapshot()
+    assert snap[ROUTE_MINI]["calls"] == 2
+    assert snap[ROUTE_MINI]["cost_usd"] == 0.002
+    assert snap[ROUTE_HEAVY]["errors"] == 1
+    assert "router mini=2/0err" in r.summary()
@@ -0,0 +1,60 @@
+import asyncio
+import datetime as dt
+from contextlib import asynccontextmanager
+
+from cogs.storage.signals import (
+    add_months,
+    create_partition_sql,
+    expired_partitions,
+    partition_bounds,
+    partitions_to_create,
+    run_retention,
+)
+
+
+def test_month_arithmetic_and_partition_names():
+    assert add_months(dt.date(2026, 11, 15), 2) == dt.date(2027, 1, 1)
+    assert add_months(dt.date(2026, 1, 1), -1) == dt.date(2025, 12, 1)
+    assert partition_bounds("signals_y2026m12") == (dt.date(2026, 12, 1), dt.date(2027, 1, 1))
+    assert partition_bounds("signals_default") is None
+    assert "FROM ('2026-10-01') TO ('2026-11-01')" in create_partition_sql("signals_y2026m10")
+
+    today = dt.date(2026, 10, 19)
+    assert partitions_to_create(today) == ["signals_y2026m10", "signals_y2026m11", "signals_y2026m12"]
+    # régi (legacy) sorok hónapjai is kapnak partíciót
+    assert partitions_to_create(today, since=dt.date(2026, 8, 3), ahead=0) == [
+        "signals_y2026m08", "signals_y2026m09", "signals_y2026m10"]
+
+
+def test_expired_partitions_keep_whole_recent_months():
+    names = ["signals_default", "signals_y2026m06", "signals_y2026m07", "signals_y2026m08", "signals_y2026m10"]
+    # október közepén 3 hónap: július–október marad
+    assert expired_partitions(names, dt.date(2026, 10, 19), keep_months=3) == ["signals_y2026m06"]
+    assert expired_partitions(names, dt.date(2026, 11, 1), keep_months=3) == [
+        "signals_y2026m06", "signals_y2026m07"]
+
+
+class FakeCon:
+    def __init__(self, parts):
+        self.parts = parts
+        self.sql = []
+
+    async def fetch(self, sql, *args):
+        return [{"relname": p} for p in self.parts]
+
+    async def execute(self, sql, *args):
+        self.sql.append(sql.strip())
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def test_retention_rolls_up_before_dropping():
+    con = FakeCon(["signals_default", "signals_y2026m05", "signals_y2026m10"])
+    dropped = asyncio.run(run_retention(con, today=dt.date(2026, 10, 19), keep_months=3))
+    assert dropped == ["signals_y2026m05"]
+    detach, rollup, drop = [s for s in con.sql if "advisory" not in s]
+    assert detach == "ALTER TABLE signals DETACH PARTITION signals_y2026m05"
+    assert "INSERT INTO signal_daily" in rollup and "FROM signals_y2026m05" in rollup
+    assert drop == "DROP TABLE signals_y2026m05"
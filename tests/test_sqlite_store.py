@@ -0,0 +1,78 @@
+import asyncio
+
+from cogs.storage.playercard import PlayerCardCache
+from cogs.storage.sqlite_store import SQLiteCardStore, SQLitePlayerDB, SQLiteStore
+
+
+def test_player_db_roundtrip_on_sqlite(tmp_path):
+    async def run():
+        db = SQLitePlayerDB(SQLiteStore(str(tmp_path / "isero.db")), owner_id=1)
+        await db.start()
+        assert await db.allow_admin(1) and not await db.allow_admin(2)
+        await db.set_pref(2, "hu", None)
+        await db.set_pref(2, None, "friendly")
+        p = await db.get_player(2)
+        assert (p["locale"], p["style"]) == ("hu", "friendly")
+        await db.log_signal(2, 10, 0.5, "buy", 80)
+        await db.log_signal(2, 10, -0.1, "chat", 0)
+        mood, mkt = await db.get_scores(2)
+        assert abs(mood - 0.2) < 1e-9 and mkt == 80.0
+        await db.set_fields(2, stage="offer")
+        await db.close()
+
+        # új példány: a snapshot a fájlból jön vissza
+        db2 = SQLitePlayerDB(SQLiteStore(str(tmp_path / "isero.db")))
+        await db2.start()
+        await db2.set_fields(2, last_offer=3)
+        await db2.flush_snapshots()
+        assert await db2.fetch_snapshot(2) == {"stage": "offer", "last_offer": 3}
+        db2._mem.clear()
+        assert await db2.fetch_snapshot(2) == {"stage": "offer", "last_offer": 3}
+        await db2.close()
+
+    asyncio.run(run())
+
+
+def test_card_cache_flushes_into_sqlite(tmp_path):
+    async def run():
+        store = SQLiteStore(str(tmp_path / "cards.db"))
+        cache = PlayerCardCache(flush_s=3600)
+        cache.backend = SQLiteCardStore(store)
+        cache.update_mood(7, 1.0)
+        cache.bump_marketing(7, 150)
+        cache.add_profanity_points(7, 2, 1)
+        cache.add_signal(7, "lang", 1.0, {"lang": "hu"})
+        assert await cache.flush() == 1
+
+        fresh = PlayerCardCache(flush_s=3600)
+        fresh.backend = SQLiteCardStore(store)
+        card = await fresh.get_card(7)
+        assert abs(card.mood - 0.2) < 1e-9
+        assert card.marketing_score == 100
+        assert card.profanity == {"points": 2, "stage": 1}
+        n = await store.fetchone("SELECT COUNT(*) FROM signals WHERE user_id=7 AND kind='lang'")
+        assert n[0] == 1
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_single_writer_batches_concurrent_writes(tmp_path):
+    async def run():
+        store = SQLiteStore(str(tmp_path / "w.db"))
+        db = SQLitePlayerDB(store)
+        await db.start()
+        await asyncio.gather(*(db.log_signal(i % 5, 1, 0.0, "chat", 0) for i in range(200)))
+        n = await store.fetchone("SELECT COUNT(*) FROM signals")
+        assert n[0] == 200
+        assert store.commits < 200
+
+        # egy hibás írás nem viszi magával a kötegét
+        bad = store.write(lambda con: con.execute("INSERT INTO nope VALUES(1)"))
+        good = db.log_signal(9, 1, 0.0, "chat", 0)
+        res = await asyncio.gather(bad, good, return_exceptions=True)
+        assert isinstance(res[0], Exception) and res[1] is None
+        assert (await store.fetchone("SELECT COUNT(*) FROM signals WHERE user_id=9"))[0] == 1
+        await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from cogs.storage import store
+
+
+class FakeStmt:
+    def __init__(self, con, sql):
+        self.con, self.sql = con, sql
+
+    async def fetchval(self, *args):
+        self.con.calls.append(("stmt", self.sql.split()[0], args))
+
+
+class FakeCon:
+    def __init__(self):
+        self.prepared = []
+        self.calls = []
+
+    async def prepare(self, sql, name=None):
+        self.prepared.append(name)
+        return FakeStmt(self, sql)
+
+    async def execute(self, sql, *args):
+        self.calls.append(("text", sql.split()[0], args))
+
+
+class FakePool:
+    def __init__(self, con):
+        self.con = con
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.con
+
+
+def test_hot_statements_prepared_once_per_connection(monkeypatch):
+    con = FakeCon()
+    monkeypatch.setattr(store, "_POOL", FakePool(con))
+
+    async def go():
+        await store.execute_hot("update_mood", 1, 0.5)
+        await store.execute_hot("update_mood", 2, -0.5)
+        await store.execute_hot("ensure_player", 3)
+
+    asyncio.run(go())
+    assert con.prepared == ["isero_update_mood", "isero_ensure_player"]
+    assert [c[0] for c in con.calls] == ["stmt"] * 3
+    assert con.calls[1][2] == (2, -0.5)
+    # egyetlen utasítás hozza létre a players + player_cards sort
+    assert "players" in store.HOT_SQL["ensure_player"] and "player_cards" in store.HOT_SQL["ensure_player"]
+
+
+def test_statement_cache_off_uses_plain_queries(monkeypatch):
+    con = FakeCon()
+    monkeypatch.setattr(store, "_POOL", FakePool(con))
+    monkeypatch.setattr(store, "DB_STATEMENT_CACHE_SIZE", 0)
+    asyncio.run(store.execute_hot("add_signal", 1, "sentiment", 0.2, "{}"))
+    assert con.prepared == [] and con.calls == [("text", "INSERT", (1, "sentiment", 0.2, "{}"))]
@@ -28,3 +28,28 @@ def test_chunk_message_splits_with_prefix():
 def test_truncate_by_chars():
     assert truncate_by_chars("hello world", 5) == "hell…"
     assert truncate_by_chars("short", 10) == "short"
+
+
+def test_chunk_message_prefers_sentence_and_word_boundaries():
+    text = "Ez egy mondat. " * 30 + "hosszúszó " * 40
+    chunks = chunk_message(text, limit=120)
+    assert all(len(c) <= 120 for c in chunks)
+    body = [c.split(") ", 1)[1] for c in chunks]
+    assert body[0].endswith("mondat.")
+    words = set(text.split())
+    assert all(w in words for b in body for w in b.split())
+
+
+def test_chunk_message_keeps_emoji_sequences_and_counts_digits():
+    emoji = "👍🏽" * 200
+    chunks = chunk_message(emoji, limit=101)
+    assert all(not c.split(") ", 1)[1].startswith("\U0001f3fd") for c in chunks)
+    many = chunk_message("x" * 10000, limit=100)
+    assert many[-1].startswith(f"({len(many)}/{len(many)}) ")
+    assert all(len(c) <= 100 for c in many)
+
+
+def test_chunk_message_discord_limit_single_send():
+    from cogs.utils.text import DISCORD_MSG_LIMIT
+
+    assert len(chunk_message("szó " * 475, DISCORD_MSG_LIMIT)) == 1
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from cogs.ranks.progress import progress_bar
+from cogs.ranks.xp import XpEngine, level_table
+from cogs.storage.sqlite_store import SQLitePlayerDB, SQLiteStore
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_level_table_and_lookup():
+    table = level_table(base=100, max_level=5)
+    assert table[:6] == [0, 100, 300, 600, 1000, 1500] and table[-1] == float("inf")
+    xp = XpEngine(table=table)
+    assert [xp.level_for(v) for v in (0, 99, 100, 299, 300, 1500, 10**9)] == [0, 0, 1, 1, 2, 5, 5]
+    assert progress_bar(150, 100, 300, width=4) == "[#---]"
+
+
+def test_award_cooldown_and_role_crossings():
+    clock = Clock()
+    xp = XpEngine(per_message=60, cooldown_s=10, table=level_table(100, 10), role_levels=[2], clock=clock)
+    xp.load({})
+    assert xp.award(1) is None
+    assert xp.award(1) is None and xp.xp[1] == 60  # cooldown: nem számít
+    clock.t = 10
+    assert xp.award(1) is None and xp.levels[1] == 1  # 120 XP: szint, de nincs szerepkör-küszöb
+    for step in range(2, 5):
+        clock.t = 10 * step
+        res = xp.award(1)
+    assert xp.xp[1] == 300 and res == 2  # a 2-es küszöb átlépése jelez
+    assert xp.progress(1) == (2, 300, 300, 600)
+
+
+def test_load_merges_early_awards_and_flush_batches():
+    class DB:
+        def __init__(self):
+            self.batches = []
+            self.fail = False
+
+        async def add_xp(self, batch):
+            if self.fail:
+                raise RuntimeError("db down")
+            self.batches.append(batch)
+
+    async def run():
+        clock = Clock()
+        xp = XpEngine(per_message=50, cooldown_s=1, table=level_table(100, 10), clock=clock)
+        xp.db = DB()
+        xp.award(1)
+        assert await xp.flush() == 0  # betöltés előtt nincs írás
+        xp.load({1: 280, 2: 40})
+        assert xp.xp == {1: 330, 2: 40} and xp.levels[1] == 2
+
+        xp.db.fail = True
+        with pytest.raises(RuntimeError):
+            await xp.flush()
+        clock.t = 5
+        xp.award(1)
+        xp.db.fail = False
+        assert await xp.flush() == 1
+        assert xp.db.batches == [{1: (100, 2)}]
+        await xp.close()
+
+    asyncio.run(run())
+
+
+def test_refresh_takes_db_totals_and_keeps_unflushed_deltas():
+    clock = Clock()
+    xp = XpEngine(per_message=50, cooldown_s=1, table=level_table(100, 10), clock=clock)
+    xp.db = object()  # nincs futó loop: nem indul flush task
+    xp.load({1: 100, 2: 500})
+    xp.award(1)
+    # a DB-ben más workerek már többet írtak; 2 flush-a még nem látszik benne
+    totals = xp.refresh({1: 300, 3: 20, 2: 400})
+    assert totals == xp.xp == {1: 350, 2: 500, 3: 20}
+    assert xp.pending() == {1: 50}
+    assert xp.levels == {1: 2, 2: 2, 3: 0}
+
+
+def test_memory_only_engine_keeps_no_deltas():
+    async def run():
+        clock = Clock()
+        xp = XpEngine(per_message=10, cooldown_s=5, flush_s=30, table=level_table(100, 10), clock=clock)
+        xp.award(1)  # betöltés előtt: a DB-t még nem ismerjük
+        xp.load({})
+        assert await xp.flush() == 0 and not xp._dirty
+        for step in range(1, 40):
+            clock.t = step * 5
+            xp.award(step)
+        assert xp.xp[39] == 10 and not xp._dirty and xp._task is None
+        assert len(xp._last) < 10  # lejárt cooldownok kitakarítva
+        await xp.close()
+
+    asyncio.run(run())
+
+
+def test_sqlite_xp_roundtrip(tmp_path):
+    async def run():
+        db = SQLitePlayerDB(SQLiteStore(str(tmp_path / "xp.db")))
+        await db.start()
+        await db.add_xp({1: (150, 1), 2: (10, 0)})
+        await db.add_xp({1: (200, 2)})
+        assert await db.get_xp() == {1: 350, 2: 10}
+        assert await db.get_levels([1]) == {1: 2}
+        await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1 @@
+"""Offline helper scripts (training, evaluation, load tests); not loaded by the bot."""
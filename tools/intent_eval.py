@@ -0,0 +1,77 @@
+# tools/intent_eval.py
+"""Evaluate the intent classifier: per-label precision/recall and LLM calls saved.
+
+Usage::
+
+    python -m tools.intent_eval holdout.jsonl [--model config/intent_model.json] [--min-conf 0.85]
+
+"Saved" counts messages the agent would answer locally (label in
+``SKIP_LABELS`` with confidence >= min-conf); "wrongly skipped" are the
+ones among them whose gold label needed the LLM.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+
+from cogs.utils.intent import LABELS, SKIP_LABELS, IntentClassifier, get_classifier, read_samples
+
+
+def evaluate(clf: IntentClassifier, samples, min_conf: float = 0.85) -> dict:
+    tp, fp, fn = Counter(), Counter(), Counter()
+    saved = wrong_skip = 0
+    t0 = time.perf_counter()
+    for text, gold in samples:
+        pred, conf = clf.classify(text)
+        if pred == gold:
+            tp[pred] += 1
+        else:
+            fp[pred] += 1
+            fn[gold] += 1
+        if pred in SKIP_LABELS and conf >= min_conf:
+            saved += 1
+            if gold not in SKIP_LABELS:
+                wrong_skip += 1
+    elapsed = time.perf_counter() - t0
+    n = len(samples) or 1
+    per_label = {}
+    for lab in LABELS:
+        p_den = tp[lab] + fp[lab]
+        r_den = tp[lab] + fn[lab]
+        per_label[lab] = {
+            "precision": tp[lab] / p_den if p_den else 0.0,
+            "recall": tp[lab] / r_den if r_den else 0.0,
+            "support": r_den,
+        }
+    return {
+        "n": len(samples),
+        "accuracy": sum(tp.values()) / n,
+        "labels": per_label,
+        "llm_calls_saved": saved,
+        "llm_calls_saved_pct": 100.0 * saved / n,
+        "wrongly_skipped": wrong_skip,
+        "us_per_msg": 1e6 * elapsed / n,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("data", help="labelled JSONL (text + label/intent)")
+    ap.add_argument("--model", default=None, help="weights JSON (default: bot's loader)")
+    ap.add_argument("--min-conf", type=float, default=0.85)
+    args = ap.parse_args(argv)
+
+    clf = IntentClassifier.load(args.model) if args.model and Path(args.model).exists() else get_classifier()
+    rep = evaluate(clf, read_samples(args.data), args.min_conf)
+    print(f"samples={rep['n']} accuracy={rep['accuracy']:.3f} latency={rep['us_per_msg']:.0f}µs/msg")
+    for lab, m in rep["labels"].items():
+        print(f"  {lab:<10} P={m['precision']:.3f} R={m['recall']:.3f} n={m['support']}")
+    print(f"LLM calls saved: {rep['llm_calls_saved']} ({rep['llm_calls_saved_pct']:.1f}%), "
+          f"wrongly skipped: {rep['wrongly_skipped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
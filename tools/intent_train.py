@@ -0,0 +1,40 @@
+# tools/intent_train.py
+"""Train the fast-path intent classifier from labelled / logged messages.
+
+Usage::
+
+    python -m tools.intent_train data.jsonl [more.jsonl ...] -o config/intent_model.json
+
+Input rows are JSONL: ``{"text": ..., "label": ...}`` or a messages+signals
+export ``{"text": ..., "intent": "buy"}`` (mapped via ``SIGNAL_LABELS``).
+The bundled seed set is always included.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from cogs.utils.intent import DEFAULT_MODEL_PATH, DEFAULT_SEED_PATH, IntentClassifier, read_samples
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("inputs", nargs="*", help="JSONL files with text + label/intent")
+    ap.add_argument("-o", "--output", default=DEFAULT_MODEL_PATH)
+    ap.add_argument("--seed", default=DEFAULT_SEED_PATH)
+    ap.add_argument("--epochs", type=int, default=30)
+    args = ap.parse_args(argv)
+
+    samples = read_samples(args.seed)
+    for path in args.inputs:
+        samples += read_samples(path)
+    t0 = time.perf_counter()
+    clf = IntentClassifier().fit(samples, epochs=args.epochs)
+    clf.save(args.output)
+    print(f"trained on {len(samples)} samples in {time.perf_counter() - t0:.2f}s → {args.output} "
+          f"({len(clf.weights)} features)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
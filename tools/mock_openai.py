@@ -0,0 +1,144 @@
+# tools/mock_openai.py
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Replays recorded completions (JSONL written via ``OPENAI_RECORD_PATH``) with
+configurable latency and error rate.  Use it in-process as an httpx transport
+(``set_openai_transport(MockOpenAI(...).transport())``) or as a server::
+
+    python -m tools.mock_openai --port 8089 --latency-ms 800 --jitter-ms 400 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python bot.py   # or python -m bot.bot / python -m bot.cluster
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+DEFAULT_COMPLETIONS = "config/replay/completions.jsonl"
+
+
+def load_completions(path: Optional[str]) -> List[dict]:
+    rows: List[dict] = []
+    if path and Path(path).exists():
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row.get("content"):
+                rows.append(row)
+    return rows or [{"content": "Rendben, nézzük. Írd le pontosan, mire van szükséged."}]
+
+
+class MockOpenAI:
+    """Round-robin over recorded completions; failures are HTTP 5xx/429."""
+
+    def __init__(
+        self,
+        completions: Optional[List[dict]] = None,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 7,
+    ):
+        self.completions = completions or load_completions(DEFAULT_COMPLETIONS)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._next = itertools.cycle(range(len(self.completions)))
+        self.calls = 0
+        self.errors = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def respond(self, body: dict) -> tuple[int, dict]:
+        """Pick the next outcome: ``(status, json_body)``."""
+        self.calls += 1
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            status = self._rng.choice((429, 500, 503))
+            return status, {"error": {"message": "mock failure", "type": "server_error", "code": status}}
+        row = self.completions[next(self._next)]
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages") or [])
+        usage = row.get("usage") or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or max(1, prompt_chars // 4))
+        completion_tokens = int(usage.get("completion_tokens") or max(1, len(row["content"]) // 4))
+        return 200, {
+            "id": f"mock-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or row.get("model") or "mock",
+            "choices": [
+                {"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": row["content"]}}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self._delay())
+        try:
+            body = json.loads(request.content or b"{}")
+        except ValueError:
+            body = {}
+        status, data = self.respond(body)
+        return httpx.Response(status, json=data)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+    # ---- standalone szerver ----
+    def app(self):
+        from aiohttp import web
+
+        async def completions(request: "web.Request") -> "web.Response":
+            await asyncio.sleep(self._delay())
+            try:
+                body = await request.json()
+            except ValueError:
+                body = {}
+            status, data = self.respond(body)
+            return web.json_response(data, status=status)
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        return app
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--completions", default=DEFAULT_COMPLETIONS, help="recorded completions JSONL")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=600.0)
+    ap.add_argument("--jitter-ms", type=float, default=300.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+
+    from aiohttp import web
+
+    mock = MockOpenAI(load_completions(args.completions), latency_ms=args.latency_ms,
+                      jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    web.run_app(mock.app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,176 @@
+# tools/replay.py
+"""Replay captured messages through ``AgentGate.on_message`` against the mock LLM.
+
+Usage::
+
+    python -m tools.replay config/replay/messages.jsonl [--repeat 20] [--concurrency 8]
+        [--latency-ms 600 --jitter-ms 300 --error-rate 0.02] [--token-limit 2000000]
+
+Input rows: ``{"content", "author_id"?, "channel_id"?, "channel_name"?, "locale"?}``.
+Reports throughput, p50/p95/p99 end-to-end ``on_message`` latency, LLM calls,
+tokens booked against the daily budget and the per-stage timings.  No Discord connection, no real
+API calls: OpenAI is replaced by :class:`tools.mock_openai.MockOpenAI`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import types
+from pathlib import Path
+from typing import List, Optional
+
+from tools.mock_openai import DEFAULT_COMPLETIONS, MockOpenAI, load_completions
+
+DEFAULT_CHANNEL_ID = 900
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str = "bot-commands"):
+        self.id = channel_id
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+        self.category = None
+        self.category_id = None
+        self.guild = None
+        self.topic = ""
+        self.sent: List[str] = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content or "")
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, row: dict, channel: FakeChannel):
+        self.id = next(self._ids)
+        self.content = str(row.get("content") or "")
+        self.channel = channel
+        self.guild = None
+        self.author = types.SimpleNamespace(
+            id=int(row.get("author_id") or self.id),
+            bot=False,
+            display_name=str(row.get("author_name") or "replay"),
+            roles=[],
+            locale=str(row.get("locale") or "hu"),
+        )
+        self.mentions: list = []
+        self.role_mentions: list = []
+        self.attachments: list = []
+
+    def to_reference(self, **kwargs):
+        return None
+
+
+def read_messages(path: str) -> List[dict]:
+    rows = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if row.get("content"):
+            rows.append(row)
+    return rows
+
+
+def percentile(vals: List[float], q: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+async def replay(rows: List[dict], mock: MockOpenAI, *, repeat: int = 1, concurrency: int = 4) -> dict:
+    import discord
+    from discord.ext import commands
+
+    from bot.config import settings
+    import cogs.agent.agent_gate as ag_mod
+    from cogs.utils.perf import PERF
+
+    if not settings.CHANNEL_BOT_COMMANDS:
+        settings.CHANNEL_BOT_COMMANDS = DEFAULT_CHANNEL_ID
+    ag_mod.set_openai_transport(mock.transport())
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    gate = ag_mod.AgentGate(bot)
+    if ag_mod.AGENT_INTENT_FASTPATH:
+        ag_mod.get_classifier()  # ahogy a setup(): ne az első üzenet fizesse
+    channels: dict[int, FakeChannel] = {}
+    latencies: List[float] = []
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(row: dict, i: int, n: int) -> None:
+        cid = int(row.get("channel_id") or settings.CHANNEL_BOT_COMMANDS)
+        ch = channels.setdefault(cid, FakeChannel(cid, str(row.get("channel_name") or "bot-commands")))
+        # ismétlésnél más szerző, különben a dedup/debounce elnyeli
+        row = dict(row, author_id=int(row.get("author_id") or i + 1) * 1000 + n)
+        async with sem:
+            t0 = time.perf_counter()
+            await gate.on_message(FakeMessage(row, ch))
+            latencies.append(time.perf_counter() - t0)
+
+    spent0 = gate._budget.spent
+    t_start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(r, i, n) for n in range(repeat) for i, r in enumerate(rows)))
+    finally:
+        ag_mod.set_openai_transport(None)
+    wall = time.perf_counter() - t_start
+    return {
+        "messages": len(latencies),
+        "wall_s": wall,
+        "throughput_msg_s": len(latencies) / wall if wall else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+        "replies": sum(len(c.sent) for c in channels.values()),
+        "llm_calls": mock.calls,
+        "llm_errors": mock.errors,
+        "tokens_booked": gate._budget.spent - spent0,
+        "router": gate.router.summary(),
+        "breaker": gate.llm_breaker.summary(),
+        "intent_skips": dict(gate.intent_skips),
+        "stages": PERF.summary_lines(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("messages", help="captured messages JSONL")
+    ap.add_argument("--completions", default=DEFAULT_COMPLETIONS)
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--token-limit", type=int, default=None, help="override AGENT_DAILY_TOKEN_LIMIT (max 2000000)")
+    args = ap.parse_args(argv)
+
+    if args.token_limit:
+        # az agent_gate import előtt kell beállítani
+        os.environ["AGENT_DAILY_TOKEN_LIMIT"] = str(args.token_limit)
+    mock = MockOpenAI(load_completions(args.completions), latency_ms=args.latency_ms,
+                      jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    rep = asyncio.run(replay(read_messages(args.messages), mock,
+                             repeat=args.repeat, concurrency=args.concurrency))
+    print(f"messages={rep['messages']} wall={rep['wall_s']:.2f}s "
+          f"throughput={rep['throughput_msg_s']:.1f} msg/s replies={rep['replies']}")
+    print(f"latency p50={rep['p50_ms']:.1f}ms p95={rep['p95_ms']:.1f}ms p99={rep['p99_ms']:.1f}ms")
+    print(f"llm calls={rep['llm_calls']} errors={rep['llm_errors']} tokens_booked={rep['tokens_booked']}")
+    print(rep["router"])
+    print(rep["breaker"], "intent_skips=", rep["intent_skips"])
+    for line in rep["stages"]:
+        print("  " + line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())